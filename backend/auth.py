@@ -1,18 +1,48 @@
+import asyncio
+import hashlib
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import event, func, inspect
 from sqlalchemy.orm import Session
-from fastapi import HTTPException, status
+from fastapi import Header, HTTPException, status
+from cache import CACHE_BACKEND, LRUCache, MISSING, RedisCache
+import metrics
 import models
 import crud
 import os
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Access tokens are short-lived; clients renew them with a refresh token instead of the password
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+# A token rotated this recently may be presented again (e.g. two tabs refreshing at once)
+REFRESH_REUSE_GRACE_SECONDS = int(os.getenv("REFRESH_REUSE_GRACE_SECONDS", "10"))
+# bcrypt cost; hashes made with a different cost are upgraded on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Threads doing bcrypt work (it releases the GIL) and how many calls may wait for one
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "4"))
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", "64"))
+# With CACHE_BACKEND=redis every worker shares the cache, so a user change invalidates it
+# everywhere. Per worker, only the worker that made the change drops its copy: a disabled
+# account keeps working on the others for up to this long, hence the short default.
+PRINCIPAL_CACHE_SECONDS = float(os.getenv("PRINCIPAL_CACHE_SECONDS", "300" if CACHE_BACKEND == "redis" else "10"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+# Shared secret for the /admin routes (X-Admin-Key header); unset disables them
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+login_attempts = metrics.counter("auth_login_attempts_total", "Password logins by outcome", ("result",))
+sessions_started = metrics.counter("auth_sessions_started_total", "Logins that started a new refresh token family")
+refresh_results = metrics.counter("auth_refresh_total", "Refresh token exchanges", ("result",))
+principal_lookups = metrics.counter("auth_principal_cache_total", "Authenticated identity lookups", ("result",))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -20,6 +50,93 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+class HashingPool:
+    """Bounded executor for bcrypt so login bursts cannot occupy every request thread.
+
+    At most HASH_WORKERS hashes run at once; beyond HASH_MAX_QUEUE waiting calls new
+    ones are refused with 503 instead of piling up behind the burst.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, max_queue=HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.total_wait = 0.0
+        self.total_work = 0.0
+
+    def _run(self, submitted_at, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self.total_wait += started - submitted_at
+                self.total_work += finished - started
+
+    async def submit(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many login attempts right now. Please try again shortly.",
+                    headers={"Retry-After": "1"},
+                )
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._run, time.perf_counter(), fn, *args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+
+    def stats(self):
+        completed = self.completed or 1
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "in_flight": self.in_flight,
+            "queued": max(self.in_flight - self.workers, 0),
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "avg_wait_ms": round(self.total_wait / completed * 1000, 2),
+            "avg_hash_ms": round(self.total_work / completed * 1000, 2)
+        }
+
+hashing_pool = HashingPool()
+
+metrics.callback("auth_hashing_in_flight", "bcrypt calls running or queued", lambda: hashing_pool.in_flight)
+metrics.callback("auth_hashing_completed_total", "bcrypt calls completed", lambda: hashing_pool.completed, kind="counter")
+metrics.callback("auth_hashing_rejected_total", "Logins refused with 503 because the hashing queue was full", lambda: hashing_pool.rejected, kind="counter")
+
+def _verify_and_update(plain_password, hashed_password):
+    if not hashed_password:
+        # Google-only accounts have no password
+        return False, None
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def verify_password_async(plain_password, hashed_password):
+    """Verify off the event loop; returns (valid, new_hash) where new_hash is set when the cost changed"""
+    valid, new_hash = await hashing_pool.submit(_verify_and_update, plain_password, hashed_password)
+    if new_hash:
+        hashing_pool.rehashed += 1
+    return valid, new_hash
+
+async def get_password_hash_async(password):
+    return await hashing_pool.submit(pwd_context.hash, password)
+
 def authenticate_user(db: Session, email: str, password: str):
     user = crud.get_user_by_email(db, email)
     if not user:
@@ -38,7 +155,181 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def token_response(email: str, refresh_token: str):
+    return {
+        "access_token": create_access_token(data={"sub": email}),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
+
+def _refresh_digest(token: str) -> bytes:
+    # Refresh tokens are 256 random bits, so a plain SHA-256 is enough; no bcrypt needed
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+def _token_family(token: str):
+    """Family id carried in front of the random part ("<family hex>.<secret>"), None for older tokens"""
+    prefix, dot, _ = token.partition(".")
+    if not dot:
+        return None
+    try:
+        return int(prefix, 16)
+    except ValueError:
+        return None
+
+def issue_refresh_token(db: Session, user_id: int, family_id: int = None):
+    """Store a new refresh token for user_id (in family_id when rotating) and return it"""
+    now = int(time.time())
+    tokens = models.RefreshToken
+    if family_id is None:
+        family_id = secrets.randbits(63)
+        sessions_started.inc()
+        # A fresh login: drop the user's expired tokens so the table stays bounded by live sessions
+        db.query(tokens).filter(tokens.user_id == user_id, tokens.expires_at < now).delete(synchronize_session=False)
+    # The family travels with the token, so a replay is recognised after its row was pruned
+    token = f"{family_id:x}.{secrets.token_urlsafe(32)}"
+    db.add(tokens(
+        token_hash=_refresh_digest(token),
+        family_id=family_id,
+        user_id=user_id,
+        expires_at=now + REFRESH_TOKEN_EXPIRE_DAYS * 86400
+    ))
+    db.commit()
+    return token
+
+def _revoke_family(db: Session, family_id: int, now: int):
+    # Expire rather than just revoke, so already-rotated tokens lose their reuse grace too
+    tokens = models.RefreshToken
+    db.query(tokens).filter(tokens.family_id == family_id, tokens.expires_at > now).update(
+        {"expires_at": now, "revoked_at": func.coalesce(tokens.revoked_at, now)}, synchronize_session=False
+    )
+    db.commit()
+
+def rotate_refresh_token(db: Session, token: str):
+    """Exchange a refresh token for a new one; returns (email, new_refresh_token).
+
+    A session keeps one live row plus the one rotated within the reuse grace: rotated-out
+    tokens expire when their grace ends and the family's expired rows are pruned here.
+    """
+    refresh_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    tokens = models.RefreshToken
+    now = int(time.time())
+    row = db.query(tokens).filter(tokens.token_hash == _refresh_digest(token)).first()
+    if row is None:
+        family_id = _token_family(token)
+        live = family_id is not None and db.query(tokens.id).filter(
+            tokens.family_id == family_id, tokens.expires_at > now
+        ).first()
+        if live:
+            # A token of a live session that was rotated and pruned long ago: assume it leaked
+            _revoke_family(db, family_id, now)
+            refresh_results.inc(result="replayed")
+        else:
+            refresh_results.inc(result="invalid")
+        raise refresh_exception
+
+    if row.revoked_at is not None and now - row.revoked_at > REFRESH_REUSE_GRACE_SECONDS:
+        # A token rotated before the grace is being replayed: assume it leaked and end the whole session
+        if row.expires_at > row.revoked_at:
+            _revoke_family(db, row.family_id, now)
+            refresh_results.inc(result="replayed")
+        else:
+            # Revoked by logout or an earlier replay, the session is already over
+            refresh_results.inc(result="invalid")
+        raise refresh_exception
+    if row.expires_at <= now:
+        refresh_results.inc(result="invalid")
+        raise refresh_exception
+
+    # Claim the token atomically; a concurrent rotation inside the grace may claim it too
+    db.query(tokens).filter(tokens.id == row.id, tokens.revoked_at.is_(None)).update(
+        {"revoked_at": now, "expires_at": now + REFRESH_REUSE_GRACE_SECONDS}, synchronize_session=False
+    )
+    db.query(tokens).filter(tokens.family_id == row.family_id, tokens.expires_at <= now).delete(synchronize_session=False)
+
+    user = db.query(models.User.email, models.User.is_active).filter(models.User.id == row.user_id).first()
+    if user is None or not user.is_active:
+        _revoke_family(db, row.family_id, now)
+        refresh_results.inc(result="inactive")
+        raise refresh_exception
+    refresh_results.inc(result="rotated")
+    return user.email, issue_refresh_token(db, row.user_id, row.family_id)
+
+def revoke_refresh_token(db: Session, token: str):
+    """Log out: revoke every token in the presented token's family"""
+    row = db.query(models.RefreshToken.family_id).filter(
+        models.RefreshToken.token_hash == _refresh_digest(token)
+    ).first()
+    if row is not None:
+        _revoke_family(db, row.family_id, int(time.time()))
+
+class Principal(NamedTuple):
+    """What authorized routes need to know about the caller, without the full User row"""
+    id: int
+    email: str
+    is_active: bool
+
+# Token subject (email) -> Principal
+_principals = RedisCache(prefix="imdb:principal:") if CACHE_BACKEND == "redis" else LRUCache(max_entries=PRINCIPAL_CACHE_SIZE)
+
+def invalidate_principal(email: str):
+    _principals.delete(email)
+
+def load_principal(db: Session, email: str):
+    principal = _principals.get(email)
+    if principal is not MISSING:
+        principal_lookups.inc(result="hit")
+        return principal
+    principal_lookups.inc(result="miss")
+    row = db.query(models.User.id, models.User.email, models.User.is_active).filter(models.User.email == email).first()
+    if row is None:
+        return None
+    principal = Principal(row.id, row.email, bool(row.is_active))
+    _principals.set(email, principal, PRINCIPAL_CACHE_SECONDS)
+    return principal
+
+@event.listens_for(Session, "after_flush")
+def _collect_user_changes(session, flush_context):
+    emails = session.info.setdefault("principal_changes", set())
+    for user in list(session.dirty) + list(session.deleted):
+        if isinstance(user, models.User):
+            # Old and new address, in case the email itself changed
+            history = inspect(user).attrs.email.history
+            emails.update(email for email in (history.deleted or []) if email)
+            emails.add(user.email)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_user_changes(session):
+    for email in session.info.pop("principal_changes", ()):
+        invalidate_principal(email)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_changes(session):
+    session.info.pop("principal_changes", None)
+
+def require_token(credentials) -> str:
+    """Token from an optional (auto_error=False) HTTPBearer dependency; 401 when the request has none"""
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return credentials.credentials
+
+def require_admin_key(x_admin_key: Optional[str] = Header(None)):
+    """Dependency for /admin routes"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin API is disabled (ADMIN_API_KEY is not set)")
+    if x_admin_key is None or not secrets.compare_digest(x_admin_key, ADMIN_API_KEY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin key")
+
 def get_current_user(db: Session, token: str):
+    """Resolve the bearer token to a Principal; repeat calls within the cache TTL need no query"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -52,7 +343,13 @@ def get_current_user(db: Session, token: str):
     except JWTError:
         raise credentials_exception
     
-    user = crud.get_user_by_email(db, email=email)
+    user = load_principal(db, email)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Account is disabled. Please contact support.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
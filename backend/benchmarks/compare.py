@@ -0,0 +1,73 @@
+"""Compare two benchmarks.load_test result files.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Prints req/s and p50/p95/p99 per endpoint side by side with the relative change,
+and exits 1 when any endpoint's p95 (or the error count) got worse by more than
+--threshold percent, so it can gate a CI job. Endpoints with fewer than
+--min-requests samples in either run are shown but not gated; their percentiles
+are noise.
+"""
+import argparse
+import json
+
+def _change(before, after):
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+def _format(change):
+    return "" if change is None else f"{change:+.0f}%"
+
+def compare(baseline, candidate, threshold, metric="p95_ms", min_requests=50):
+    """Rows per endpoint plus the labels that regressed beyond threshold percent"""
+    rows, regressions = [], []
+    labels = list(baseline["endpoints"]) + [label for label in candidate["endpoints"] if label not in baseline["endpoints"]]
+    for label in labels + ["overall"]:
+        before = baseline["overall"] if label == "overall" else baseline["endpoints"].get(label)
+        after = candidate["overall"] if label == "overall" else candidate["endpoints"].get(label)
+        if before is None or after is None:
+            rows.append((label, before, after, None))
+            continue
+        change = _change(before[metric], after[metric])
+        rows.append((label, before, after, change))
+        if min(before["requests"], after["requests"]) < min_requests:
+            continue
+        if (change is not None and change > threshold) or after["errors"] > before["errors"]:
+            regressions.append(label)
+    return rows, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two load test result files per endpoint")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed p95 regression in percent")
+    parser.add_argument("--metric", default="p95_ms", choices=["p50_ms", "p95_ms", "p99_ms"])
+    parser.add_argument("--min-requests", type=int, default=50, help="gate only endpoints with at least this many samples")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    print(f"baseline  {baseline['meta'].get('git_commit')} {baseline['meta']['started_at']}  "
+          f"candidate {candidate['meta'].get('git_commit')} {candidate['meta']['started_at']}")
+    if baseline["meta"]["mix"] != candidate["meta"]["mix"] or baseline["meta"]["concurrency"] != candidate["meta"]["concurrency"]:
+        print("warning: the runs used different mixes or concurrency")
+
+    rows, regressions = compare(baseline, candidate, args.threshold, args.metric, args.min_requests)
+    print(f"{'endpoint':38} {'req/s':>15} {'p50 ms':>15} {'p95 ms':>15} {'p99 ms':>15} {'change':>7}")
+    for label, before, after, change in rows:
+        if before is None or after is None:
+            print(f"{label:38} {'only in ' + ('candidate' if before is None else 'baseline'):>15}")
+            continue
+        cells = [f"{before[key]!s:>6} -> {after[key]!s:<6}" for key in ("per_second", "p50_ms", "p95_ms", "p99_ms")]
+        flag = "  REGRESSED" if label in regressions else ""
+        print(f"{label:38} {' '.join(cells)} {_format(change):>7}{flag}")
+    if regressions:
+        print(f"{len(regressions)} endpoint(s) regressed more than {args.threshold:.0f}% on {args.metric}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
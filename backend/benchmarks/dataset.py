@@ -0,0 +1,161 @@
+"""Generate a synthetic catalog for the load test.
+
+Writes users, movies, actors, cast, ratings and watchlists straight into the
+configured database (DATABASE_URL; PostgreSQL or a SQLite file) in batches, then
+rebuilds the rating aggregates and popularity scores the same way
+`rating_aggregates.py repair` does. Run against a freshly migrated database:
+
+    python manage.py migrate
+    python -m benchmarks.dataset --users 2000 --movies 20000 --actors 8000 --ratings 300000 --watchlists 20000
+
+Every benchmark user shares PASSWORD (hashed once) so the load test can log in as
+any of them: bench-user-<n>@imdb-bench.com. The same --seed gives the same dataset.
+"""
+import argparse
+import random
+import time
+from sqlalchemy import insert, text
+from database import SessionLocal
+import auth
+import models
+import rating_aggregates
+from benchmarks.login_bench import PASSWORD
+
+EMAIL_TEMPLATE = "bench-user-{}@imdb-bench.com"
+COUNTRIES = ["US", "TR", "GB", "DE", "FR", "IN", "BR", "JP", None]
+
+# Titles and names are built from these so search and typeahead have realistic prefixes to match
+TITLE_WORDS = [
+    "dark", "night", "star", "love", "god", "man", "city", "last", "king", "war", "river", "ghost", "blood",
+    "house", "dream", "winter", "summer", "shadow", "fire", "road", "secret", "lost", "golden", "silent",
+    "storm", "heart", "queen", "island", "machine", "empire", "garden", "wolf", "ocean", "mountain", "light",
+]
+FIRST_NAMES = ["Anna", "Mehmet", "John", "Maria", "Ayse", "David", "Emma", "Can", "Lucas", "Sofia", "Elif", "James"]
+LAST_NAMES = ["Smith", "Yilmaz", "Garcia", "Kaya", "Brown", "Muller", "Demir", "Rossi", "Martin", "Sato", "Celik"]
+
+def _batched(db, table, rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.execute(insert(table), batch)
+            batch = []
+    if batch:
+        db.execute(insert(table), batch)
+
+def _skewed(rng, count):
+    """An id in 1..count, biased toward low ids the way traffic and ratings favour popular titles"""
+    return min(int(rng.paretovariate(1.2)), count) if rng.random() < 0.5 else rng.randint(1, count)
+
+def _title(rng):
+    return " ".join(rng.choice(TITLE_WORDS).capitalize() for _ in range(rng.randint(1, 4)))
+
+def users(rng, count, hashed_password):
+    for n in range(count):
+        yield {
+            "id": n + 1,
+            "email": EMAIL_TEMPLATE.format(n),
+            "hashed_password": hashed_password,
+            "country": rng.choice(COUNTRIES),
+            "is_active": True,
+        }
+
+def movies(rng, count):
+    for n in range(count):
+        title = _title(rng)
+        yield {
+            "id": n + 1,
+            "title": title,
+            "title_tr": f"{title} (TR)",
+            "summary": " ".join(rng.choices(TITLE_WORDS, k=25)),
+            "summary_tr": " ".join(rng.choices(TITLE_WORDS, k=25)),
+            "release_year": rng.randint(1950, 2025),
+            "duration": rng.randint(80, 200),
+            "imdb_score": round(rng.uniform(3, 9.5), 1),
+            "popularity_score": 0.0,
+            "view_count": int(rng.paretovariate(1.1) * 10),
+        }
+
+def actors(rng, count):
+    for n in range(count):
+        yield {"id": n + 1, "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {n}", "bio": _title(rng)}
+
+def cast(rng, movie_count, actor_count, per_movie):
+    for movie_id in range(1, movie_count + 1):
+        for actor_id in set(rng.randint(1, actor_count) for _ in range(per_movie)):
+            yield {"movie_id": movie_id, "actor_id": actor_id, "character_name": f"Role {actor_id}"}
+
+def _pairs(rng, count, user_count, movie_count):
+    """count distinct (user_id, movie_id) pairs, movies skewed toward popular ones"""
+    count = min(count, user_count * movie_count)
+    seen = set()
+    while len(seen) < count:
+        pair = (rng.randint(1, user_count), _skewed(rng, movie_count))
+        if pair not in seen:
+            seen.add(pair)
+            yield pair
+
+def ratings(rng, count, user_count, movie_count):
+    for user_id, movie_id in _pairs(rng, count, user_count, movie_count):
+        yield {
+            "user_id": user_id,
+            "movie_id": movie_id,
+            "rating": float(min(10, max(1, round(rng.gauss(7, 1.8))))),
+            "comment": _title(rng) if rng.random() < 0.3 else None,
+        }
+
+def watchlists(rng, count, user_count, movie_count):
+    for user_id, movie_id in _pairs(rng, count, user_count, movie_count):
+        yield {"user_id": user_id, "movie_id": movie_id}
+
+def generate(db, options):
+    rng = random.Random(options.seed)
+    if db.query(models.Movie.id).first() or db.query(models.User.id).first():
+        raise SystemExit("The database is not empty; generate into a freshly migrated (unseeded) database")
+
+    steps = [
+        ("users", models.User, users(rng, options.users, auth.get_password_hash(PASSWORD))),
+        ("movies", models.Movie, movies(rng, options.movies)),
+        ("actors", models.Actor, actors(rng, options.actors)),
+        ("cast", models.MovieActor, cast(rng, options.movies, options.actors, options.cast_size)),
+        ("ratings", models.Rating, ratings(rng, options.ratings, options.users, options.movies)),
+        ("watchlists", models.Watchlist, watchlists(rng, options.watchlists, options.users, options.movies)),
+    ]
+    for name, model, rows in steps:
+        started = time.perf_counter()
+        _batched(db, model.__table__, rows, options.batch_size)
+        db.commit()
+        print(f"{name}: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    started = time.perf_counter()
+    rating_aggregates.rebuild(db)
+    rating_aggregates.recompute_popularity(db)
+    db.commit()
+    print(f"aggregates: {(time.perf_counter() - started) * 1000:.0f} ms")
+    if db.get_bind().dialect.name == "postgresql":
+        # Explicit ids bypass the sequences; move them past the generated rows
+        for model in (models.User, models.Movie, models.Actor):
+            table = model.__tablename__
+            db.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+        db.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic catalog for benchmarks.load_test")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--movies", type=int, default=5000)
+    parser.add_argument("--actors", type=int, default=2000)
+    parser.add_argument("--cast-size", type=int, default=6, help="actors per movie")
+    parser.add_argument("--ratings", type=int, default=50000)
+    parser.add_argument("--watchlists", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    options = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        generate(db, options)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
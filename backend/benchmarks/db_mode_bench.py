@@ -0,0 +1,94 @@
+"""Compare the sync and async database modes at high concurrency.
+
+Start the same app twice, once per mode, both with the response cache disabled so
+requests reach the database, e.g.
+
+    CACHE_TTL_SECONDS=0 DB_MODE=sync  uvicorn main:app --port 8001
+    CACHE_TTL_SECONDS=0 DB_MODE=async uvicorn main:app --port 8002
+    python -m benchmarks.db_mode_bench --sync-url http://localhost:8001 --async-url http://localhost:8002
+
+Each mode gets the same mix of hot read routes (listing, detail, rating-stats,
+search) at every --concurrency level; requests/s and p50/p99 are reported per level.
+"""
+import argparse
+import asyncio
+import json
+import time
+import httpx
+from benchmarks.stats import summarize
+
+SEARCH_TERMS = ["the", "dark", "god", "star", "man", "love"]
+
+def _paths(movie_ids):
+    paths = []
+    for i, movie_id in enumerate(movie_ids):
+        paths.append(f"/movies?skip={i % 5}")
+        paths.append(f"/movies/{movie_id}")
+        paths.append(f"/movies/{movie_id}/rating-stats")
+        paths.append(f"/search?q={SEARCH_TERMS[i % len(SEARCH_TERMS)]}")
+    return paths
+
+async def _worker(client, paths, offset, deadline, latencies, errors):
+    i = offset
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+        except httpx.HTTPError:
+            errors.append(path)
+            continue
+        if response.status_code == 200:
+            latencies.append((time.perf_counter() - started) * 1000)
+        else:
+            errors.append(path)
+
+async def measure(base_url, concurrency, duration, warmup):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        movie_ids = [movie["id"] for movie in (await client.get("/movies", params={"limit": 50})).json()] or [1]
+        paths = _paths(movie_ids)
+
+        # Warm connections, the search index and the per-worker caches before measuring
+        await asyncio.gather(*[_worker(client, paths, n, time.perf_counter() + warmup, [], []) for n in range(concurrency)])
+
+        latencies, errors = [], []
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[_worker(client, paths, n, deadline, latencies, errors) for n in range(concurrency)])
+        return summarize(latencies, time.perf_counter() - started, len(errors))
+
+async def run(targets, levels, duration, warmup):
+    results = {}
+    for mode, base_url in targets.items():
+        results[mode] = {}
+        for concurrency in levels:
+            results[mode][concurrency] = await measure(base_url, concurrency, duration, warmup)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Requests/s and tail latency of DB_MODE=sync vs DB_MODE=async")
+    parser.add_argument("--sync-url", default="http://localhost:8001")
+    parser.add_argument("--async-url", default="http://localhost:8002")
+    parser.add_argument("--concurrency", default="50,200,500", help="comma-separated client concurrency levels")
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    targets = {"sync": args.sync_url, "async": args.async_url}
+    results = asyncio.run(run(targets, levels, args.duration, args.warmup))
+
+    print(f"{'mode':6} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for concurrency in levels:
+        for mode in targets:
+            row = results[mode][concurrency]
+            print(f"{mode:6} {concurrency:>5} {row['per_second']:>8} {row['p50_ms']:>8} {row['p99_ms']:>8} {row['errors']:>7}")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""End-to-end load test: a weighted mix of user journeys against every public route.
+
+Generate a dataset first (benchmarks.dataset), start the app, then e.g.
+
+    python -m benchmarks.load_test --base-url http://localhost:8000 --concurrency 50 --duration 60 --json run.json
+    python -m benchmarks.compare baseline.json run.json
+
+Each virtual user logs in as one of the dataset's bench users and keeps picking a
+journey by weight (--mix, e.g. "browse=30,detail=30,typeahead=20,rate=8,watchlist=7,session=4,signup=1"):
+
+    browse     /movies, /movies/ranked and its next page
+    detail     /movies/{id}, rating-stats, the next review page, an actor from the cast
+    typeahead  /suggest for a growing prefix, then /search for the word
+    rate       POST /movies/{id}/rate (new rating or an update of an earlier one)
+    watchlist  add a movie, read /me/watchlist, remove an entry
+    session    /auth/refresh, occasionally a full /login (bcrypt)
+    signup     /register, /login, /upload-photo, /auth/logout
+
+Movies are picked with a popularity skew, so caches see a realistic hit rate.
+Throughput and p50/p95/p99 are reported per endpoint (method + route template)
+and overall; the JSON file also keeps the run settings and the server's cache,
+pool and hashing counters, so runs can be compared (the pool and startup reports
+need --admin-key or ADMIN_API_KEY). Google sign-in is not driven:
+it needs tokens signed by Google.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import uuid
+import httpx
+from benchmarks.stats import summarize
+from benchmarks.login_bench import PASSWORD
+from benchmarks.dataset import EMAIL_TEMPLATE, TITLE_WORDS
+
+DEFAULT_MIX = "browse=30,detail=30,typeahead=20,rate=8,watchlist=7,session=4,signup=1"
+
+# A 1x1 PNG for /upload-photo
+PHOTO = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+
+class Recorder:
+    """Latencies and errors per endpoint label"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.recording = False
+
+    async def call(self, client, label, method, path, ok=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if self.recording:
+            if response is not None and response.status_code in ok:
+                self.latencies.setdefault(label, []).append(elapsed_ms)
+            else:
+                self.errors[label] = self.errors.get(label, 0) + 1
+        return response
+
+    def summary(self, elapsed_seconds):
+        labels = sorted(self.latencies.keys() | self.errors.keys())
+        endpoints = {
+            label: summarize(self.latencies.get(label, []), elapsed_seconds, self.errors.get(label, 0))
+            for label in labels
+        }
+        every = [latency for latencies in self.latencies.values() for latency in latencies]
+        return endpoints, summarize(every, elapsed_seconds, sum(self.errors.values()))
+
+class VirtualUser:
+    def __init__(self, client, recorder, catalog, email, rng):
+        self.client = client
+        self.recorder = recorder
+        self.catalog = catalog
+        self.email = email
+        self.rng = rng
+        self.headers = {}
+        self.refresh_token = None
+        self.rated = []
+
+    def _movie_id(self):
+        # Popularity skew: most traffic goes to the head of the ranking
+        ids = self.catalog["movie_ids"]
+        index = min(int(self.rng.paretovariate(1.1)) - 1, len(ids) - 1) if self.rng.random() < 0.7 else self.rng.randrange(len(ids))
+        return ids[index]
+
+    def _lang(self):
+        return "tr" if self.rng.random() < 0.2 else "en"
+
+    async def _call(self, label, method, path, ok=(200,), **kwargs):
+        return await self.recorder.call(self.client, label, method, path, ok=ok, **kwargs)
+
+    async def _login(self, email):
+        response = await self._call("POST /login", "POST", "/login", json={"email": email, "password": PASSWORD})
+        if response is not None and response.status_code == 200:
+            body = response.json()
+            self.headers = {"Authorization": f"Bearer {body['access_token']}"}
+            self.refresh_token = body.get("refresh_token")
+        return response
+
+    async def browse(self):
+        await self._call("GET /movies", "GET", "/movies", params={"skip": self.rng.randrange(0, 100, 20), "lang": self._lang()})
+        response = await self._call("GET /movies/ranked", "GET", "/movies/ranked", params={"lang": self._lang()})
+        if response is not None and response.status_code == 200 and response.json().get("next_cursor"):
+            await self._call("GET /movies/ranked", "GET", "/movies/ranked", params={"cursor": response.json()["next_cursor"]})
+
+    async def detail(self):
+        movie_id = self._movie_id()
+        response = await self._call("GET /movies/{movie_id}", "GET", f"/movies/{movie_id}", params={"lang": self._lang()})
+        stats = await self._call("GET /movies/{movie_id}/rating-stats", "GET", f"/movies/{movie_id}/rating-stats")
+        if stats is not None and stats.status_code == 200 and stats.json().get("next_cursor"):
+            await self._call("GET /movies/{movie_id}/ratings", "GET", f"/movies/{movie_id}/ratings",
+                             params={"cursor": stats.json()["next_cursor"]})
+        if response is not None and response.status_code == 200 and self.rng.random() < 0.3:
+            cast = response.json().get("actors") or []
+            if cast:
+                actor = self.rng.choice(cast)["actor"]
+                await self._call("GET /actors/{actor_id}", "GET", f"/actors/{actor['id']}")
+
+    async def typeahead(self):
+        word = self.rng.choice(TITLE_WORDS)
+        for length in range(2, min(len(word), 5) + 1):
+            await self._call("GET /suggest", "GET", "/suggest", params={"q": word[:length], "lang": self._lang()})
+        await self._call("GET /search", "GET", "/search", params={"q": word, "lang": self._lang()})
+
+    async def rate(self):
+        movie_id = self.rng.choice(self.rated) if self.rated and self.rng.random() < 0.3 else self._movie_id()
+        body = {"rating": self.rng.randint(1, 10), "comment": "bench" if self.rng.random() < 0.3 else None}
+        response = await self._call("POST /movies/{movie_id}/rate", "POST", f"/movies/{movie_id}/rate", json=body, headers=self.headers)
+        if response is not None and response.status_code == 200:
+            self.rated.append(movie_id)
+
+    async def watchlist(self):
+        movie_id = self._movie_id()
+        # 400 is the API's answer for a movie already on the list
+        await self._call("POST /movies/{movie_id}/watchlist", "POST", f"/movies/{movie_id}/watchlist",
+                         ok=(200, 400), headers=self.headers)
+        response = await self._call("GET /me/watchlist", "GET", "/me/watchlist", headers=self.headers)
+        if response is not None and response.status_code == 200 and response.json() and self.rng.random() < 0.5:
+            item = self.rng.choice(response.json())
+            await self._call("DELETE /watchlist/{watchlist_id}", "DELETE", f"/watchlist/{item['id']}", headers=self.headers)
+
+    async def session(self):
+        if self.refresh_token and self.rng.random() < 0.8:
+            response = await self._call("POST /auth/refresh", "POST", "/auth/refresh", json={"refresh_token": self.refresh_token})
+            if response is not None and response.status_code == 200:
+                body = response.json()
+                self.headers = {"Authorization": f"Bearer {body['access_token']}"}
+                self.refresh_token = body["refresh_token"]
+                return
+        await self._login(self.email)
+
+    async def signup(self):
+        email = f"bench-signup-{uuid.uuid4().hex[:12]}@imdb-bench.com"
+        response = await self._call("POST /register", "POST", "/register", json={"email": email, "password": PASSWORD})
+        if response is None or response.status_code != 200:
+            return
+        # Sign in as the new account, then go back to the bench user's session
+        saved = self.headers, self.refresh_token
+        await self._login(email)
+        await self._call("POST /upload-photo", "POST", "/upload-photo", headers=self.headers,
+                         files={"file": ("avatar.png", PHOTO, "image/png")})
+        await self._call("POST /auth/logout", "POST", "/auth/logout", json={"refresh_token": self.refresh_token})
+        self.headers, self.refresh_token = saved
+
+    async def run(self, journeys, weights, deadline):
+        while time.perf_counter() < deadline:
+            journey = self.rng.choices(journeys, weights)[0]
+            await getattr(self, journey)()
+
+JOURNEYS = ("browse", "detail", "typeahead", "rate", "watchlist", "session", "signup")
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in JOURNEYS:
+            raise SystemExit(f"Unknown journey {name!r}; choose from {', '.join(JOURNEYS)}")
+        weights[name] = float(weight)
+    return weights
+
+async def _discover(client, movie_pool):
+    """Movie ids in ranking order, from the public listing"""
+    movie_ids, cursor = [], None
+    while len(movie_ids) < movie_pool:
+        page = (await client.get("/movies/ranked", params={"cursor": cursor, "limit": 100} if cursor else {"limit": 100})).json()
+        movie_ids.extend(movie["id"] for movie in page["movies"])
+        cursor = page.get("next_cursor")
+        if not cursor:
+            break
+    if not movie_ids:
+        raise SystemExit("No movies found; generate a dataset first (python -m benchmarks.dataset)")
+    return movie_ids[:movie_pool]
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+async def run(options):
+    weights = parse_mix(options.mix)
+    journeys = list(weights)
+    limits = httpx.Limits(max_connections=options.concurrency + 4, max_keepalive_connections=options.concurrency + 4)
+    async with httpx.AsyncClient(base_url=options.base_url, timeout=60, limits=limits) as client:
+        catalog = {"movie_ids": await _discover(client, options.movie_pool)}
+        recorder = Recorder()
+        users = [
+            VirtualUser(client, recorder, catalog, EMAIL_TEMPLATE.format(n % options.bench_users), random.Random(options.seed + n))
+            for n in range(options.concurrency)
+        ]
+        # Sessions are set up outside the measurement so bcrypt does not dominate the first seconds
+        for start in range(0, len(users), 16):
+            await asyncio.gather(*[user._login(user.email) for user in users[start:start + 16]])
+        if not any(user.headers for user in users):
+            raise SystemExit("Could not log in as the bench users; generate the dataset with benchmarks.dataset")
+
+        await asyncio.gather(*[user.run(journeys, list(weights.values()), time.perf_counter() + options.warmup) for user in users])
+
+        recorder.recording = True
+        started = time.perf_counter()
+        deadline = started + options.duration
+        await asyncio.gather(*[user.run(journeys, list(weights.values()), deadline) for user in users])
+        elapsed = time.perf_counter() - started
+        recorder.recording = False
+
+        server = {}
+        # The /debug reports need the admin key; without one they are left out
+        admin = {"X-Admin-Key": options.admin_key} if options.admin_key else {}
+        for name, path in (("cache", "/cache/stats"), ("pool", "/debug/pool"), ("hashing", "/auth/hashing/stats"),
+                           ("suggest", "/suggest/stats"), ("startup", "/debug/startup")):
+            response = await client.get(path, headers=admin)
+            server[name] = response.json() if response.status_code == 200 else None
+
+    endpoints, overall = recorder.summary(elapsed)
+    return {
+        "meta": {
+            "base_url": options.base_url,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "concurrency": options.concurrency,
+            "duration_seconds": round(elapsed, 2),
+            "mix": weights,
+            "seed": options.seed,
+            "movie_pool": len(catalog["movie_ids"]),
+        },
+        "overall": overall,
+        "endpoints": endpoints,
+        "server": server,
+    }
+
+def print_table(results):
+    print(f"{'endpoint':38} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    rows = list(results["endpoints"].items()) + [("overall", results["overall"])]
+    for label, row in rows:
+        print(f"{label:38} {row['per_second']:>8} {row['p50_ms']!s:>8} {row['p95_ms']!s:>8} {row['p99_ms']!s:>8} {row['errors']:>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Weighted end-to-end load test with per-endpoint latency percentiles")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="journey=weight pairs")
+    parser.add_argument("--bench-users", type=int, default=100, help="how many of the dataset's bench users to log in as")
+    parser.add_argument("--movie-pool", type=int, default=1000, help="most popular movies the journeys pick from")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--admin-key", default=os.getenv("ADMIN_API_KEY"), help="X-Admin-Key for the /debug reports")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    options = parser.parse_args()
+
+    results = asyncio.run(run(options))
+    print_table(results)
+    if options.json_path:
+        with open(options.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Login throughput under concurrent catalog traffic.
+
+Registers a pool of benchmark users, then for --duration seconds runs --logins
+concurrent login loops next to --browsers concurrent loops reading /movies and
+/movies/{id}. Reports logins/s with p50/p99 latency, and the catalog latency the
+hashing load causes; the server's /auth/hashing/stats is included for queue depth.
+
+    python -m benchmarks.login_bench --base-url http://localhost:8000 --logins 32 --browsers 16
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+import httpx
+from benchmarks.stats import summarize
+
+PASSWORD = "Bench-password!1"
+
+async def _register_users(client, count):
+    prefix = uuid.uuid4().hex[:8]
+    emails = [f"bench-{prefix}-{i}@imdb-bench.com" for i in range(count)]
+    for email in emails:
+        response = await client.post("/register", json={"email": email, "password": PASSWORD})
+        response.raise_for_status()
+    return emails
+
+async def _login_loop(client, email, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.post("/login", json={"email": email, "password": PASSWORD})
+        if response.status_code == 200:
+            latencies.append((time.perf_counter() - started) * 1000)
+        else:
+            errors.append(response.status_code)
+
+async def _catalog_loop(client, movie_ids, deadline, latencies, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        path = "/movies" if i % 2 == 0 else f"/movies/{movie_ids[i % len(movie_ids)]}"
+        i += 1
+        started = time.perf_counter()
+        response = await client.get(path)
+        if response.status_code == 200:
+            latencies.append((time.perf_counter() - started) * 1000)
+        else:
+            errors.append(response.status_code)
+
+async def run(base_url, logins, browsers, duration):
+    limits = httpx.Limits(max_connections=logins + browsers + 4)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        emails = await _register_users(client, logins)
+        movies = (await client.get("/movies")).json()
+        movie_ids = [movie["id"] for movie in movies] or [1]
+
+        login_latencies, login_errors = [], []
+        catalog_latencies, catalog_errors = [], []
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(
+            *[_login_loop(client, email, deadline, login_latencies, login_errors) for email in emails],
+            *[_catalog_loop(client, movie_ids, deadline, catalog_latencies, catalog_errors) for _ in range(browsers)],
+        )
+        elapsed = time.perf_counter() - started
+        hashing = (await client.get("/auth/hashing/stats")).json()
+
+    return {
+        "base_url": base_url,
+        "duration_seconds": round(elapsed, 2),
+        "concurrency": {"logins": logins, "browsers": browsers},
+        "logins": summarize(login_latencies, elapsed, len(login_errors)),
+        "catalog": summarize(catalog_latencies, elapsed, len(catalog_errors)),
+        "rejected_logins": login_errors.count(503),
+        "hashing": hashing,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure login throughput and catalog latency under a login burst")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--logins", type=int, default=32, help="concurrent login loops (one user each)")
+    parser.add_argument("--browsers", type=int, default=16, help="concurrent catalog readers")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of measured load")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.base_url, args.logins, args.browsers, args.duration))
+    for name in ("logins", "catalog"):
+        row = results[name]
+        print(f"{name:8} {row['per_second']}/s  p50 {row['p50_ms']} ms  p99 {row['p99_ms']} ms  errors {row['errors']}")
+    hashing = results["hashing"]
+    print(f"hashing  peak in flight {hashing['peak_in_flight']}  rejected {hashing['rejected']}  "
+          f"avg wait {hashing['avg_wait_ms']} ms  avg hash {hashing['avg_hash_ms']} ms")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Cost of the request metrics on the hot path, measured in-process.
+
+    python -m benchmarks.metrics_overhead --requests 20000
+
+Reports three numbers, each in microseconds:
+
+- record: the bookkeeping MetricsRoute does per request (in-flight inc/dec,
+  histogram observe, counter inc), timed in a tight loop
+- per request: the same trivial route served through the ASGI stack, as a plain
+  APIRoute and as a MetricsRoute in alternating rounds (best round each); the
+  difference is what a real request pays
+- render: one /metrics scrape with a registry the size of the app's
+  (--handlers routes x a few status codes)
+
+No database or server is needed; the numbers isolate the instrumentation.
+"""
+import argparse
+import asyncio
+import json
+import time
+import httpx
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+import metrics
+import route_metrics
+
+def _record_cost(iterations):
+    # The same bound updates MetricsRoute makes
+    label = "GET /movies/{movie_id}"
+    in_flight = route_metrics.in_flight.labels(handler=label)
+    duration = route_metrics.request_duration.labels(handler=label)
+    totals = {200: route_metrics.requests_total.labels(handler=label, status=200)}
+    started = time.perf_counter()
+    for _ in range(iterations):
+        in_flight.inc()
+        duration.observe(0.0042)
+        totals[200].inc()
+        in_flight.dec()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def _app(route_class):
+    app = FastAPI()
+    app.router.route_class = route_class
+
+    # async: a threadpool hop would add more jitter than the metrics cost
+    @app.get("/movies/{movie_id}")
+    async def movie(movie_id: int):
+        return {"id": movie_id, "title": "Benchmark"}
+
+    return app
+
+async def _per_request(route_class, requests):
+    transport = httpx.ASGITransport(app=_app(route_class))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for movie_id in range(200):
+            await client.get(f"/movies/{movie_id}")
+        started = time.perf_counter()
+        for n in range(requests):
+            await client.get(f"/movies/{n}")
+        return (time.perf_counter() - started) / requests * 1e6
+
+def _render_cost(handlers, scrapes):
+    for n in range(handlers):
+        label = f"GET /bench/{n}/{{id}}"
+        for status in (200, 304, 404):
+            route_metrics.requests_total.inc(handler=label, status=status)
+        route_metrics.request_duration.observe(0.01, handler=label)
+        route_metrics.in_flight.inc(handler=label)
+    body = metrics.render()
+    started = time.perf_counter()
+    for _ in range(scrapes):
+        metrics.render()
+    return (time.perf_counter() - started) / scrapes * 1e6, len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-request cost of route metrics")
+    parser.add_argument("--requests", type=int, default=20000, help="requests per variant")
+    parser.add_argument("--rounds", type=int, default=5, help="alternating rounds per variant")
+    parser.add_argument("--handlers", type=int, default=40, help="routes to populate before timing /metrics")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    # Alternate the variants and keep each one's best round, so drift and warm-up favour neither
+    rounds = {APIRoute: [], route_metrics.MetricsRoute: []}
+    for _ in range(args.rounds):
+        for route_class, timings in rounds.items():
+            timings.append(asyncio.run(_per_request(route_class, args.requests // args.rounds)))
+    plain, instrumented = min(rounds[APIRoute]), min(rounds[route_metrics.MetricsRoute])
+    render_us, render_bytes = _render_cost(args.handlers, 50)
+    results = {
+        "record_us": round(_record_cost(args.requests * 5), 2),
+        "plain_route_us": round(plain, 1),
+        "metrics_route_us": round(instrumented, 1),
+        "overhead_us": round(instrumented - plain, 1),
+        "overhead_percent": round((instrumented - plain) / plain * 100, 1),
+        "render_us": round(render_us, 1),
+        "render_bytes": render_bytes,
+    }
+    print(f"record {results['record_us']} us/request")
+    print(f"route  plain {results['plain_route_us']} us, with metrics {results['metrics_route_us']} us "
+          f"({results['overhead_us']:+} us, {results['overhead_percent']:+}%)")
+    print(f"render {results['render_us']} us for {render_bytes} bytes ({args.handlers} handlers)")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Movie page load: /movies/{id}/page against the two calls it replaces.
+
+Start the app (and generate a dataset first, benchmarks.dataset), then e.g.
+
+    python -m benchmarks.movie_page_bench --base-url http://localhost:8000 --concurrency 1,20,100
+
+A page load is either the two-call sequence the movie page used to make
+(/movies/{id}, then /movies/{id}/rating-stats once it returned) or a single
+/movies/{id}/page. Both variants run over the same popular movies at every
+--concurrency level, in alternating rounds so warm-up and drift favour neither;
+page loads/s, p50/p95/p99 of the whole load and the SQL statements per load
+(from the Server-Timing headers) are reported per level.
+
+Run it once with the response cache on (the usual case: the detail is cached) and
+once against an app started with CACHE_TTL_SECONDS=0 to see the cold path.
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+import httpx
+from benchmarks.stats import summarize
+
+_QUERIES = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+def _queries(response):
+    match = _QUERIES.search(response.headers.get("server-timing", ""))
+    return int(match.group(1)) if match else 0
+
+async def _two_calls(client, movie_id):
+    detail = await client.get(f"/movies/{movie_id}")
+    stats = await client.get(f"/movies/{movie_id}/rating-stats")
+    return detail.status_code == 200 and stats.status_code == 200, _queries(detail) + _queries(stats)
+
+async def _page(client, movie_id):
+    page = await client.get(f"/movies/{movie_id}/page")
+    return page.status_code == 200, _queries(page)
+
+VARIANTS = {"two_calls": _two_calls, "page": _page}
+
+async def _worker(client, load, movie_ids, offset, deadline, latencies, queries, errors):
+    i = offset
+    while time.perf_counter() < deadline:
+        movie_id = movie_ids[i % len(movie_ids)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            ok, statements = await load(client, movie_id)
+        except httpx.HTTPError:
+            ok, statements = False, 0
+        if ok:
+            latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(statements)
+        else:
+            errors.append(movie_id)
+
+async def measure(client, load, movie_ids, concurrency, duration):
+    latencies, queries, errors = [], [], []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*[
+        _worker(client, load, movie_ids, n, deadline, latencies, queries, errors) for n in range(concurrency)
+    ])
+    return latencies, queries, errors, time.perf_counter() - started
+
+async def run(base_url, levels, duration, rounds, warmup, movies):
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=httpx.Limits(max_connections=max(levels))) as client:
+        movie_ids = [movie["id"] for movie in (await client.get("/movies", params={"limit": movies})).json()] or [1]
+        for load in VARIANTS.values():
+            await measure(client, load, movie_ids, max(levels), warmup)
+
+        for concurrency in levels:
+            samples = {name: ([], [], [], 0.0) for name in VARIANTS}
+            for _ in range(rounds):
+                for name, load in VARIANTS.items():
+                    latencies, queries, errors, elapsed = await measure(client, load, movie_ids, concurrency, duration / rounds)
+                    all_latencies, all_queries, all_errors, total = samples[name]
+                    all_latencies.extend(latencies)
+                    all_queries.extend(queries)
+                    all_errors.extend(errors)
+                    samples[name] = (all_latencies, all_queries, all_errors, total + elapsed)
+            results[concurrency] = {
+                name: {
+                    **summarize(latencies, elapsed, len(errors)),
+                    "queries_per_load": round(sum(queries) / len(queries), 2) if queries else None,
+                }
+                for name, (latencies, queries, errors, elapsed) in samples.items()
+            }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of /movies/{id}/page vs /movies/{id} + rating-stats")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", default="1,20,100", help="comma-separated client concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per variant and level")
+    parser.add_argument("--rounds", type=int, default=5, help="alternating rounds the duration is split into")
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--movies", type=int, default=50, help="most popular movies to load pages for")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = asyncio.run(run(args.base_url, levels, args.duration, args.rounds, args.warmup, args.movies))
+
+    print(f"{'variant':10} {'conc':>5} {'loads/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7}")
+    for concurrency in levels:
+        for name, row in results[concurrency].items():
+            print(f"{name:10} {concurrency:>5} {row['per_second']:>8} {row['p50_ms']:>8} {row['p95_ms']:>8} "
+                  f"{row['p99_ms']:>8} {row['queries_per_load']!s:>8} {row['errors']:>7}")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
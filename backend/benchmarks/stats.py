@@ -0,0 +1,24 @@
+import math
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers (None when empty)"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize(latencies_ms, elapsed_seconds, errors=0):
+    """Throughput and latency percentiles for one kind of request"""
+    return {
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "per_second": round(len(latencies_ms) / elapsed_seconds, 1) if elapsed_seconds else None,
+        "p50_ms": _round(percentile(latencies_ms, 50)),
+        "p95_ms": _round(percentile(latencies_ms, 95)),
+        "p99_ms": _round(percentile(latencies_ms, 99)),
+        "max_ms": _round(max(latencies_ms) if latencies_ms else None),
+    }
+
+def _round(value):
+    return None if value is None else round(value, 2)
@@ -0,0 +1,245 @@
+import asyncio
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+import metrics
+
+try:
+    import redis
+except ImportError:  # optional, only needed for CACHE_BACKEND=redis
+    redis = None
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+# Namespace versions kept per worker (one per invalidated movie); older ones are pruned
+CACHE_MAX_VERSIONS = int(os.getenv("CACHE_MAX_VERSIONS", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+MISSING = object()
+
+class LRUCache:
+    """In-process LRU with per-entry expiry, bounded by entry count"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_versions=CACHE_MAX_VERSIONS):
+        self.max_entries = max_entries
+        self.max_versions = max_versions
+        self.evictions = 0
+        self._data = OrderedDict()
+        # Versions come from one counter and are never reused; namespaces without their
+        # own (never bumped, or pruned) share _base_version
+        self._versions = OrderedDict()
+        self._generation = 0
+        self._base_version = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return MISSING
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def version(self, namespace):
+        return self._versions.get(namespace, self._base_version)
+
+    def bump(self, namespace):
+        # Versions are kept outside the LRU: evicting one would resurrect stale entries
+        with self._lock:
+            self._generation += 1
+            self._versions[namespace] = self._generation
+            self._versions.move_to_end(namespace)
+            if len(self._versions) > self.max_versions:
+                # Forget the least recently bumped half. Raising the shared base version past
+                # every version handed out so far moves them (and never-bumped namespaces) to
+                # keys no entry was stored under: a round of misses, never a stale hit.
+                for _ in range(len(self._versions) - self.max_versions // 2):
+                    self._versions.popitem(last=False)
+                self._generation += 1
+                self._base_version = self._generation
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._versions.clear()
+            self._generation += 1
+            self._base_version = self._generation
+
+    def size(self):
+        return len(self._data)
+
+class RedisCache:
+    """Redis-compatible backend; entries and namespace versions are shared by all workers"""
+
+    def __init__(self, url=REDIS_URL, prefix="imdb:"):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.evictions = 0
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return MISSING if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value), px=int(ttl * 1000))
+
+    def version(self, namespace):
+        raw = self.client.get(f"{self.prefix}v:{namespace}")
+        return 0 if raw is None else int(raw)
+
+    def bump(self, namespace):
+        self.client.incr(f"{self.prefix}v:{namespace}")
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+    def size(self):
+        return None
+
+class ResponseCache:
+    """Read-through cache with namespace invalidation and single-flight loading.
+
+    Keys live in namespaces ("movie:12", "movies", "actors") whose version is part of
+    every key, so invalidating a namespace is one counter bump no matter how many
+    keys (pages, languages) it covers; the stale entries simply age out of the LRU.
+    """
+
+    def __init__(self, backend, ttl=CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._inflight_async = {}
+
+    def key(self, namespace, *parts):
+        return ":".join([namespace, str(self.backend.version(namespace))] + [str(part) for part in parts])
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.bump(namespace)
+            self.invalidations += 1
+
+    def get_or_load(self, namespace, parts, loader, ttl=None):
+        """Return the cached value or call loader() once per key, however many requests miss at the same time"""
+        key = self.key(namespace, *parts)
+        value = self.backend.get(key)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+
+        with self._inflight_lock:
+            waiter = self._inflight.get(key)
+            if waiter is None:
+                waiter = self._inflight[key] = {"event": threading.Event(), "value": None, "error": None}
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            self.coalesced += 1
+            waiter["event"].wait()
+            if waiter["error"] is not None:
+                raise waiter["error"]
+            return waiter["value"]
+
+        self.misses += 1
+        try:
+            value = loader()
+            # None means "not found": not worth caching, the route turns it into a 404
+            if value is not None:
+                self.backend.set(key, value, ttl or self.ttl)
+            waiter["value"] = value
+            return value
+        except Exception as e:
+            waiter["error"] = e
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            waiter["event"].set()
+
+    async def get_or_load_async(self, namespace, parts, loader, ttl=None):
+        """get_or_load for coroutine loaders; concurrent misses on the event loop await one load"""
+        key = self.key(namespace, *parts)
+        value = self.backend.get(key)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+
+        future = self._inflight_async.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: a waiter's client disconnecting must not cancel the shared load
+            return await asyncio.shield(future)
+
+        future = self._inflight_async[key] = asyncio.get_running_loop().create_future()
+        self.misses += 1
+        try:
+            value = await loader()
+            if value is not None:
+                self.backend.set(key, value, ttl or self.ttl)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            # Mark it retrieved, there may be no waiters to do so
+            future.exception()
+            raise
+        finally:
+            self._inflight_async.pop(key, None)
+            if not future.done():
+                future.cancel()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "invalidations": self.invalidations,
+            "evictions": self.backend.evictions,
+            "entries": self.backend.size(),
+            "ttl_seconds": self.ttl
+        }
+
+response_cache = ResponseCache(RedisCache() if CACHE_BACKEND == "redis" else LRUCache())
+
+metrics.callback(
+    "response_cache_lookups_total", "Response cache lookups; coalesced ones waited for another request's load",
+    lambda: {"hit": response_cache.hits, "miss": response_cache.misses, "coalesced": response_cache.coalesced},
+    kind="counter", labelnames=("result",)
+)
+metrics.callback("response_cache_invalidations_total", "Namespace invalidations", lambda: response_cache.invalidations, kind="counter")
+metrics.callback("response_cache_evictions_total", "Entries evicted by the LRU bound", lambda: response_cache.backend.evictions, kind="counter")
+metrics.callback("response_cache_entries", "Entries in this worker's cache", lambda: response_cache.backend.size())
@@ -0,0 +1,70 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+import models
+
+# Columns that in-process catalog structures (search index, suggestions) care about
+WATCHED_COLUMNS = {
+    "movie": ("title", "title_tr", "summary", "summary_tr", "release_year", "image_url", "popularity_score"),
+    "actor": ("name", "photo_url"),
+}
+
+_subscribers = []
+
+def subscribe(callback):
+    """Register callback(kind, action, data) to run after a commit that changed a movie or actor"""
+    _subscribers.append(callback)
+    return callback
+
+def publish(kind, action, data):
+    """Notify subscribers directly, e.g. after Core-level bulk writes that bypass the ORM"""
+    for callback in _subscribers:
+        try:
+            callback(kind, action, data)
+        except Exception as e:
+            print(f"Catalog subscriber failed for {kind} {data.get('id')}: {e}")
+
+def _kind(obj):
+    if isinstance(obj, models.Movie):
+        return "movie"
+    if isinstance(obj, models.Actor):
+        return "actor"
+    return None
+
+def _snapshot(kind, obj):
+    data = {"id": obj.id}
+    for column in WATCHED_COLUMNS[kind]:
+        data[column] = getattr(obj, column)
+    return data
+
+def _changed(kind, obj):
+    state = inspect(obj)
+    return any(state.attrs[column].history.has_changes() for column in WATCHED_COLUMNS[kind])
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    # Snapshot plain values now: after commit the instances are expired
+    pending = session.info.setdefault("catalog_changes", {})
+    for obj in session.new:
+        kind = _kind(obj)
+        if kind:
+            pending[(kind, obj.id)] = ("upsert", _snapshot(kind, obj))
+    for obj in session.dirty:
+        kind = _kind(obj)
+        if kind and _changed(kind, obj):
+            pending[(kind, obj.id)] = ("upsert", _snapshot(kind, obj))
+    for obj in session.deleted:
+        kind = _kind(obj)
+        if kind:
+            pending[(kind, obj.id)] = ("delete", {"id": obj.id})
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_changes(session):
+    pending = session.info.pop("catalog_changes", None)
+    if not pending:
+        return
+    for (kind, _), (action, data) in pending.items():
+        publish(kind, action, data)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("catalog_changes", None)
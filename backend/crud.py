@@ -1,9 +1,32 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, or_, desc
+import os
+import threading
+import time
+from sqlalchemy.orm import Session, joinedload, selectinload
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func, or_, desc, case, cast, delete, literal, select, tuple_, update, Integer
 from fastapi import HTTPException
 import models
+from database import dialect_insert
 import schemas
 import auth
+from search_index import catalog_index
+from cache import response_cache
+import catalog_events
+from view_buffer import view_buffer
+from pagination import encode_cursor, decode_cursor
+
+RATING_STATS_CACHE_SECONDS = float(os.getenv("RATING_STATS_CACHE_SECONDS", "30"))
+# Largest /movies and /movies/ranked page
+MAX_MOVIES_PAGE_SIZE = 100
+RATINGS_PAGE_SIZE = int(os.getenv("RATINGS_PAGE_SIZE", "20"))
+MAX_RATINGS_PAGE_SIZE = 100
+# Newest reviews embedded in the movie detail; further ones come from /movies/{id}/ratings
+MOVIE_DETAIL_RATINGS = min(int(os.getenv("MOVIE_DETAIL_RATINGS", "5")), MAX_RATINGS_PAGE_SIZE)
+# Most ids one /movies/batch or /actors/batch request resolves (one IN list)
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "200"))
+# Largest id a BIGINT column (and the database driver) accepts
+MAX_ID = 2**63 - 1
 
 def get_user(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
@@ -11,8 +34,8 @@ def get_user(db: Session, user_id: int):
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = auth.get_password_hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str = None):
+    hashed_password = hashed_password or auth.get_password_hash(user.password)
     db_user = models.User(
         email=user.email,
         hashed_password=hashed_password,
@@ -25,6 +48,10 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.refresh(db_user)
     return db_user
 
+def update_password_hash(db: Session, db_user: models.User, hashed_password: str):
+    db_user.hashed_password = hashed_password
+    db.commit()
+
 def create_google_user(db: Session, user_info: dict):
     """Create a new user from Google OAuth info"""
     db_user = models.User(
@@ -38,28 +65,51 @@ def create_google_user(db: Session, user_info: dict):
     db.refresh(db_user)
     return db_user
 
+def movie_to_dict(movie, lang: str = "en"):
+    """Response dict in the requested language without modifying the database object"""
+    return {
+        "id": movie.id,
+        "title": movie.title_tr if (lang == "tr" and movie.title_tr) else movie.title,
+        "summary": movie.summary_tr if (lang == "tr" and movie.summary_tr) else movie.summary,
+        "release_year": movie.release_year,
+        "duration": movie.duration,
+        "image_url": movie.image_url,
+        "trailer_url": movie.trailer_url,
+        "imdb_score": movie.imdb_score,
+        "popularity_score": movie.popularity_score,
+        "view_count": movie.view_count,
+        "created_at": movie.created_at
+    }
+
 def get_movies(db: Session, skip: int = 0, limit: int = 20, lang: str = "en"):
-    movies = db.query(models.Movie).order_by(desc(models.Movie.popularity_score)).offset(skip).limit(limit).all()
+    movies = db.query(models.Movie).order_by(
+        desc(models.Movie.popularity_score), desc(models.Movie.id)
+    ).offset(skip).limit(limit).all()
     
-    # Create response with appropriate language without modifying database objects
-    result = []
-    for movie in movies:
-        movie_dict = {
-            "id": movie.id,
-            "title": movie.title_tr if (lang == "tr" and movie.title_tr) else movie.title,
-            "summary": movie.summary_tr if (lang == "tr" and movie.summary_tr) else movie.summary,
-            "release_year": movie.release_year,
-            "duration": movie.duration,
-            "image_url": movie.image_url,
-            "trailer_url": movie.trailer_url,
-            "imdb_score": movie.imdb_score,
-            "popularity_score": movie.popularity_score,
-            "view_count": movie.view_count,
-            "created_at": movie.created_at
-        }
-        result.append(movie_dict)
+    return [movie_to_dict(movie, lang) for movie in movies]
+
+def movies_page_statement(cursor: str = None, limit: int = 20):
+    """SELECT for one page of the popularity listing (limit + 1 rows), keyset-paginated on (popularity_score, id)"""
+    stmt = select(models.Movie)
+    if cursor:
+        popularity_score, movie_id = decode_cursor(cursor, 2)
+        if not isinstance(popularity_score, (int, float)) or not isinstance(movie_id, int):
+            raise ValueError("Invalid cursor")
+        stmt = stmt.where(tuple_(models.Movie.popularity_score, models.Movie.id) < (popularity_score, movie_id))
+    return stmt.order_by(desc(models.Movie.popularity_score), desc(models.Movie.id)).limit(limit + 1)
+
+def movies_page(movies, limit: int, lang: str = "en"):
+    next_cursor = None
+    if len(movies) > limit:
+        last = movies[limit - 1]
+        next_cursor = encode_cursor([last.popularity_score, last.id])
     
-    return result
+    return {"movies": [movie_to_dict(movie, lang) for movie in movies[:limit]], "next_cursor": next_cursor}
+
+def get_movies_page(db: Session, cursor: str = None, limit: int = 20, lang: str = "en"):
+    """Popularity listing page; any page depth costs one index range scan"""
+    movies = db.execute(movies_page_statement(cursor, limit)).scalars().all()
+    return movies_page(movies, limit, lang)
 
 def get_actor(db: Session, actor_id: int):
     actor = db.query(models.Actor).options(
@@ -67,181 +117,275 @@ def get_actor(db: Session, actor_id: int):
     ).filter(models.Actor.id == actor_id).first()
     return actor
 
-def get_movie(db: Session, movie_id: int, lang: str = "en"):
-    movie = db.query(models.Movie).filter(models.Movie.id == movie_id).first()
-    if movie:
-        # Increment view count
-        movie.view_count += 1
-        db.commit()
-        
-        # Calculate average rating
-        avg_rating = db.query(func.avg(models.Rating.rating)).filter(models.Rating.movie_id == movie_id).scalar()
-        total_ratings = db.query(func.count(models.Rating.id)).filter(models.Rating.movie_id == movie_id).scalar()
-        
-        # Update popularity score based on ratings, views, and other factors
-        popularity = calculate_popularity(movie, avg_rating, total_ratings)
-        movie.popularity_score = popularity
-        db.commit()
-        
-        # Create response with appropriate language without modifying database object
-        movie_dict = {
-            "id": movie.id,
-            "title": movie.title_tr if (lang == "tr" and movie.title_tr) else movie.title,
-            "summary": movie.summary_tr if (lang == "tr" and movie.summary_tr) else movie.summary,
-            "release_year": movie.release_year,
-            "duration": movie.duration,
-            "image_url": movie.image_url,
-            "trailer_url": movie.trailer_url,
-            "imdb_score": movie.imdb_score,
-            "popularity_score": movie.popularity_score,
-            "view_count": movie.view_count,
-            "created_at": movie.created_at,
-            "average_rating": avg_rating,
-            "total_ratings": total_ratings
-        }
-        return movie_dict
+def get_actor_detail(db: Session, actor_id: int):
+    """Actor page validated while the session is open, so it can be cached outside it"""
+    actor = get_actor(db, actor_id)
+    if actor is None:
+        return None
+    return schemas.ActorDetail.model_validate(actor)
+
+def parse_id_list(ids: str, max_ids: int = BATCH_MAX_IDS):
+    """Distinct ids of "3,1,3,2" in first-seen order; ValueError when malformed or too many"""
+    parsed = []
+    for part in ids.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            parsed.append(int(part))
+        except ValueError:
+            raise ValueError(f"Invalid id: {part[:20]}")
+    return distinct_ids(parsed, max_ids)
+
+def distinct_ids(ids, max_ids: int = BATCH_MAX_IDS):
+    """ids without repeats, in first-seen order; ValueError when empty, too many or out of range"""
+    ids = list(dict.fromkeys(ids))
+    for id_ in ids:
+        # Out of range, the driver would fail the whole query instead of just not matching
+        if not 1 <= id_ <= MAX_ID:
+            raise ValueError(f"Invalid id: {str(id_)[:20]}")
+    if not ids:
+        raise ValueError("No ids given")
+    if len(ids) > max_ids:
+        raise ValueError(f"At most {max_ids} ids per request")
+    return ids
+
+def batch_result(key: str, requested_ids, found):
+    """{key: found rows in requested order, "missing": ids that do not exist}"""
+    by_id = {row["id"]: row for row in found}
+    return {
+        key: [by_id[item_id] for item_id in requested_ids if item_id in by_id],
+        "missing": [item_id for item_id in requested_ids if item_id not in by_id]
+    }
+
+def movies_batch_statement(movie_ids):
+    return select(models.Movie).where(models.Movie.id.in_(movie_ids))
+
+def actors_batch_statement(actor_ids):
+    # Only the columns the list shows; no filmography
+    return select(models.Actor.id, models.Actor.name, models.Actor.bio, models.Actor.photo_url).where(
+        models.Actor.id.in_(actor_ids)
+    )
+
+def get_movies_batch(db: Session, movie_ids, lang: str = "en"):
+    """Movies by id in one query, read-only (no view counting)"""
+    movies = db.execute(movies_batch_statement(movie_ids)).scalars().all()
+    return batch_result("movies", movie_ids, [movie_to_dict(movie, lang) for movie in movies])
+
+def get_actors_batch(db: Session, actor_ids):
+    rows = db.execute(actors_batch_statement(actor_ids)).mappings().all()
+    return batch_result("actors", actor_ids, [dict(row) for row in rows])
+
+def movie_detail_statement(movie_id: int):
+    """SELECT of one movie with its rating aggregates joined in and its cast selectin-loaded.
+
+    Two queries however long the cast is: the movie row, then every MovieActor with its Actor.
+    """
+    return select(models.Movie).where(models.Movie.id == movie_id).options(
+        joinedload(models.Movie.rating_stats),
+        selectinload(models.Movie.actors).joinedload(models.MovieActor.actor)
+    )
+
+def movie_detail(movie, rating_rows, lang: str = "en"):
+    """MovieDetail dict from a movie_detail_statement() movie and ratings_page_statement() rows"""
+    stats = movie.rating_stats
+    total_ratings = stats.rating_count if stats else 0
+    recent = ratings_page(rating_rows, MOVIE_DETAIL_RATINGS)
     
-    return None
+    movie_dict = movie_to_dict(movie, lang)
+    movie_dict.update({
+        "view_count": movie.view_count or 0,
+        "average_rating": stats.rating_sum / total_ratings if total_ratings else None,
+        "total_ratings": total_ratings,
+        # Billing order is insertion order; only the fields the cast list shows
+        "actors": [
+            {
+                "actor": {"id": credit.actor.id, "name": credit.actor.name, "bio": credit.actor.bio, "photo_url": credit.actor.photo_url},
+                "character_name": credit.character_name
+            }
+            for credit in sorted(movie.actors, key=lambda credit: credit.id)
+            if credit.actor is not None
+        ],
+        "ratings": recent["ratings"],
+        "ratings_next_cursor": recent["next_cursor"]
+    })
+    return movie_dict
+
+def get_movie(db: Session, movie_id: int, lang: str = "en"):
+    movie = db.execute(movie_detail_statement(movie_id)).scalar_one_or_none()
+    if movie is None:
+        return None
+    rows = db.execute(ratings_page_statement(movie_id, limit=MOVIE_DETAIL_RATINGS)).all()
+    return movie_detail(movie, rows, lang)
+
+def fallback_search_statements(query: str, limit: int = 10, lang: str = "en"):
+    """ILIKE scans for movies (title matches first) and actors, used until the search index has loaded"""
+    pattern = f"%{query}%"
+    if lang == "tr":
+        title = func.coalesce(models.Movie.title_tr, models.Movie.title)
+        summary = func.coalesce(models.Movie.summary_tr, models.Movie.summary)
+    else:
+        title, summary = models.Movie.title, models.Movie.summary
+    movies = select(models.Movie).where(or_(title.ilike(pattern), summary.ilike(pattern))).order_by(
+        case((title.ilike(pattern), 0), else_=1), desc(models.Movie.popularity_score), models.Movie.id
+    ).limit(limit)
+    actors = select(models.Actor).where(models.Actor.name.ilike(pattern)).order_by(models.Actor.name).limit(limit)
+    return movies, actors
 
 def search_movies(db: Session, query: str, search_type: str = "all", limit: int = 10, lang: str = "en"):
     movies = []
     actors = []
     
+    if not catalog_index.ensure_loaded():
+        movies_stmt, actors_stmt = fallback_search_statements(query, limit, lang)
+        if search_type in ["all", "movies"]:
+            movies = [movie_to_dict(movie, lang) for movie in db.execute(movies_stmt).scalars()]
+        if search_type in ["all", "actors"]:
+            actors = db.execute(actors_stmt).scalars().all()
+        return {"movies": movies, "actors": actors}
+    
+    # Candidates come from the in-process index; the database is only hit by primary key
     if search_type in ["all", "movies"]:
-        if lang == "tr":
-            # Search Turkish fields: title matches first, then fill with summary matches
-            # First get title matches (up to 3)
-            title_matches = db.query(models.Movie).filter(
-                models.Movie.title_tr.ilike(f"%{query}%")
-            ).limit(3).all()
-            
-            # If we have less than 3 title matches, fill remaining with summary matches
-            if len(title_matches) < 3:
-                title_match_ids = [movie.id for movie in title_matches]
-                remaining_limit = 3 - len(title_matches)
-                
-                summary_matches = db.query(models.Movie).filter(
-                    models.Movie.summary_tr.ilike(f"%{query}%"),
-                    ~models.Movie.id.in_(title_match_ids) if title_match_ids else True
-                ).limit(remaining_limit).all()
-                
-                movies = title_matches + summary_matches
-            else:
-                movies = title_matches
+        movie_ids = catalog_index.search_movies(query, lang=lang, limit=limit)
+        if movie_ids:
+            rows = db.query(models.Movie).filter(models.Movie.id.in_(movie_ids)).all()
+            by_id = {movie.id: movie for movie in rows}
             
-            # Convert to response format with Turkish content
-            movie_results = []
-            for movie in movies:
-                movie_dict = {
-                    "id": movie.id,
-                    "title": movie.title_tr if movie.title_tr else movie.title,
-                    "summary": movie.summary_tr if movie.summary_tr else movie.summary,
-                    "release_year": movie.release_year,
-                    "duration": movie.duration,
-                    "image_url": movie.image_url,
-                    "trailer_url": movie.trailer_url,
-                    "imdb_score": movie.imdb_score,
-                    "popularity_score": movie.popularity_score,
-                    "view_count": movie.view_count,
-                    "created_at": movie.created_at
-                }
-                movie_results.append(movie_dict)
-            movies = movie_results
-        else:
-            # Search English fields: title matches first, then fill with summary matches
-            # First get title matches (up to 3)
-            title_matches = db.query(models.Movie).filter(
-                models.Movie.title.ilike(f"%{query}%")
-            ).limit(3).all()
-            
-            # If we have less than 3 title matches, fill remaining with summary matches
-            if len(title_matches) < 3:
-                title_match_ids = [movie.id for movie in title_matches]
-                remaining_limit = 3 - len(title_matches)
-                
-                summary_matches = db.query(models.Movie).filter(
-                    models.Movie.summary.ilike(f"%{query}%"),
-                    ~models.Movie.id.in_(title_match_ids) if title_match_ids else True
-                ).limit(remaining_limit).all()
-                
-                movies = title_matches + summary_matches
-            else:
-                movies = title_matches
-            
-            # Convert to response format
-            movie_results = []
-            for movie in movies:
-                movie_dict = {
-                    "id": movie.id,
-                    "title": movie.title,
-                    "summary": movie.summary,
-                    "release_year": movie.release_year,
-                    "duration": movie.duration,
-                    "image_url": movie.image_url,
-                    "trailer_url": movie.trailer_url,
-                    "imdb_score": movie.imdb_score,
-                    "popularity_score": movie.popularity_score,
-                    "view_count": movie.view_count,
-                    "created_at": movie.created_at
-                }
-                movie_results.append(movie_dict)
-            movies = movie_results
+            # Keep index ranking: title matches first, then summary matches
+            for movie_id in movie_ids:
+                movie = by_id.get(movie_id)
+                if movie is None:
+                    continue
+                movies.append(movie_to_dict(movie, lang))
     
     if search_type in ["all", "actors"]:
-        actors = db.query(models.Actor).filter(
-            models.Actor.name.ilike(f"%{query}%")
-        ).limit(3).all()  # Top 3 results only
+        actor_ids = catalog_index.search_actors(query, limit=limit)
+        if actor_ids:
+            rows = db.query(models.Actor).filter(models.Actor.id.in_(actor_ids)).all()
+            by_id = {actor.id: actor for actor in rows}
+            actors = [by_id[actor_id] for actor_id in actor_ids if actor_id in by_id]
     
     return {"movies": movies, "actors": actors}
 
-def create_rating(db: Session, rating: schemas.RatingCreate, movie_id: int, user_id: int):
-    # Check if user already rated this movie
-    existing_rating = db.query(models.Rating).filter(
-        models.Rating.user_id == user_id,
-        models.Rating.movie_id == movie_id
+def upsert_rating(db: Session, user_id: int, movie_id: int, value: float, comment: str = None):
+    """Insert or update a user's rating of a movie; returns (row, previous rating or None).
+
+    A new rating is one INSERT ... ON CONFLICT DO NOTHING on uq_ratings_user_movie. On
+    conflict the existing row is locked before its old value is read and replaced, so two
+    concurrent first ratings of one pair cannot both be counted as new. (DO UPDATE would
+    lose the old value, which the aggregates need.)
+    """
+    ratings = models.Rating.__table__
+    columns = (ratings.c.id, ratings.c.user_id, ratings.c.movie_id, ratings.c.rating, ratings.c.comment, ratings.c.created_at)
+    row = db.execute(
+        dialect_insert(db)(ratings).values(user_id=user_id, movie_id=movie_id, rating=value, comment=comment)
+        .on_conflict_do_nothing(index_elements=[ratings.c.user_id, ratings.c.movie_id])
+        .returning(*columns)
     ).first()
+    if row is not None:
+        return row, None
     
-    if existing_rating:
-        # Update existing rating
-        existing_rating.rating = rating.rating
-        existing_rating.comment = rating.comment
-        db.commit()
-        db.refresh(existing_rating)
-        return existing_rating
-    else:
-        # Create new rating
-        db_rating = models.Rating(
-            user_id=user_id,
-            movie_id=movie_id,
-            rating=rating.rating,
-            comment=rating.comment
-        )
-        db.add(db_rating)
-        db.commit()
-        db.refresh(db_rating)
-        return db_rating
+    pair = (ratings.c.user_id == user_id, ratings.c.movie_id == movie_id)
+    previous = db.execute(select(ratings.c.rating).where(*pair).with_for_update()).scalar_one()
+    row = db.execute(update(ratings).where(*pair).values(rating=value, comment=comment).returning(*columns)).first()
+    return row, previous
 
-def add_to_watchlist(db: Session, movie_id: int, user_id: int):
-    # Check if movie exists
-    movie = db.query(models.Movie).filter(models.Movie.id == movie_id).first()
-    if not movie:
-        raise HTTPException(status_code=404, detail="Movie not found")
+def create_rating(db: Session, rating: schemas.RatingCreate, movie_id: int, user_id: int):
+    country = db.query(models.User.country).filter(models.User.id == user_id).scalar() or ""
     
-    # Check if already in watchlist
-    existing = db.query(models.Watchlist).filter(
-        models.Watchlist.user_id == user_id,
-        models.Watchlist.movie_id == movie_id
-    ).first()
+    try:
+        row, previous = upsert_rating(db, user_id, movie_id, rating.rating, rating.comment)
+    except IntegrityError:
+        # Foreign key: no such movie
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Movie not found")
     
-    if existing:
-        raise HTTPException(status_code=400, detail="Movie already in your watchlist")
+    if previous is None:
+        apply_rating_delta(db, movie_id, rating.rating, 1)
+        apply_histogram_delta(db, movie_id, country, rating_bucket(rating.rating), 1)
+    else:
+        # Updated rating; aggregates only move by the difference
+        apply_rating_delta(db, movie_id, rating.rating - previous, 0)
+        if rating_bucket(previous) != rating_bucket(rating.rating):
+            apply_histogram_delta(db, movie_id, country, rating_bucket(previous), -1)
+            apply_histogram_delta(db, movie_id, country, rating_bucket(rating.rating), 1)
     
-    db_watchlist = models.Watchlist(user_id=user_id, movie_id=movie_id)
-    db.add(db_watchlist)
+    # Rating, aggregates and popularity are committed together
+    refresh_popularity(db, [movie_id])
+    db.commit()
+    invalidate_rating_histogram(movie_id)
+    invalidate_movie_cache([movie_id])
+    return dict(row._mapping)
+
+def apply_rating_delta(db: Session, movie_id: int, delta_sum: float, delta_count: int):
+    """Add a rating change to the movie's running aggregates (caller commits)"""
+    insert = dialect_insert(db)
+    stats = models.MovieRatingStats.__table__
+    stmt = insert(stats).values(movie_id=movie_id, rating_sum=delta_sum, rating_count=delta_count)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[stats.c.movie_id],
+        set_={
+            "rating_sum": stats.c.rating_sum + stmt.excluded.rating_sum,
+            "rating_count": stats.c.rating_count + stmt.excluded.rating_count
+        }
+    )
+    db.execute(stmt)
+
+def rating_bucket(value: float) -> int:
+    """1-10 histogram bucket, rounding halves up (same rule as rating_bucket_expression)"""
+    return int(value + 0.5)
+
+def rating_bucket_expression(value):
+    # FLOOR first: Postgres rounds a cast half-to-even (6.5 -> 6), rating_bucket() rounds half up
+    return cast(func.floor(value + 0.5), Integer)
+
+def apply_histogram_delta(db: Session, movie_id: int, country: str, bucket: int, delta: int):
+    """Add delta to one (movie, country, bucket) histogram cell (caller commits)"""
+    insert = dialect_insert(db)
+    histogram = models.MovieRatingHistogram.__table__
+    stmt = insert(histogram).values(movie_id=movie_id, country=country, bucket=bucket, count=delta)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[histogram.c.movie_id, histogram.c.country, histogram.c.bucket],
+        set_={"count": histogram.c.count + stmt.excluded.count}
+    )
+    db.execute(stmt)
+
+def watchlist_insert_statement(db: Session, user_id: int, movie_ids):
+    """INSERT ... SELECT of the given movies into a watchlist, skipping entries it already has.
+
+    The SELECT doubles as the movie existence check and uq_watchlist_user_movie
+    rejects duplicates, so concurrent adds cannot race. Returns the added movie ids.
+    """
+    watchlist = models.Watchlist.__table__
+    existing_movies = select(literal(user_id), models.Movie.id).where(models.Movie.id.in_(movie_ids))
+    return dialect_insert(db)(watchlist).from_select(["user_id", "movie_id"], existing_movies).on_conflict_do_nothing(
+        index_elements=[watchlist.c.user_id, watchlist.c.movie_id]
+    ).returning(watchlist.c.movie_id)
+
+def add_to_watchlist(db: Session, movie_id: int, user_id: int):
+    added = db.execute(watchlist_insert_statement(db, user_id, [movie_id])).scalar()
     db.commit()
-    db.refresh(db_watchlist)
+    
+    if added is None:
+        # Nothing inserted: either the movie does not exist or it is already listed
+        if db.query(models.Movie.id).filter(models.Movie.id == movie_id).first() is None:
+            raise HTTPException(status_code=404, detail="Movie not found")
+        raise HTTPException(status_code=400, detail="Movie already in your watchlist")
     return {"message": "Added to watchlist"}
 
+def add_many_to_watchlist(db: Session, movie_ids, user_id: int):
+    """Bulk add in one statement; ids not added are split into already listed and missing movies"""
+    added = set(db.execute(watchlist_insert_statement(db, user_id, movie_ids)).scalars())
+    db.commit()
+    
+    rest = [movie_id for movie_id in movie_ids if movie_id not in added]
+    existing = set(db.execute(select(models.Movie.id).where(models.Movie.id.in_(rest))).scalars()) if rest else set()
+    return {
+        "added": [movie_id for movie_id in movie_ids if movie_id in added],
+        "already_in_watchlist": [movie_id for movie_id in rest if movie_id in existing],
+        "missing": [movie_id for movie_id in rest if movie_id not in existing]
+    }
+
 def get_user_watchlist(db: Session, user_id: int):
     return db.query(models.Watchlist).options(
         joinedload(models.Watchlist.movie)
@@ -249,48 +393,153 @@ def get_user_watchlist(db: Session, user_id: int):
 
 def remove_from_watchlist(db: Session, watchlist_id: int, user_id: int):
     """Remove item from user's watchlist"""
-    watchlist_item = db.query(models.Watchlist).filter(
-        models.Watchlist.id == watchlist_id,
-        models.Watchlist.user_id == user_id
-    ).first()
+    watchlist = models.Watchlist.__table__
+    result = db.execute(delete(watchlist).where(watchlist.c.id == watchlist_id, watchlist.c.user_id == user_id))
+    db.commit()
     
-    if not watchlist_item:
+    if not result.rowcount:
         raise HTTPException(status_code=404, detail="Item not found in your watchlist")
-    
-    db.delete(watchlist_item)
-    db.commit()
     return {"message": "Removed from watchlist"}
 
-def get_movie_rating_stats(db: Session, movie_id: int, country: str = None):
+def remove_many_from_watchlist(db: Session, movie_ids, user_id: int):
+    watchlist = models.Watchlist.__table__
+    removed = set(db.execute(
+        delete(watchlist).where(watchlist.c.user_id == user_id, watchlist.c.movie_id.in_(movie_ids)).returning(watchlist.c.movie_id)
+    ).scalars())
+    db.commit()
+    return {
+        "removed": [movie_id for movie_id in movie_ids if movie_id in removed],
+        "not_in_watchlist": [movie_id for movie_id in movie_ids if movie_id not in removed]
+    }
+
+def watchlist_flags_statement(user_id: int, movie_ids):
+    """Which of these movies the user has listed: one lookup on uq_watchlist_user_movie per page"""
+    return select(models.Watchlist.movie_id).where(
+        models.Watchlist.user_id == user_id,
+        models.Watchlist.movie_id.in_(movie_ids)
+    )
+
+def set_watchlist_flags(movies, listed_ids):
+    for movie in movies:
+        movie["in_watchlist"] = movie["id"] in listed_ids
+    return movies
+
+def flag_watchlist(db: Session, user_id: int, movies):
+    """Add in_watchlist to each movie dict"""
+    if not movies:
+        return movies
+    listed = set(db.execute(watchlist_flags_statement(user_id, [movie["id"] for movie in movies])).scalars())
+    return set_watchlist_flags(movies, listed)
+
+def get_movie_rating_stats(db: Session, movie_id: int, country: str = None, limit: int = None):
     """Get rating statistics for a movie including rating distribution histogram"""
-    movie = db.query(models.Movie).filter(models.Movie.id == movie_id).first()
+    movie = db.query(models.Movie.id).filter(models.Movie.id == movie_id).first()
     if not movie:
         return None
+    return rating_stats(db, movie_id, country=country, limit=limit)
+
+def rating_stats(db: Session, movie_id: int, country: str = None, limit: int = None):
+    """Histogram, country facets and the first page of reviews for a movie known to exist"""
+    summary = get_rating_histogram(db, movie_id, country)
+    limit = min(limit or RATINGS_PAGE_SIZE, MAX_RATINGS_PAGE_SIZE)
+    rows = db.execute(ratings_page_statement(movie_id, country=country, limit=limit)).all()
     
-    # Base query for ratings with user info
-    ratings_query = db.query(models.Rating).options(
-        joinedload(models.Rating.user)
-    ).filter(models.Rating.movie_id == movie_id)
+    return {**summary, **ratings_page(rows, limit)}
+
+def ratings_page_statement(movie_id: int, country: str = None, cursor: str = None, limit: int = RATINGS_PAGE_SIZE):
+    """SELECT for one page of reviews, newest first, keyset-paginated on (created_at, id).
+
+    Fetches limit + 1 rows so ratings_page() can tell whether another page follows.
+    """
+    # Project only the reviewer fields the page shows (no photo_url payloads)
+    stmt = select(
+        models.Rating.id, models.Rating.user_id, models.Rating.movie_id, models.Rating.rating,
+        models.Rating.comment, models.Rating.created_at, models.User.email, models.User.country
+    ).join(models.User, models.User.id == models.Rating.user_id).where(models.Rating.movie_id == movie_id)
     
     # Filter by country if specified
     if country and country != "All":
-        ratings_query = ratings_query.join(models.User).filter(models.User.country == country)
-    
-    ratings = ratings_query.order_by(desc(models.Rating.created_at)).all()
+        stmt = stmt.where(models.User.country == country)
     
-    # Calculate rating distribution (1-10 stars)
-    rating_distribution = {}
-    total_ratings = len(ratings)
+    if cursor:
+        created_at, rating_id = decode_cursor(cursor, 2)
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+        if not isinstance(rating_id, int):
+            raise ValueError("Invalid cursor")
+        stmt = stmt.where(tuple_(models.Rating.created_at, models.Rating.id) < (created_at, rating_id))
     
-    # Initialize all ratings 1-10 with 0 count
-    for i in range(1, 11):
-        rating_distribution[i] = 0
+    return stmt.order_by(desc(models.Rating.created_at), desc(models.Rating.id)).limit(limit + 1)
+
+def ratings_page(rows, limit: int):
+    ratings = [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "movie_id": row.movie_id,
+            "rating": row.rating,
+            "comment": row.comment,
+            "created_at": row.created_at,
+            "user": {"id": row.user_id, "email": row.email, "country": row.country}
+        }
+        for row in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor([last.created_at, last.id])
     
-    # Count ratings
-    for rating in ratings:
-        rating_value = int(round(rating.rating))  # Round to nearest integer
-        if rating_value in rating_distribution:
-            rating_distribution[rating_value] += 1
+    return {"ratings": ratings, "next_cursor": next_cursor}
+
+def get_movie_ratings_page(db: Session, movie_id: int, country: str = None, cursor: str = None, limit: int = None):
+    """One page of reviews, newest first; None when the movie does not exist"""
+    limit = min(limit or RATINGS_PAGE_SIZE, MAX_RATINGS_PAGE_SIZE)
+    rows = db.execute(ratings_page_statement(movie_id, country=country, cursor=cursor, limit=limit)).all()
+    # Only an empty page needs the existence check
+    if not rows and db.query(models.Movie.id).filter(models.Movie.id == movie_id).first() is None:
+        return None
+    return ratings_page(rows, limit)
+
+# (movie_id, country) -> (expires_at, summary); new ratings drop their movie's entries
+_histogram_cache = {}
+_histogram_cache_lock = threading.Lock()
+
+def invalidate_rating_histogram(movie_id: int):
+    with _histogram_cache_lock:
+        for key in [key for key in _histogram_cache if key[0] == movie_id]:
+            del _histogram_cache[key]
+
+def cached_rating_histogram(movie_id: int, country: str):
+    cached = _histogram_cache.get((movie_id, country))
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    return None
+
+def store_rating_histogram(movie_id: int, country: str, summary: dict):
+    with _histogram_cache_lock:
+        _histogram_cache[(movie_id, country)] = (time.monotonic() + RATING_STATS_CACHE_SECONDS, summary)
+
+def histogram_statements(movie_id: int, country: str):
+    """SELECTs for the per-bucket counts and the countries with ratings"""
+    histogram = models.MovieRatingHistogram
+    counts = select(histogram.bucket, func.sum(histogram.count)).where(histogram.movie_id == movie_id)
+    if country != "All":
+        counts = counts.where(histogram.country == country)
+    countries = select(histogram.country).where(
+        histogram.movie_id == movie_id,
+        histogram.country != "",
+        histogram.count > 0
+    ).distinct().order_by(histogram.country)
+    return counts.group_by(histogram.bucket), countries
+
+def histogram_summary(country: str, bucket_counts, countries):
+    rating_distribution = {i: 0 for i in range(1, 11)}
+    for bucket, count in bucket_counts:
+        if bucket in rating_distribution:
+            rating_distribution[bucket] = int(count or 0)
+    total_ratings = sum(rating_distribution.values())
     
     # Convert to percentage and format for frontend
     distribution_data = []
@@ -303,33 +552,84 @@ def get_movie_rating_stats(db: Session, movie_id: int, country: str = None):
             "percentage": round(percentage, 1)
         })
     
-    # Get available countries
-    countries = db.query(models.User.country).join(models.Rating).filter(
-        models.Rating.movie_id == movie_id,
-        models.User.country.isnot(None)
-    ).distinct().order_by(models.User.country).all()
-    
-    country_list = ["All"] + [country[0] for country in countries]
-    
     return {
         "total_ratings": total_ratings,
         "rating_distribution": distribution_data,
-        "available_countries": country_list,
-        "selected_country": country or "All",
-        "ratings": ratings
+        "available_countries": ["All"] + list(countries),
+        "selected_country": country
     }
 
-def calculate_popularity(movie, avg_rating, total_ratings):
-    # Business logic for popularity calculation
-    # Factors: average rating, number of ratings, view count, recency
+def get_rating_histogram(db: Session, movie_id: int, country: str = None):
+    """Distribution and country facets from movie_rating_histogram, independent of rating volume"""
+    country = country or "All"
+    summary = cached_rating_histogram(movie_id, country)
+    if summary is not None:
+        return summary
     
-    rating_score = (avg_rating or 0) * 10  # Scale to 100
-    rating_count_score = min(total_ratings * 2, 50)  # Max 50 points for ratings count
-    view_score = min(movie.view_count * 0.1, 30)  # Max 30 points for views
+    counts_stmt, countries_stmt = histogram_statements(movie_id, country)
+    summary = histogram_summary(country, db.execute(counts_stmt).all(), db.execute(countries_stmt).scalars().all())
+    store_rating_histogram(movie_id, country, summary)
+    return summary
+
+def invalidate_movie_cache(movie_ids):
+    """Drop cached detail pages for these movies and every cached listing"""
+    response_cache.invalidate(*[f"movie:{movie_id}" for movie_id in movie_ids], "movies")
+
+def invalidate_movie_details(movie_ids):
+    """Drop cached detail pages only; listings pick up the new popularity order when they expire"""
+    response_cache.invalidate(*[f"movie:{movie_id}" for movie_id in movie_ids])
+
+def _invalidate_catalog_cache(kind, action, data):
+    if kind == "movie":
+        invalidate_movie_cache([data["id"]])
+    # Actor pages embed their movies, so any catalog edit may change them
+    response_cache.invalidate("actors")
+
+catalog_events.subscribe(_invalidate_catalog_cache)
+# A flush every few seconds would otherwise empty every cached listing page each time
+view_buffer.add_listener(invalidate_movie_details)
+
+def _capped(expr, cap):
+    return case((expr > cap, cap), else_=expr)
+
+def popularity_expression(avg_rating, total_ratings, view_count):
+    """popularity_score from an average rating, a rating count and a view count, for set-wise updates"""
+    # Factors: average rating, number of ratings, view count, recency
+    rating_score = func.coalesce(avg_rating, 0) * 10  # Scale to 100
+    rating_count_score = _capped(func.coalesce(total_ratings, 0) * 2, 50)  # Max 50 points for ratings count
+    view_score = _capped(func.coalesce(view_count, 0) * 0.1, 30)  # Max 30 points for views
     recency_score = 10  # Base score for all movies
     
     return rating_score + rating_count_score + view_score + recency_score
 
+def stats_popularity_expression():
+    """popularity_score for the movie row being updated, read from its running aggregates.
+
+    IMDb votes (imdb_loader) count as imdb_votes ratings of imdb_score each, so a loaded
+    title keeps its IMDb standing when local ratings and views arrive.
+    """
+    stats = models.MovieRatingStats
+    imdb_votes = func.coalesce(models.Movie.imdb_votes, 0)
+    rating_sum = func.coalesce(
+        select(stats.rating_sum).where(stats.movie_id == models.Movie.id).scalar_subquery(), 0
+    ) + func.coalesce(models.Movie.imdb_score, 0) * imdb_votes
+    rating_count = func.coalesce(
+        select(stats.rating_count).where(stats.movie_id == models.Movie.id).scalar_subquery(), 0
+    ) + imdb_votes
+    avg_rating = rating_sum / func.nullif(rating_count, 0)
+    return popularity_expression(avg_rating, rating_count, models.Movie.view_count)
+
+def refresh_popularity(db: Session, movie_ids=None):
+    """Recompute popularity_score in one UPDATE, for all movies when movie_ids is None (caller commits)"""
+    stmt = update(models.Movie).values(popularity_score=stats_popularity_expression())
+    if movie_ids is not None:
+        if not movie_ids:
+            return
+        stmt = stmt.where(models.Movie.id.in_(movie_ids))
+    db.execute(stmt.execution_options(synchronize_session=False))
+
+view_buffer.set_refresh(refresh_popularity)
+
 def seed_sample_movies(db: Session):
     # Create sample movies if none exist
     if db.query(models.Movie).count() == 0:
@@ -0,0 +1,100 @@
+"""AsyncSession versions of the hot read paths in crud, used by routes_async in DB_MODE=async.
+
+Statements and response shaping are shared with crud; only the execution differs.
+"""
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+import models
+import crud
+from search_index import catalog_index
+
+async def get_movies(db: AsyncSession, skip: int = 0, limit: int = 20, lang: str = "en"):
+    result = await db.execute(
+        select(models.Movie).order_by(desc(models.Movie.popularity_score), desc(models.Movie.id)).offset(skip).limit(limit)
+    )
+    return [crud.movie_to_dict(movie, lang) for movie in result.scalars()]
+
+async def get_movies_page(db: AsyncSession, cursor: str = None, limit: int = 20, lang: str = "en"):
+    result = await db.execute(crud.movies_page_statement(cursor, limit))
+    return crud.movies_page(result.scalars().all(), limit, lang)
+
+async def get_movie(db: AsyncSession, movie_id: int, lang: str = "en"):
+    movie = (await db.execute(crud.movie_detail_statement(movie_id))).scalar_one_or_none()
+    if movie is None:
+        return None
+    rows = (await db.execute(crud.ratings_page_statement(movie_id, limit=crud.MOVIE_DETAIL_RATINGS))).all()
+    return crud.movie_detail(movie, rows, lang)
+
+async def get_movies_batch(db: AsyncSession, movie_ids, lang: str = "en"):
+    movies = (await db.execute(crud.movies_batch_statement(movie_ids))).scalars().all()
+    return crud.batch_result("movies", movie_ids, [crud.movie_to_dict(movie, lang) for movie in movies])
+
+async def get_actors_batch(db: AsyncSession, actor_ids):
+    rows = (await db.execute(crud.actors_batch_statement(actor_ids))).mappings().all()
+    return crud.batch_result("actors", actor_ids, [dict(row) for row in rows])
+
+async def search_movies(db: AsyncSession, query: str, search_type: str = "all", limit: int = 10, lang: str = "en"):
+    movies = []
+    actors = []
+    
+    if not catalog_index.ensure_loaded():
+        movies_stmt, actors_stmt = crud.fallback_search_statements(query, limit, lang)
+        if search_type in ["all", "movies"]:
+            movies = [crud.movie_to_dict(movie, lang) for movie in (await db.execute(movies_stmt)).scalars()]
+        if search_type in ["all", "actors"]:
+            actors = (await db.execute(actors_stmt)).scalars().all()
+        return {"movies": movies, "actors": actors}
+    
+    if search_type in ["all", "movies"]:
+        movie_ids = catalog_index.search_movies(query, lang=lang, limit=limit)
+        if movie_ids:
+            result = await db.execute(select(models.Movie).where(models.Movie.id.in_(movie_ids)))
+            by_id = {movie.id: movie for movie in result.scalars()}
+            movies = [crud.movie_to_dict(by_id[movie_id], lang) for movie_id in movie_ids if movie_id in by_id]
+    
+    if search_type in ["all", "actors"]:
+        actor_ids = catalog_index.search_actors(query, limit=limit)
+        if actor_ids:
+            result = await db.execute(select(models.Actor).where(models.Actor.id.in_(actor_ids)))
+            by_id = {actor.id: actor for actor in result.scalars()}
+            actors = [by_id[actor_id] for actor_id in actor_ids if actor_id in by_id]
+    
+    return {"movies": movies, "actors": actors}
+
+async def get_rating_histogram(db: AsyncSession, movie_id: int, country: str = None):
+    country = country or "All"
+    summary = crud.cached_rating_histogram(movie_id, country)
+    if summary is not None:
+        return summary
+    
+    counts_stmt, countries_stmt = crud.histogram_statements(movie_id, country)
+    bucket_counts = (await db.execute(counts_stmt)).all()
+    countries = (await db.execute(countries_stmt)).scalars().all()
+    summary = crud.histogram_summary(country, bucket_counts, countries)
+    crud.store_rating_histogram(movie_id, country, summary)
+    return summary
+
+async def get_movie_rating_stats(db: AsyncSession, movie_id: int, country: str = None, limit: int = None):
+    movie_id_found = (await db.execute(select(models.Movie.id).where(models.Movie.id == movie_id))).scalar()
+    if movie_id_found is None:
+        return None
+    return await rating_stats(db, movie_id, country=country, limit=limit)
+
+async def rating_stats(db: AsyncSession, movie_id: int, country: str = None, limit: int = None):
+    summary = await get_rating_histogram(db, movie_id, country)
+    limit = min(limit or crud.RATINGS_PAGE_SIZE, crud.MAX_RATINGS_PAGE_SIZE)
+    rows = (await db.execute(crud.ratings_page_statement(movie_id, country=country, limit=limit))).all()
+    return {**summary, **crud.ratings_page(rows, limit)}
+
+async def flag_watchlist(db: AsyncSession, user_id: int, movies):
+    if not movies:
+        return movies
+    listed = set((await db.execute(crud.watchlist_flags_statement(user_id, [movie["id"] for movie in movies]))).scalars())
+    return crud.set_watchlist_flags(movies, listed)
+
+async def get_user_watchlist(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(models.Watchlist).options(joinedload(models.Watchlist.movie)).where(models.Watchlist.user_id == user_id)
+    )
+    return result.scalars().all()
@@ -1,30 +1,142 @@
-from google.auth.transport import requests
-from google.oauth2 import id_token
+import re
+import threading
+import time
+import requests as http
+from requests.adapters import HTTPAdapter
+from google.auth import jwt as google_jwt
 from fastapi import HTTPException
+import metrics
 import os
 
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "")
+# Google's signing certificates ({key id: PEM}); point at a local key server in tests
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+# Refresh in the background once the cached certs are this close to their max-age
+GOOGLE_CERTS_REFRESH_MARGIN = float(os.getenv("GOOGLE_CERTS_REFRESH_MARGIN", "300"))
+# Used when the response carries no max-age, and the least time between refetches for unknown key ids
+GOOGLE_CERTS_DEFAULT_MAX_AGE = float(os.getenv("GOOGLE_CERTS_DEFAULT_MAX_AGE", "3600"))
+GOOGLE_CERTS_MIN_REFETCH_SECONDS = float(os.getenv("GOOGLE_CERTS_MIN_REFETCH_SECONDS", "30"))
+GOOGLE_CERTS_TIMEOUT = float(os.getenv("GOOGLE_CERTS_TIMEOUT", "5"))
+
+ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+class GoogleCertCache:
+    """Google's token signing certificates, kept for as long as Cache-Control allows.
+
+    Certs are fetched over one pooled keep-alive session and refreshed in the
+    background shortly before they expire, so a login normally verifies the ID
+    token locally without any outbound request. A token signed with a key id we
+    have not seen (Google rotated keys) triggers an early, rate-limited refetch.
+    """
+
+    def __init__(self, url=GOOGLE_CERTS_URL):
+        self.url = url
+        self.session = http.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=1))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=1))
+        self._lock = threading.Lock()
+        self._certs = None
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._refreshing = False
+        self.fetches = 0
+        self.hits = 0
+        self.background_refreshes = 0
+        self.fetch_ms = 0.0
+
+    def _fetch(self):
+        started = time.perf_counter()
+        response = self.session.get(self.url, timeout=GOOGLE_CERTS_TIMEOUT)
+        response.raise_for_status()
+        certs = response.json()
+        match = _MAX_AGE.search(response.headers.get("Cache-Control", ""))
+        max_age = float(match.group(1)) if match else GOOGLE_CERTS_DEFAULT_MAX_AGE
+        # A response served by an intermediate cache has already used part of its lifetime
+        max_age -= float(response.headers.get("Age", 0) or 0)
+        now = time.monotonic()
+        self._certs = certs
+        self._expires_at = now + max(max_age, 0.0)
+        self._fetched_at = now
+        self.fetches += 1
+        self.fetch_ms = (time.perf_counter() - started) * 1000
+        return certs
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self._fetch()
+            self.background_refreshes += 1
+        except Exception as e:
+            # Keep serving the current certs; the next request past expiry fetches synchronously
+            print(f"Google certs refresh failed: {e}")
+        finally:
+            self._refreshing = False
+
+    def get(self, key_id=None):
+        """Certs to verify a token signed with key_id, fetching only when missing, expired or rotated"""
+        now = time.monotonic()
+        certs = self._certs
+        if certs is not None and now < self._expires_at:
+            if key_id is None or key_id in certs or now - self._fetched_at < GOOGLE_CERTS_MIN_REFETCH_SECONDS:
+                self.hits += 1
+                if now > self._expires_at - GOOGLE_CERTS_REFRESH_MARGIN and now - self._fetched_at >= GOOGLE_CERTS_MIN_REFETCH_SECONDS:
+                    self._refresh_in_background()
+                return certs
+
+        with self._lock:
+            # Another request may have fetched while we waited for the lock
+            certs = self._certs
+            if certs is not None and time.monotonic() < self._expires_at and self._fetched_at > now:
+                return certs
+            return self._fetch()
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "keys": len(self._certs or ()),
+            "expires_in_seconds": round(max(self._expires_at - time.monotonic(), 0.0), 1),
+            "fetches": self.fetches,
+            "hits": self.hits,
+            "background_refreshes": self.background_refreshes,
+            "last_fetch_ms": round(self.fetch_ms, 1)
+        }
+
+google_certs = GoogleCertCache()
+
+verifications = metrics.counter("auth_google_verifications_total", "Google ID tokens verified", ("result",))
+metrics.callback("google_certs_fetches_total", "Fetches of Google's signing certificates", lambda: google_certs.fetches, kind="counter")
+metrics.callback("google_certs_hits_total", "Token verifications served from the cached certificates", lambda: google_certs.hits, kind="counter")
 
 def verify_google_token(token: str):
     """Verify Google OAuth token and return user info"""
     try:
-        # Verify the token
-        idinfo = id_token.verify_oauth2_token(
-            token, requests.Request(), GOOGLE_CLIENT_ID
-        )
-        
+        # Verify the token locally against the cached certificates
+        header = google_jwt.decode_header(token)
+        idinfo = google_jwt.decode(token, certs=google_certs.get(header.get("kid")), audience=GOOGLE_CLIENT_ID)
+
         # If the token is valid, return user info
-        if idinfo['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
+        if idinfo['iss'] not in ISSUERS:
             raise ValueError('Wrong issuer.')
-            
+        verifications.inc(result="valid")
+
         return {
             'email': idinfo['email'],
             'name': idinfo.get('name', ''),
             'picture': idinfo.get('picture', ''),
             'google_id': idinfo['sub']
         }
-        
+
     except ValueError as e:
+        verifications.inc(result="invalid")
         raise HTTPException(status_code=400, detail=f"Invalid token: {str(e)}")
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Token verification failed: {str(e)}")
\ No newline at end of file
+        verifications.inc(result="error")
+        raise HTTPException(status_code=400, detail=f"Token verification failed: {str(e)}")
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+# Cache-Control per route group, overridable with CACHE_CONTROL_<GROUP>. Routes that count
+# views (movie, movie_page) must reach the app on every load, so caches may keep them only
+# to revalidate (a 304 still records the view).
+CACHE_CONTROL_POLICIES = {
+    "movies": os.getenv("CACHE_CONTROL_MOVIES", "public, max-age=30"),
+    "movie": os.getenv("CACHE_CONTROL_MOVIE", "public, no-cache"),
+    "actor": os.getenv("CACHE_CONTROL_ACTOR", "public, max-age=60"),
+    "rating_stats": os.getenv("CACHE_CONTROL_RATING_STATS", "public, max-age=10"),
+    "movie_page": os.getenv("CACHE_CONTROL_MOVIE_PAGE", "public, no-cache"),
+    "watchlist": os.getenv("CACHE_CONTROL_WATCHLIST", "private, no-cache"),
+}
+
+_adapters = {}
+
+class EncodedBody:
+    """A response serialized once, with the validator derived from it.
+
+    Instances are what the response cache stores, so a conditional hit is answered
+    without touching the database or re-serializing anything. There is no
+    Last-Modified: the payloads carry no change time, and the encode time would
+    differ per worker and per cache fill for the same bytes.
+    """
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        # Strong validator: a hash of the exact bytes, identical across workers
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def encode(schema, payload):
+    """Validate payload against the route's response schema and serialize it; None stays None"""
+    if payload is None:
+        return None
+    adapter = _adapters.get(schema)
+    if adapter is None:
+        adapter = _adapters[schema] = TypeAdapter(schema)
+    data = adapter.dump_python(adapter.validate_python(payload, from_attributes=True), mode="json")
+    # Same rendering as fastapi's JSONResponse
+    body = json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+    return EncodedBody(body)
+
+def compose(**entries: EncodedBody):
+    """One JSON object whose members are already-encoded bodies, spliced in without re-serializing"""
+    members = [f'"{name}":'.encode("utf-8") + entry.body for name, entry in entries.items()]
+    return EncodedBody(b"{" + b",".join(members) + b"}")
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    # If-None-Match uses weak comparison
+    return etag in candidates or f"W/{etag}" in candidates
+
+def is_not_modified(request: Request, entry: EncodedBody) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    return if_none_match is not None and _etag_matches(if_none_match, entry.etag)
+
+def respond(request: Request, entry: EncodedBody, policy: str) -> Response:
+    """200 with the pre-encoded body, or 304 when the client's copy is current"""
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": CACHE_CONTROL_POLICIES[policy],
+    }
+    if is_not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
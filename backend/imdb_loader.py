@@ -0,0 +1,320 @@
+"""Bulk-load the public IMDb datasets (https://datasets.imdbws.com/) into movies, actors and movie_actors.
+
+    python imdb_loader.py --data-dir /data/imdb
+    python imdb_loader.py --data-dir /data/imdb --title-types movie,tvMovie --min-votes 100
+    python imdb_loader.py --data-dir /data/imdb --restart     # discard checkpoints and staging
+
+The gzip TSV files are streamed line by line into staging tables in fixed-size
+batches (COPY on PostgreSQL, executemany elsewhere), so memory stays bounded by the
+batch size whatever the file size. Movies, actors and cast are then merged with
+set-based INSERT ... SELECT statements keyed on imdb_id, so re-running updates rows
+instead of duplicating them.
+
+Every batch commits together with its checkpoint, so an interrupted run resumes at
+the first uncommitted batch; finished steps are skipped.
+
+Bulk writes bypass the ORM events, so running servers pick the new catalog up on
+their next search index / suggestion refresh (or restart).
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import time
+from sqlalchemy import (
+    Column, Float, Integer, MetaData, String, Table, exists, func, literal, select, text
+)
+from database import SessionLocal, dialect_insert
+import crud
+import models
+
+BATCH_SIZE = int(os.getenv("IMDB_BATCH_SIZE", "50000"))
+NULL = "\\N"
+
+staging = MetaData()
+
+title_basics = Table(
+    "staging_imdb_title_basics", staging,
+    Column("tconst", String, primary_key=True),
+    Column("primary_title", String),
+    Column("start_year", Integer),
+    Column("runtime_minutes", Integer),
+)
+title_ratings = Table(
+    "staging_imdb_title_ratings", staging,
+    Column("tconst", String, primary_key=True),
+    Column("average_rating", Float),
+    Column("num_votes", Integer),
+)
+name_basics = Table(
+    "staging_imdb_name_basics", staging,
+    Column("nconst", String, primary_key=True),
+    Column("primary_name", String),
+)
+title_principals = Table(
+    "staging_imdb_title_principals", staging,
+    Column("tconst", String),
+    Column("nconst", String),
+    Column("characters", String),
+)
+checkpoints = Table(
+    "staging_imdb_checkpoints", staging,
+    Column("step", String, primary_key=True),
+    Column("source_rows", Integer, nullable=False),
+    Column("finished", Integer, nullable=False),
+)
+
+def _int(value):
+    return None if value == NULL else int(value)
+
+def _float(value):
+    return None if value == NULL else float(value)
+
+def _str(value):
+    return None if value == NULL else value
+
+def _characters(value):
+    # '["Andy Dufresne"]' -> 'Andy Dufresne'
+    if value == NULL:
+        return None
+    try:
+        return " / ".join(json.loads(value))
+    except ValueError:
+        return value
+
+def title_basics_rows(fields, options):
+    tconst, title_type, primary_title, _, _, start_year, _, runtime_minutes, _ = fields
+    if title_type not in options.title_types:
+        return None
+    return (tconst, primary_title, _int(start_year), _int(runtime_minutes))
+
+def title_ratings_rows(fields, options):
+    tconst, average_rating, num_votes = fields
+    return (tconst, _float(average_rating), _int(num_votes))
+
+def name_basics_rows(fields, options):
+    return (fields[0], _str(fields[1]))
+
+def title_principals_rows(fields, options):
+    tconst, ordering, nconst, category, _, characters = fields
+    if category not in ("actor", "actress", "self") or int(ordering) > options.max_cast:
+        return None
+    return (tconst, nconst, _characters(characters))
+
+# step name -> (file, staging table, row mapper); the mapper returns None to skip a line
+STAGE_STEPS = [
+    ("stage:title.basics", "title.basics.tsv.gz", title_basics, title_basics_rows),
+    ("stage:title.ratings", "title.ratings.tsv.gz", title_ratings, title_ratings_rows),
+    ("stage:name.basics", "name.basics.tsv.gz", name_basics, name_basics_rows),
+    ("stage:title.principals", "title.principals.tsv.gz", title_principals, title_principals_rows),
+]
+
+class Progress:
+    """Prints rows/s for a step every few seconds and at the end"""
+
+    def __init__(self, step, every=5.0):
+        self.step = step
+        self.every = every
+        self.started = time.perf_counter()
+        self.last_report = self.started
+        self.rows = 0
+
+    def add(self, rows):
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self.last_report >= self.every:
+            self.last_report = now
+            self.report()
+
+    def report(self, final=False):
+        elapsed = time.perf_counter() - self.started
+        rate = self.rows / elapsed if elapsed else 0
+        print(f"{self.step}: {self.rows:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s){' done' if final else ''}", flush=True)
+
+def _checkpoint(db, step):
+    row = db.execute(select(checkpoints.c.source_rows, checkpoints.c.finished).where(checkpoints.c.step == step)).first()
+    return (row.source_rows, bool(row.finished)) if row else (0, False)
+
+def _save_checkpoint(db, step, source_rows, finished=False):
+    stmt = dialect_insert(db)(checkpoints).values(step=step, source_rows=source_rows, finished=int(finished))
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[checkpoints.c.step],
+        set_={"source_rows": stmt.excluded.source_rows, "finished": stmt.excluded.finished}
+    ))
+
+def _copy_value(value):
+    if value is None:
+        return NULL
+    # COPY text format: escape the characters it treats specially
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+def _write_batch(db, table, rows):
+    if db.get_bind().dialect.name == "postgresql":
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_value(value) for value in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        columns = ", ".join(column.name for column in table.columns)
+        cursor = db.connection().connection.cursor()
+        cursor.copy_expert(f"COPY {table.name} ({columns}) FROM STDIN", buffer)
+    else:
+        names = [column.name for column in table.columns]
+        db.execute(table.insert(), [dict(zip(names, row)) for row in rows])
+
+def stage_file(db, step, path, table, mapper, options):
+    """Stream one TSV into its staging table, committing a checkpoint with every batch"""
+    done_rows, finished = _checkpoint(db, step)
+    if finished:
+        print(f"{step}: already loaded, skipping")
+        return
+    if done_rows:
+        print(f"{step}: resuming after {done_rows:,} source rows")
+
+    progress = Progress(step)
+    batch = []
+    source_rows = 0
+    with gzip.open(path, "rt", encoding="utf-8", newline="\n") as source:
+        next(source)  # header
+        for line in source:
+            source_rows += 1
+            if source_rows <= done_rows:
+                continue
+            row = mapper(line.rstrip("\n").split("\t"), options)
+            if row is not None:
+                batch.append(row)
+            if len(batch) >= options.batch_size:
+                _write_batch(db, table, batch)
+                _save_checkpoint(db, step, source_rows)
+                db.commit()
+                progress.add(len(batch))
+                batch = []
+    if batch:
+        _write_batch(db, table, batch)
+        progress.add(len(batch))
+    _save_checkpoint(db, step, source_rows, finished=True)
+    db.commit()
+    progress.report(final=True)
+
+def merge_movies(db, options):
+    movies = models.Movie.__table__
+    rating = title_ratings.c
+    source = select(
+        title_basics.c.tconst,
+        title_basics.c.primary_title,
+        title_basics.c.start_year,
+        title_basics.c.runtime_minutes,
+        rating.average_rating,
+        rating.num_votes,
+        # What crud.refresh_popularity computes for a movie with only IMDb votes and no local activity
+        crud.popularity_expression(rating.average_rating, rating.num_votes, literal(0)),
+        literal(0),
+    ).select_from(
+        title_basics.outerjoin(title_ratings, title_ratings.c.tconst == title_basics.c.tconst)
+    ).where(func.coalesce(rating.num_votes, 0) >= options.min_votes)
+    stmt = dialect_insert(db)(movies).from_select(
+        ["imdb_id", "title", "release_year", "duration", "imdb_score", "imdb_votes", "popularity_score", "view_count"], source
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[movies.c.imdb_id],
+        set_={
+            "title": stmt.excluded.title,
+            "release_year": stmt.excluded.release_year,
+            "duration": stmt.excluded.duration,
+            "imdb_score": stmt.excluded.imdb_score,
+            "imdb_votes": stmt.excluded.imdb_votes,
+        }
+    )
+    return db.execute(stmt).rowcount
+
+def merge_actors(db, options):
+    actors = models.Actor.__table__
+    movies = models.Movie.__table__
+    # Only people credited in a loaded movie, not all of name.basics
+    credited = exists().where(
+        title_principals.c.nconst == name_basics.c.nconst,
+        movies.c.imdb_id == title_principals.c.tconst,
+    )
+    source = select(name_basics.c.nconst, name_basics.c.primary_name).where(
+        name_basics.c.primary_name.isnot(None), credited
+    )
+    stmt = dialect_insert(db)(actors).from_select(["imdb_id", "name"], source)
+    stmt = stmt.on_conflict_do_update(index_elements=[actors.c.imdb_id], set_={"name": stmt.excluded.name})
+    return db.execute(stmt).rowcount
+
+def merge_cast(db, options):
+    movie_actors = models.MovieActor.__table__
+    movies = models.Movie.__table__
+    actors = models.Actor.__table__
+    already_linked = exists().where(
+        movie_actors.c.movie_id == movies.c.id,
+        movie_actors.c.actor_id == actors.c.id,
+    )
+    source = select(movies.c.id, actors.c.id, func.min(title_principals.c.characters)).select_from(
+        title_principals
+        .join(movies, movies.c.imdb_id == title_principals.c.tconst)
+        .join(actors, actors.c.imdb_id == title_principals.c.nconst)
+    ).where(~already_linked).group_by(movies.c.id, actors.c.id)
+    stmt = movie_actors.insert().from_select(["movie_id", "actor_id", "character_name"], source)
+    return db.execute(stmt).rowcount
+
+MERGE_STEPS = [
+    ("merge:movies", merge_movies),
+    ("merge:actors", merge_actors),
+    ("merge:cast", merge_cast),
+]
+
+def run_merge(db, step, merge, options):
+    if _checkpoint(db, step)[1]:
+        print(f"{step}: already merged, skipping")
+        return
+    # Built once after staging rather than maintained through every COPY batch
+    db.execute(text(f"CREATE INDEX IF NOT EXISTS ix_staging_imdb_principals_nconst ON {title_principals.name} (nconst)"))
+    db.execute(text(f"CREATE INDEX IF NOT EXISTS ix_staging_imdb_principals_tconst ON {title_principals.name} (tconst)"))
+    progress = Progress(step)
+    progress.add(merge(db, options))
+    _save_checkpoint(db, step, progress.rows, finished=True)
+    db.commit()
+    progress.report(final=True)
+
+def prepare(db, restart=False):
+    bind = db.connection()
+    if restart:
+        staging.drop_all(bind)
+    staging.create_all(bind)
+    if bind.dialect.name == "postgresql":
+        # Scratch data that a restart can rebuild: skip WAL for it
+        for table in staging.sorted_tables:
+            db.execute(text(f"ALTER TABLE {table.name} SET UNLOGGED"))
+    db.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Load IMDb TSV datasets into the catalog")
+    parser.add_argument("--data-dir", required=True, help="directory with the *.tsv.gz files")
+    parser.add_argument("--title-types", default="movie", help="comma-separated titleType values to load")
+    parser.add_argument("--min-votes", type=int, default=0, help="skip titles with fewer IMDb votes")
+    parser.add_argument("--max-cast", type=int, default=10, help="highest billing position (ordering) to keep")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true", help="drop staging tables and checkpoints first")
+    parser.add_argument("--keep-staging", action="store_true", help="leave the staging tables in place when done")
+    options = parser.parse_args()
+    options.title_types = set(options.title_types.split(","))
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        prepare(db, restart=options.restart)
+        for step, filename, table, mapper in STAGE_STEPS:
+            stage_file(db, step, os.path.join(options.data_dir, filename), table, mapper, options)
+        for step, merge in MERGE_STEPS:
+            run_merge(db, step, merge, options)
+        if not options.keep_staging:
+            staging.drop_all(db.connection())
+            db.commit()
+    finally:
+        db.close()
+    print(f"IMDb load finished in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
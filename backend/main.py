@@ -1,24 +1,56 @@
-from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile
+import json
+import time
+# Measured from here: module import, lifespan startup, first served request
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from database import get_db, engine
+from database import get_db, engine, async_engine, DB_MODE
 import models
 import schemas
 import auth
 import crud
 import google_auth
+import http_cache
+from suggest import MAX_SUGGESTIONS, suggester
+from search_index import catalog_index
+from view_buffer import view_buffer
+from cache import response_cache
+import pool_metrics
+import query_stats
+import rating_import
+import metrics
+import route_metrics
+
+# Schema and sample data are no longer touched on import: run `python manage.py migrate`
+# and `python manage.py seed` once per deploy, not once per worker
 
-models.Base.metadata.create_all(bind=engine)
+startup_timings = {"import_ms": None, "startup_ms": None, "first_request_ms": None}
 
-# Seed sample data
-try:
-    from seed_data import seed_movies
-    seed_movies()
-except Exception as e:
-    print(f"Error seeding data: {e}")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    view_buffer.start()
+    # Loads in a background thread; /search answers from SQL until it is ready
+    catalog_index.ensure_loaded()
+    # Also in the background; /suggest returns no suggestions until it is ready
+    suggester.ensure_loaded()
+    startup_timings["startup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    print(f"Startup: imports {startup_timings['import_ms']} ms, lifespan {startup_timings['startup_ms']} ms")
+    yield
+    # Buffered page views would otherwise be lost on a clean shutdown or --reload
+    view_buffer.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
 
-app = FastAPI(title="IMDB Clone API", version="1.0.0")
+app = FastAPI(title="IMDB Clone API", version="1.0.0", lifespan=lifespan)
+# Every route below records its own request count, latency histogram and in-flight gauge
+app.router.route_class = route_metrics.MetricsRoute
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,23 +61,58 @@ app.add_middleware(
 )
 
 security = HTTPBearer()
+# For public routes with optional per-user extras
+optional_security = HTTPBearer(auto_error=False)
+
+@app.middleware("http")
+async def record_first_request(request: Request, call_next):
+    response = await call_next(request)
+    if startup_timings["first_request_ms"] is None:
+        startup_timings["first_request_ms"] = round((time.perf_counter() - _import_started) * 1000, 1)
+    return response
+
+@app.middleware("http")
+async def label_database_work(request: Request, call_next):
+    # Lets pool_metrics attribute long connection holds to the handler responsible
+    token = pool_metrics.request_scope.set(request.scope)
+    try:
+        return await call_next(request)
+    finally:
+        pool_metrics.request_scope.reset(token)
+
+@app.middleware("http")
+async def track_queries(request: Request, call_next):
+    # Statement count and DB time for this request: Server-Timing header, N+1 flags and logs
+    with query_stats.track(request.scope) as stats:
+        response = await call_next(request)
+    if query_stats.SERVER_TIMING:
+        response.headers["Server-Timing"] = stats.server_timing()
+    query_stats.finish(stats, response.status_code)
+    return response
+
+if DB_MODE == "async":
+    # Registered first, so these async handlers win over the sync routes below
+    import routes_async
+    app.include_router(routes_async.router)
 
 @app.get("/")
 def read_root():
     return {"message": "IMDB Clone API"}
 
 @app.post("/register", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    # Check if email is already registered
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    # Database work runs in the threadpool and bcrypt on auth.hashing_pool,
+    # so a burst of sign-ups does not hold request threads while hashing
+    db_user = await run_in_threadpool(crud.get_user_by_email, db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=400, 
             detail="An account with this email already exists. Please use a different email or try logging in."
         )
     
+    hashed_password = await auth.get_password_hash_async(user.password)
     try:
-        return crud.create_user(db=db, user=user)
+        return await run_in_threadpool(crud.create_user, db=db, user=user, hashed_password=hashed_password)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -53,17 +120,20 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
 
 @app.post("/login")
-def login_user(user: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login_user(user: schemas.UserLogin, db: Session = Depends(get_db)):
     # Check if user exists
-    db_user = crud.get_user_by_email(db, email=user.email)
+    db_user = await run_in_threadpool(crud.get_user_by_email, db, email=user.email)
     if not db_user:
+        auth.login_attempts.inc(result="unknown_email")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="No account found with this email address"
         )
     
     # Check password
-    if not auth.verify_password(user.password, db_user.hashed_password):
+    valid, new_hash = await auth.verify_password_async(user.password, db_user.hashed_password)
+    if not valid:
+        auth.login_attempts.inc(result="invalid_password")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect password"
@@ -71,13 +141,39 @@ def login_user(user: schemas.UserLogin, db: Session = Depends(get_db)):
     
     # Check if account is active
     if not db_user.is_active:
+        auth.login_attempts.inc(result="disabled")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Account is disabled. Please contact support."
         )
     
-    access_token = auth.create_access_token(data={"sub": db_user.email})
-    return {"access_token": access_token, "token_type": "bearer", "user": schemas.User.from_orm(db_user)}
+    user_data = schemas.User.from_orm(db_user)
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was made: store it at the current cost
+        await run_in_threadpool(crud.update_password_hash, db, db_user, new_hash)
+    
+    refresh_token = await run_in_threadpool(auth.issue_refresh_token, db, user_data.id)
+    auth.login_attempts.inc(result="success")
+    return {**auth.token_response(user_data.email, refresh_token), "user": user_data}
+
+@app.post("/auth/refresh")
+def refresh_access_token(body: schemas.RefreshRequest, db: Session = Depends(get_db)):
+    # One indexed lookup by token hash; the password is not involved
+    email, refresh_token = auth.rotate_refresh_token(db, body.refresh_token)
+    return auth.token_response(email, refresh_token)
+
+@app.post("/auth/logout")
+def logout(body: schemas.RefreshRequest, db: Session = Depends(get_db)):
+    auth.revoke_refresh_token(db, body.refresh_token)
+    return {"message": "Logged out"}
+
+@app.get("/auth/hashing/stats")
+def hashing_stats():
+    return auth.hashing_pool.stats()
+
+@app.get("/auth/google/stats")
+def google_certs_stats():
+    return google_auth.google_certs.stats()
 
 @app.post("/auth/google")
 def google_login(google_data: schemas.GoogleLogin, db: Session = Depends(get_db)):
@@ -112,9 +208,10 @@ def google_login(google_data: schemas.GoogleLogin, db: Session = Depends(get_db)
                 detail="Account is disabled. Please contact support."
             )
         
-        # Create access token
-        access_token = auth.create_access_token(data={"sub": db_user.email})
-        return {"access_token": access_token, "token_type": "bearer", "user": schemas.User.from_orm(db_user)}
+        # Create access and refresh tokens
+        user_data = schemas.User.from_orm(db_user)
+        refresh_token = auth.issue_refresh_token(db, db_user.id)
+        return {**auth.token_response(user_data.email, refresh_token), "user": user_data}
         
     except HTTPException:
         raise
@@ -129,36 +226,176 @@ def google_login(google_data: schemas.GoogleLogin, db: Session = Depends(get_db)
             detail="Google authentication failed. Please try again later."
         )
 
-@app.get("/movies", response_model=list[schemas.Movie])
-def get_movies(skip: int = 0, limit: int = 20, lang: str = "en", db: Session = Depends(get_db)):
-    return crud.get_movies(db, skip=skip, limit=limit, lang=lang)
+@app.get("/movies", response_model=list[schemas.ListedMovie])
+def get_movies(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=crud.MAX_MOVIES_PAGE_SIZE),
+    lang: str = "en",
+    in_watchlist: bool = False,
+    db: Session = Depends(get_db),
+    credentials: HTTPAuthorizationCredentials = Depends(optional_security)
+):
+    entry = response_cache.get_or_load(
+        "movies", ("offset", skip, limit, lang),
+        lambda: http_cache.encode(list[schemas.Movie], crud.get_movies(db, skip=skip, limit=limit, lang=lang))
+    )
+    if not in_watchlist:
+        return http_cache.respond(request, entry, "movies")
+    
+    # The shared cached page plus one lookup of its ids on the user's watchlist
+    current_user = auth.get_current_user(db, auth.require_token(credentials))
+    movies = crud.flag_watchlist(db, current_user.id, json.loads(entry.body))
+    return http_cache.respond(request, http_cache.encode(list[schemas.ListedMovie], movies), "watchlist")
+
+# Declared before /movies/{movie_id} so "ranked" is not parsed as an id
+@app.get("/movies/ranked", response_model=schemas.MoviePage)
+def get_movies_ranked(request: Request, cursor: str = None, limit: int = Query(20, ge=1, le=crud.MAX_MOVIES_PAGE_SIZE), lang: str = "en", db: Session = Depends(get_db)):
+    try:
+        entry = response_cache.get_or_load(
+            "movies", ("ranked", cursor, limit, lang),
+            lambda: http_cache.encode(schemas.MoviePage, crud.get_movies_page(db, cursor=cursor, limit=limit, lang=lang))
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return http_cache.respond(request, entry, "movies")
+
+# Declared before /movies/{movie_id} as well. Reads only: no views are recorded for batch lookups.
+@app.get("/movies/batch", response_model=schemas.MovieBatch)
+def get_movies_batch(request: Request, ids: str, lang: str = "en", db: Session = Depends(get_db)):
+    try:
+        movie_ids = crud.parse_id_list(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    entry = response_cache.get_or_load(
+        "movies", ("batch", tuple(movie_ids), lang),
+        lambda: http_cache.encode(schemas.MovieBatch, crud.get_movies_batch(db, movie_ids, lang=lang))
+    )
+    return http_cache.respond(request, entry, "movies")
 
 @app.get("/movies/{movie_id}", response_model=schemas.MovieDetail)
-def get_movie(movie_id: int, lang: str = "en", db: Session = Depends(get_db)):
-    movie = crud.get_movie(db, movie_id=movie_id, lang=lang)
-    if movie is None:
+def get_movie(movie_id: int, request: Request, lang: str = "en", db: Session = Depends(get_db)):
+    entry = response_cache.get_or_load(
+        f"movie:{movie_id}", (lang,),
+        lambda: http_cache.encode(schemas.MovieDetail, crud.get_movie(db, movie_id=movie_id, lang=lang))
+    )
+    if entry is None:
         raise HTTPException(status_code=404, detail="Movie not found")
-    return movie
+    
+    # Buffer the view; view_buffer writes it (and the new popularity) in a later batch.
+    # view_count in the body is the flushed count, so the ETag stays stable between flushes.
+    view_buffer.record(movie_id)
+    return http_cache.respond(request, entry, "movie")
 
-@app.get("/movies/{movie_id}/rating-stats")
-def get_movie_rating_stats(movie_id: int, country: str = "All", db: Session = Depends(get_db)):
-    stats = crud.get_movie_rating_stats(db, movie_id=movie_id, country=country)
+@app.get("/movies/{movie_id}/rating-stats", response_model=schemas.RatingStats)
+def get_movie_rating_stats(movie_id: int, request: Request, country: str = "All", limit: int = Query(None, ge=1, le=crud.MAX_RATINGS_PAGE_SIZE), db: Session = Depends(get_db)):
+    stats = crud.get_movie_rating_stats(db, movie_id=movie_id, country=country, limit=limit)
     if stats is None:
         raise HTTPException(status_code=404, detail="Movie not found")
-    return stats
+    return http_cache.respond(request, http_cache.encode(schemas.RatingStats, stats), "rating_stats")
+
+@app.get("/movies/{movie_id}/page", response_model=schemas.MovieDetailPage)
+def get_movie_page(movie_id: int, request: Request, lang: str = "en", country: str = "All", limit: int = Query(None, ge=1, le=crud.MAX_RATINGS_PAGE_SIZE), db: Session = Depends(get_db)):
+    # /movies/{id} and /movies/{id}/rating-stats in one round trip. The detail is the same
+    # cache entry /movies/{id} serves, so a warm page costs only the rating stats queries
+    # (and no movie existence check, the detail already answered that).
+    movie = response_cache.get_or_load(
+        f"movie:{movie_id}", (lang,),
+        lambda: http_cache.encode(schemas.MovieDetail, crud.get_movie(db, movie_id=movie_id, lang=lang))
+    )
+    if movie is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    stats = http_cache.encode(schemas.RatingStats, crud.rating_stats(db, movie_id=movie_id, country=country, limit=limit))
+    
+    view_buffer.record(movie_id)
+    return http_cache.respond(request, http_cache.compose(movie=movie, rating_stats=stats), "movie_page")
+
+@app.get("/movies/{movie_id}/ratings", response_model=schemas.RatingPage)
+def get_movie_ratings(movie_id: int, country: str = "All", cursor: str = None, limit: int = Query(None, ge=1, le=crud.MAX_RATINGS_PAGE_SIZE), db: Session = Depends(get_db)):
+    try:
+        page = crud.get_movie_ratings_page(db, movie_id=movie_id, country=country, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if page is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return page
+
+# Declared before /actors/{actor_id} so "batch" is not parsed as an id
+@app.get("/actors/batch", response_model=schemas.ActorBatch)
+def get_actors_batch(request: Request, ids: str, db: Session = Depends(get_db)):
+    try:
+        actor_ids = crud.parse_id_list(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    entry = response_cache.get_or_load(
+        "actors", ("batch", tuple(actor_ids)),
+        lambda: http_cache.encode(schemas.ActorBatch, crud.get_actors_batch(db, actor_ids))
+    )
+    return http_cache.respond(request, entry, "actor")
 
 @app.get("/actors/{actor_id}", response_model=schemas.ActorDetail)
-def get_actor(actor_id: int, db: Session = Depends(get_db)):
-    actor = crud.get_actor(db, actor_id=actor_id)
-    if actor is None:
+def get_actor(actor_id: int, request: Request, db: Session = Depends(get_db)):
+    entry = response_cache.get_or_load(
+        "actors", (actor_id,),
+        lambda: http_cache.encode(schemas.ActorDetail, crud.get_actor_detail(db, actor_id=actor_id))
+    )
+    if entry is None:
         raise HTTPException(status_code=404, detail="Actor not found")
-    return actor
+    return http_cache.respond(request, entry, "actor")
 
 @app.get("/search")
-def search_movies(q: str, search_type: str = "all", limit: int = 10, lang: str = "en", db: Session = Depends(get_db)):
+def search_movies(
+    q: str,
+    search_type: str = "all",
+    limit: int = Query(10, ge=1, le=50),
+    lang: str = "en",
+    in_watchlist: bool = False,
+    db: Session = Depends(get_db),
+    credentials: HTTPAuthorizationCredentials = Depends(optional_security)
+):
     if len(q) < 3:
         limit = 3
-    return crud.search_movies(db, query=q, search_type=search_type, limit=limit, lang=lang)
+    results = crud.search_movies(db, query=q, search_type=search_type, limit=limit, lang=lang)
+    if in_watchlist:
+        current_user = auth.get_current_user(db, auth.require_token(credentials))
+        crud.flag_watchlist(db, current_user.id, results["movies"])
+    return results
+
+@app.get("/suggest")
+def suggest(q: str, search_type: str = "all", limit: int = Query(5, ge=1, le=MAX_SUGGESTIONS), lang: str = "en"):
+    # Served from memory; no suggestions until the startup load has finished
+    if not suggester.ensure_loaded():
+        return {"suggestions": []}
+    return {"suggestions": suggester.suggest(q, lang=lang, limit=limit, search_type=search_type)}
+
+@app.get("/cache/stats")
+def cache_stats():
+    return response_cache.stats()
+
+@app.get("/suggest/stats")
+def suggest_stats():
+    return suggester.stats()
+
+@app.get("/debug/startup", dependencies=[Depends(auth.require_admin_key)])
+def startup_report():
+    return startup_timings
+
+@app.get("/debug/pool", dependencies=[Depends(auth.require_admin_key)])
+def pool_report():
+    engines = [engine] + ([async_engine.sync_engine] if async_engine is not None else [])
+    return {
+        "pools": [pool_metrics.pool_status(db_engine) for db_engine in engines],
+        "slow_holds": pool_metrics.slow_hold_log.report()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Per worker process: scrape each worker (or run a single worker per container)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/queries", dependencies=[Depends(auth.require_admin_key)])
+def debug_queries():
+    return query_stats.flagged_log.report()
 
 @app.post("/movies/{movie_id}/rate")
 def rate_movie(
@@ -170,6 +407,21 @@ def rate_movie(
     current_user = auth.get_current_user(db, credentials.credentials)
     return crud.create_rating(db, rating=rating, movie_id=movie_id, user_id=current_user.id)
 
+@app.post("/admin/ratings/import", dependencies=[Depends(auth.require_admin_key)])
+def import_ratings(payload: schemas.RatingImport, db: Session = Depends(get_db)):
+    if len(payload.ratings) > rating_import.API_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {rating_import.API_MAX_ROWS} ratings per request")
+    try:
+        totals, movie_ids = rating_import.import_rows(
+            db, (row.model_dump() for row in payload.ratings), on_conflict=payload.on_conflict
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    for movie_id in movie_ids:
+        crud.invalidate_rating_histogram(movie_id)
+    crud.invalidate_movie_cache(movie_ids)
+    return totals
+
 @app.post("/movies/{movie_id}/watchlist")
 def add_to_watchlist(
     movie_id: int,
@@ -179,13 +431,41 @@ def add_to_watchlist(
     current_user = auth.get_current_user(db, credentials.credentials)
     return crud.add_to_watchlist(db, movie_id=movie_id, user_id=current_user.id)
 
+@app.post("/me/watchlist")
+def add_many_to_watchlist(
+    payload: schemas.WatchlistBulk,
+    db: Session = Depends(get_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    try:
+        movie_ids = crud.distinct_ids(payload.movie_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    current_user = auth.get_current_user(db, credentials.credentials)
+    return crud.add_many_to_watchlist(db, movie_ids=movie_ids, user_id=current_user.id)
+
+@app.delete("/me/watchlist")
+def remove_many_from_watchlist(
+    movie_ids: str,
+    db: Session = Depends(get_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    try:
+        movie_ids = crud.parse_id_list(movie_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    current_user = auth.get_current_user(db, credentials.credentials)
+    return crud.remove_many_from_watchlist(db, movie_ids=movie_ids, user_id=current_user.id)
+
 @app.get("/me/watchlist", response_model=list[schemas.WatchlistItem])
 def get_watchlist(
+    request: Request,
     db: Session = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     current_user = auth.get_current_user(db, credentials.credentials)
-    return crud.get_user_watchlist(db, user_id=current_user.id)
+    watchlist = crud.get_user_watchlist(db, user_id=current_user.id)
+    return http_cache.respond(request, http_cache.encode(list[schemas.WatchlistItem], watchlist), "watchlist")
 
 @app.delete("/watchlist/{watchlist_id}")
 def remove_from_watchlist(
@@ -207,4 +487,6 @@ async def upload_photo(
     content = await file.read()
     filename = f"user_{current_user.id}_{file.filename}"
     # In production, save to cloud storage
-    return {"filename": filename, "message": "Photo uploaded successfully"}
\ No newline at end of file
+    return {"filename": filename, "message": "Photo uploaded successfully"}
+
+startup_timings["import_ms"] = round((time.perf_counter() - _import_started) * 1000, 1)
@@ -0,0 +1,63 @@
+"""Operational commands that used to run implicitly when main.py was imported.
+
+    python manage.py migrate            # apply Alembic migrations (adopts pre-Alembic databases)
+    python manage.py seed               # insert the sample catalog into an empty database
+    python manage.py makemigration -m "add something"
+    python manage.py current
+"""
+import argparse
+import os
+import time
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from database import engine
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Head of the schema the old import-time create_all produced
+BASELINE_REVISION = "0001"
+
+def alembic_config():
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "migrations"))
+    return config
+
+def migrate(revision="head"):
+    config = alembic_config()
+    tables = inspect(engine).get_table_names()
+    if "alembic_version" not in tables and "movies" in tables:
+        # Created by create_all before migrations existed: adopt it as the baseline,
+        # later revisions skip whatever create_all already added
+        print(f"Existing schema without migration history, stamping {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, revision)
+
+def seed():
+    from seed_data import seed_movies
+    seed_movies()
+
+def main():
+    parser = argparse.ArgumentParser(description="Database and deployment commands")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subcommands.add_parser("migrate", help="upgrade the schema")
+    migrate_parser.add_argument("revision", nargs="?", default="head")
+    subcommands.add_parser("seed", help="load the sample catalog if the database has no movies")
+    revision_parser = subcommands.add_parser("makemigration", help="autogenerate a revision from models.py")
+    revision_parser.add_argument("-m", "--message", required=True)
+    subcommands.add_parser("current", help="show the applied revision")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == "migrate":
+        migrate(args.revision)
+    elif args.command == "seed":
+        seed()
+    elif args.command == "makemigration":
+        command.revision(alembic_config(), message=args.message, autogenerate=True)
+    elif args.command == "current":
+        command.current(alembic_config())
+    print(f"{args.command} done in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Minimal in-process metrics: counters, gauges and histograms with optional labels.
+
+Metrics register themselves in REGISTRY by name; creating one that already exists
+returns the existing instance, so modules can declare what they record at import time.
+Components that already keep their own counters (caches, pools) expose them with
+callback(), read at scrape time instead of being updated on the hot path.
+render() writes the registry in the Prometheus text exposition format.
+"""
+import bisect
+import threading
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+    def labels(self, **labels):
+        """This metric with its label values fixed; hot paths bind once instead of building the key per call"""
+        return Bound(self, self._key(labels))
+
+    def samples(self):
+        """[(labels dict, value)] for every label combination seen so far"""
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.labelnames, key)), value) for key, value in items]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        self._inc(self._key(labels), amount)
+
+    def _inc(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        self._inc(self._key(labels), amount)
+
+    def _inc(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+class HistogramValue:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key, value):
+        # Index of the first bucket the value fits in; len(buckets) is the +Inf bucket
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = HistogramValue(len(self.buckets) + 1)
+            entry.counts[index] += 1
+            entry.count += 1
+            entry.sum += value
+
+    def snapshot(self, **labels):
+        """count, sum, cumulative bucket counts and bucket-estimated p50/p95/p99"""
+        entry = self._values.get(self._key(labels))
+        if entry is None:
+            return {"count": 0, "sum": 0.0, "buckets": {}, "p50": None, "p95": None, "p99": None}
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + (float("inf"),), entry.counts):
+            running += count
+            cumulative[bound] = running
+        return {
+            "count": entry.count,
+            "sum": round(entry.sum, 6),
+            "buckets": {("+Inf" if bound == float("inf") else bound): count for bound, count in cumulative.items()},
+            "p50": self._quantile(cumulative, entry.count, 0.50),
+            "p95": self._quantile(cumulative, entry.count, 0.95),
+            "p99": self._quantile(cumulative, entry.count, 0.99),
+        }
+
+    @staticmethod
+    def _quantile(cumulative, total, q):
+        # Upper bound of the bucket holding the q-th observation
+        rank = q * total
+        for bound, count in cumulative.items():
+            if count >= rank:
+                return None if bound == float("inf") else bound
+        return None
+
+class Bound:
+    """A metric with fixed label values (see Metric.labels)"""
+    __slots__ = ("metric", "key")
+
+    def __init__(self, metric, key):
+        self.metric = metric
+        self.key = key
+
+    def inc(self, amount=1):
+        self.metric._inc(self.key, amount)
+
+    def dec(self, amount=1):
+        self.metric._inc(self.key, -amount)
+
+    def observe(self, value):
+        self.metric._observe(self.key, value)
+
+class Callback(Metric):
+    """Samples computed on collection: fn() returns {labels tuple or value: number}"""
+
+    def __init__(self, name, help, kind, fn, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self):
+        values = self.fn()
+        if not isinstance(values, dict):
+            return [({}, values)]
+        return [(dict(zip(self.labelnames, key if isinstance(key, tuple) else (key,))), value) for key, value in values.items()]
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def collect(self):
+        return list(self._metrics.values())
+
+REGISTRY = Registry()
+
+def counter(name, help, labelnames=()):
+    return REGISTRY.register(Counter(name, help, labelnames))
+
+def gauge(name, help, labelnames=()):
+    return REGISTRY.register(Gauge(name, help, labelnames))
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))
+
+def callback(name, help, fn, kind="gauge", labelnames=()):
+    return REGISTRY.register(Callback(name, help, kind, fn, labelnames))
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in labels.items()]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def render(registry=REGISTRY):
+    """Every metric in the Prometheus text format (version 0.0.4)"""
+    lines = []
+    for metric in sorted(registry.collect(), key=lambda metric: metric.name):
+        try:
+            samples = metric.samples()
+        except Exception as e:
+            # One broken callback must not take the whole scrape down
+            lines.append(f"# {metric.name} unavailable: {_escape(e)}")
+            continue
+        lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for labels, value in samples:
+            if metric.kind != "histogram":
+                if value is not None:
+                    lines.append(f"{metric.name}{_labels(labels)} {_number(value)}")
+                continue
+            running = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), value.counts):
+                running += count
+                lines.append(f"{metric.name}_bucket{_labels(labels, ('le', _number(bound)))} {running}")
+            lines.append(f"{metric.name}_sum{_labels(labels)} {_number(value.sum)}")
+            lines.append(f"{metric.name}_count{_labels(labels)} {value.count}")
+    return "\n".join(lines) + "\n"
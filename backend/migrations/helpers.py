@@ -0,0 +1,12 @@
+"""Existence checks for migrations that may meet tables an older create_all already made"""
+import sqlalchemy as sa
+from alembic import op
+
+def has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+def has_index(table, name):
+    return any(index["name"] == name for index in sa.inspect(op.get_bind()).get_indexes(table))
+
+def has_column(table, name):
+    return any(column["name"] == name for column in sa.inspect(op.get_bind()).get_columns(table))
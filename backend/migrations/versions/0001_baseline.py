@@ -0,0 +1,93 @@
+"""Baseline: the schema main.py used to create with create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=True),
+        sa.Column("country", sa.String()),
+        sa.Column("city", sa.String()),
+        sa.Column("photo_url", sa.Text()),
+        sa.Column("google_id", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_google_id", "users", ["google_id"], unique=True)
+
+    op.create_table(
+        "movies",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("title_tr", sa.String()),
+        sa.Column("summary", sa.Text()),
+        sa.Column("summary_tr", sa.Text()),
+        sa.Column("release_year", sa.Integer()),
+        sa.Column("duration", sa.Integer()),
+        sa.Column("image_url", sa.String()),
+        sa.Column("trailer_url", sa.String()),
+        sa.Column("imdb_score", sa.Float()),
+        sa.Column("popularity_score", sa.Float()),
+        sa.Column("view_count", sa.Integer()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_movies_id", "movies", ["id"])
+    op.create_index("ix_movies_title", "movies", ["title"])
+
+    op.create_table(
+        "actors",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("bio", sa.Text()),
+        sa.Column("birth_date", sa.DateTime()),
+        sa.Column("photo_url", sa.String()),
+    )
+    op.create_index("ix_actors_id", "actors", ["id"])
+    op.create_index("ix_actors_name", "actors", ["name"])
+
+    op.create_table(
+        "movie_actors",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("movie_id", sa.Integer(), sa.ForeignKey("movies.id")),
+        sa.Column("actor_id", sa.Integer(), sa.ForeignKey("actors.id")),
+        sa.Column("character_name", sa.String()),
+    )
+    op.create_index("ix_movie_actors_id", "movie_actors", ["id"])
+
+    op.create_table(
+        "ratings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("movie_id", sa.Integer(), sa.ForeignKey("movies.id")),
+        sa.Column("rating", sa.Float(), nullable=False),
+        sa.Column("comment", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_ratings_id", "ratings", ["id"])
+
+    op.create_table(
+        "watchlist",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("movie_id", sa.Integer(), sa.ForeignKey("movies.id")),
+        sa.Column("added_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_watchlist_id", "watchlist", ["id"])
+
+def downgrade():
+    for table in ("watchlist", "ratings", "movie_actors", "actors", "movies", "users"):
+        op.drop_table(table)
@@ -0,0 +1,54 @@
+"""Rating aggregates, rating histogram and the listing/review keyset indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import has_index, has_table
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if not has_index("movies", "ix_movies_popularity_id"):
+        op.create_index("ix_movies_popularity_id", "movies", ["popularity_score", "id"])
+    if not has_index("ratings", "ix_ratings_movie_created_id"):
+        op.create_index("ix_ratings_movie_created_id", "ratings", ["movie_id", "created_at", "id"])
+
+    if not has_table("movie_rating_stats"):
+        op.create_table(
+            "movie_rating_stats",
+            sa.Column("movie_id", sa.Integer(), sa.ForeignKey("movies.id"), primary_key=True),
+            sa.Column("rating_sum", sa.Float(), nullable=False),
+            sa.Column("rating_count", sa.Integer(), nullable=False),
+        )
+        op.execute(
+            "INSERT INTO movie_rating_stats (movie_id, rating_sum, rating_count) "
+            "SELECT movie_id, SUM(rating), COUNT(id) FROM ratings GROUP BY movie_id"
+        )
+
+    if not has_table("movie_rating_histogram"):
+        op.create_table(
+            "movie_rating_histogram",
+            sa.Column("movie_id", sa.Integer(), sa.ForeignKey("movies.id"), primary_key=True),
+            sa.Column("country", sa.String(), primary_key=True),
+            sa.Column("bucket", sa.Integer(), primary_key=True),
+            sa.Column("count", sa.Integer(), nullable=False),
+        )
+        # Same bucketing as crud.rating_bucket_expression
+        op.execute(
+            "INSERT INTO movie_rating_histogram (movie_id, country, bucket, count) "
+            "SELECT ratings.movie_id, COALESCE(users.country, ''), CAST(FLOOR(ratings.rating + 0.5) AS INTEGER), COUNT(ratings.id) "
+            "FROM ratings JOIN users ON users.id = ratings.user_id "
+            "GROUP BY ratings.movie_id, COALESCE(users.country, ''), CAST(FLOOR(ratings.rating + 0.5) AS INTEGER)"
+        )
+
+def downgrade():
+    op.drop_table("movie_rating_histogram")
+    op.drop_table("movie_rating_stats")
+    op.drop_index("ix_ratings_movie_created_id", table_name="ratings")
+    op.drop_index("ix_movies_popularity_id", table_name="movies")
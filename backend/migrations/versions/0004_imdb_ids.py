@@ -0,0 +1,37 @@
+"""IMDb identifiers on movies and actors, movie_actors lookup indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import has_column, has_index
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Databases created by an older create_all may already have the columns
+    for table in ("movies", "actors"):
+        if not has_column(table, "imdb_id"):
+            with op.batch_alter_table(table) as batch:
+                batch.add_column(sa.Column("imdb_id", sa.String(), nullable=True))
+        if not has_index(table, f"ix_{table}_imdb_id"):
+            op.create_index(f"ix_{table}_imdb_id", table, ["imdb_id"], unique=True)
+    if not has_index("movie_actors", "ix_movie_actors_movie_actor"):
+        op.create_index("ix_movie_actors_movie_actor", "movie_actors", ["movie_id", "actor_id"])
+    if not has_index("movie_actors", "ix_movie_actors_actor_id"):
+        op.create_index("ix_movie_actors_actor_id", "movie_actors", ["actor_id"])
+
+def downgrade():
+    op.drop_index("ix_movie_actors_actor_id", table_name="movie_actors")
+    op.drop_index("ix_movie_actors_movie_actor", table_name="movie_actors")
+    op.drop_index("ix_actors_imdb_id", table_name="actors")
+    with op.batch_alter_table("actors") as batch:
+        batch.drop_column("imdb_id")
+    op.drop_index("ix_movies_imdb_id", table_name="movies")
+    with op.batch_alter_table("movies") as batch:
+        batch.drop_column("imdb_id")
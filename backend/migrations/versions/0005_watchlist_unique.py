@@ -0,0 +1,26 @@
+"""Unique (user_id, movie_id) on watchlist
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+from migrations.helpers import has_index
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if has_index("watchlist", "uq_watchlist_user_movie"):
+        return
+    # Duplicates from the old check-then-insert race: keep the earliest entry of each pair
+    op.execute(
+        "DELETE FROM watchlist WHERE id NOT IN "
+        "(SELECT MIN(id) FROM watchlist GROUP BY user_id, movie_id)"
+    )
+    op.create_index("uq_watchlist_user_movie", "watchlist", ["user_id", "movie_id"], unique=True)
+
+def downgrade():
+    op.drop_index("uq_watchlist_user_movie", table_name="watchlist")
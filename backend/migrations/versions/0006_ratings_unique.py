@@ -0,0 +1,42 @@
+"""Unique (user_id, movie_id) on ratings
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import has_index
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if has_index("ratings", "uq_ratings_user_movie"):
+        return
+    # Duplicates from the old select-then-insert race: keep the newest rating of each pair
+    stale = "SELECT id FROM ratings WHERE id NOT IN (SELECT MAX(id) FROM ratings GROUP BY user_id, movie_id)"
+    duplicates = op.get_bind().execute(sa.text(f"SELECT COUNT(*) FROM ({stale}) AS stale")).scalar()
+    if duplicates:
+        op.execute(f"DELETE FROM ratings WHERE id IN ({stale})")
+        # The running aggregates counted the removed rows; recount them as 0002 did, in SQL of
+        # its own rather than rating_aggregates.rebuild(), whose models follow later revisions
+        # (popularity_score follows on the next `python rating_aggregates.py recompute-popularity`)
+        op.execute("DELETE FROM movie_rating_stats")
+        op.execute(
+            "INSERT INTO movie_rating_stats (movie_id, rating_sum, rating_count) "
+            "SELECT movie_id, SUM(rating), COUNT(id) FROM ratings GROUP BY movie_id"
+        )
+        op.execute("DELETE FROM movie_rating_histogram")
+        op.execute(
+            "INSERT INTO movie_rating_histogram (movie_id, country, bucket, count) "
+            "SELECT ratings.movie_id, COALESCE(users.country, ''), CAST(FLOOR(ratings.rating + 0.5) AS INTEGER), COUNT(ratings.id) "
+            "FROM ratings JOIN users ON users.id = ratings.user_id "
+            "GROUP BY ratings.movie_id, COALESCE(users.country, ''), CAST(FLOOR(ratings.rating + 0.5) AS INTEGER)"
+        )
+    op.create_index("uq_ratings_user_movie", "ratings", ["user_id", "movie_id"], unique=True)
+
+def downgrade():
+    op.drop_index("uq_ratings_user_movie", table_name="ratings")
@@ -0,0 +1,23 @@
+"""IMDb vote count on movies
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import has_column
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if not has_column("movies", "imdb_votes"):
+        with op.batch_alter_table("movies") as batch:
+            batch.add_column(sa.Column("imdb_votes", sa.Integer(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("movies") as batch:
+        batch.drop_column("imdb_votes")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, Boolean, Table
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Float, DateTime, ForeignKey, Boolean, Table, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -37,10 +37,18 @@ class Movie(Base):
     popularity_score = Column(Float, default=0.0)
     view_count = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    imdb_id = Column(String, unique=True, index=True, nullable=True)  # tconst, set by imdb_loader
+    imdb_votes = Column(Integer)  # numVotes behind imdb_score, set by imdb_loader
     
     ratings = relationship("Rating", back_populates="movie")
     watchlist = relationship("Watchlist", back_populates="movie")
     actors = relationship("MovieActor", back_populates="movie")
+    rating_stats = relationship("MovieRatingStats", back_populates="movie", uselist=False)
+    
+    __table_args__ = (
+        # Serves ORDER BY popularity_score DESC, id DESC and its keyset continuation
+        Index("ix_movies_popularity_id", "popularity_score", "id"),
+    )
 
 class Actor(Base):
     __tablename__ = "actors"
@@ -50,6 +58,7 @@ class Actor(Base):
     bio = Column(Text)
     birth_date = Column(DateTime)
     photo_url = Column(String)
+    imdb_id = Column(String, unique=True, index=True, nullable=True)  # nconst, set by imdb_loader
     
     movies = relationship("MovieActor", back_populates="actor")
 
@@ -63,6 +72,13 @@ class MovieActor(Base):
     
     movie = relationship("Movie", back_populates="actors")
     actor = relationship("Actor", back_populates="movies")
+    
+    __table_args__ = (
+        # Cast of a movie, and the dedupe check of bulk loads
+        Index("ix_movie_actors_movie_actor", "movie_id", "actor_id"),
+        # Filmography of an actor
+        Index("ix_movie_actors_actor_id", "actor_id"),
+    )
 
 class Rating(Base):
     __tablename__ = "ratings"
@@ -76,6 +92,32 @@ class Rating(Base):
     
     user = relationship("User", back_populates="ratings")
     movie = relationship("Movie", back_populates="ratings")
+    
+    __table_args__ = (
+        # Keyset pagination of a movie's reviews, newest first
+        Index("ix_ratings_movie_created_id", "movie_id", "created_at", "id"),
+        # One rating per user and movie (the conflict target of the rating upserts); also serves lookups by user_id
+        Index("uq_ratings_user_movie", "user_id", "movie_id", unique=True),
+    )
+
+class MovieRatingStats(Base):
+    """Running rating aggregates per movie, maintained by crud.create_rating"""
+    __tablename__ = "movie_rating_stats"
+    
+    movie_id = Column(Integer, ForeignKey("movies.id"), primary_key=True)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    
+    movie = relationship("Movie", back_populates="rating_stats")
+
+class MovieRatingHistogram(Base):
+    """Rating counts per movie, reviewer country ('' when unknown) and 1-10 bucket"""
+    __tablename__ = "movie_rating_histogram"
+    
+    movie_id = Column(Integer, ForeignKey("movies.id"), primary_key=True)
+    country = Column(String, primary_key=True, default="")
+    bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
 
 class Watchlist(Base):
     __tablename__ = "watchlist"
@@ -86,4 +128,21 @@ class Watchlist(Base):
     added_at = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("User", back_populates="watchlist")
-    movie = relationship("Movie", back_populates="watchlist")
\ No newline at end of file
+    movie = relationship("Movie", back_populates="watchlist")
+    
+    __table_args__ = (
+        # One entry per user and movie (the ON CONFLICT target of add_to_watchlist); also serves lookups by user_id
+        Index("uq_watchlist_user_movie", "user_id", "movie_id", unique=True),
+    )
+
+class RefreshToken(Base):
+    """Rotating refresh tokens. Only the SHA-256 of each token is stored; times are epoch seconds"""
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(Integer, primary_key=True)
+    token_hash = Column(LargeBinary(32), nullable=False, unique=True)
+    # Every token rotated from one login shares its family; replaying a rotated token revokes the family
+    family_id = Column(BigInteger, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    expires_at = Column(BigInteger, nullable=False)
+    revoked_at = Column(BigInteger)
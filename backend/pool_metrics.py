@@ -0,0 +1,143 @@
+"""Connection pool instrumentation.
+
+database.py builds its engines with the pool classes below, and instrument()
+adds checkout/checkin listeners. Together they record:
+
+- how long callers wait for a connection (db_pool_wait_seconds)
+- how long connections stay checked out (db_pool_hold_seconds)
+- current checkouts and overflow
+- pool timeouts
+
+Checkouts held longer than DB_SLOW_HOLD_MS are attributed to the request handler
+that held them and kept for the /debug/pool report. The middleware in main records the
+current request in request_scope; current_handler() reads it when a connection is
+checked out.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+import metrics
+
+DB_SLOW_HOLD_MS = float(os.getenv("DB_SLOW_HOLD_MS", "250"))
+DB_SLOW_HOLD_KEEP = int(os.getenv("DB_SLOW_HOLD_KEEP", "100"))
+
+# ASGI scope of the request being handled; set by main's middleware
+request_scope = contextvars.ContextVar("request_scope", default=None)
+
+def current_handler():
+    """Route template of the current request, e.g. "GET /movies/{movie_id}" (bounded label cardinality)"""
+    scope = request_scope.get()
+    if scope is None:
+        return "background"
+    # The router stores the matched route in the scope, before dependencies open a session
+    route = scope.get("route")
+    return f"{scope['method']} {route.path if route is not None else 'unmatched'}"
+
+POOL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+checked_out = metrics.gauge("db_pool_checked_out", "Connections currently checked out of the pool", ("pool",))
+overflow = metrics.gauge("db_pool_overflow", "Connections open beyond pool_size", ("pool",))
+wait_seconds = metrics.histogram("db_pool_wait_seconds", "Time spent obtaining a connection from the pool", ("pool",), POOL_BUCKETS)
+hold_seconds = metrics.histogram("db_pool_hold_seconds", "Time a connection stayed checked out", ("pool",), POOL_BUCKETS)
+timeouts = metrics.counter("db_pool_timeouts_total", "Checkouts that gave up after pool_timeout", ("pool",))
+connects = metrics.counter("db_pool_connects_total", "New database connections opened", ("pool",))
+slow_holds = metrics.counter("db_pool_slow_holds_total", "Checkouts held longer than DB_SLOW_HOLD_MS", ("pool", "handler"))
+
+class _InstrumentedPool:
+    metrics_name = None
+
+    def connect(self):
+        # Pool.connect is the single entry point (QueuePool._do_get recurses), so time it here
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timeouts.inc(pool=self.metrics_name)
+            raise
+        finally:
+            wait_seconds.observe(time.perf_counter() - started, pool=self.metrics_name)
+            overflow.set(max(self.overflow(), 0), pool=self.metrics_name)
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    metrics_name = "sync"
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+class SlowHoldLog:
+    """Recent long checkouts plus per-handler totals"""
+
+    def __init__(self, keep=DB_SLOW_HOLD_KEEP):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=keep)
+        self._by_handler = {}
+
+    def record(self, pool, handler, held_ms):
+        slow_holds.inc(pool=pool, handler=handler)
+        with self._lock:
+            self._recent.append({"pool": pool, "handler": handler, "held_ms": round(held_ms, 1), "at": time.time()})
+            totals = self._by_handler.setdefault(handler, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            totals["count"] += 1
+            totals["total_ms"] += held_ms
+            totals["max_ms"] = max(totals["max_ms"], held_ms)
+
+    def report(self):
+        with self._lock:
+            handlers = [
+                {
+                    "handler": handler,
+                    "count": totals["count"],
+                    "avg_ms": round(totals["total_ms"] / totals["count"], 1),
+                    "max_ms": round(totals["max_ms"], 1)
+                }
+                for handler, totals in self._by_handler.items()
+            ]
+            recent = list(self._recent)
+        handlers.sort(key=lambda row: row["count"] * row["avg_ms"], reverse=True)
+        return {"threshold_ms": DB_SLOW_HOLD_MS, "by_handler": handlers, "recent": recent[::-1]}
+
+slow_hold_log = SlowHoldLog()
+
+def instrument(engine):
+    """Attach checkout/checkin listeners to a sync Engine (async: pass async_engine.sync_engine)"""
+    name = engine.pool.metrics_name
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        connects.inc(pool=name)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        connection_record.info["handler"] = current_handler()
+        checked_out.inc(pool=name)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is None:
+            return
+        checked_out.dec(pool=name)
+        held = time.perf_counter() - started
+        hold_seconds.observe(held, pool=name)
+        if held * 1000 >= DB_SLOW_HOLD_MS:
+            slow_hold_log.record(name, connection_record.info.get("handler", "background"), held * 1000)
+
+def pool_status(engine):
+    pool = engine.pool
+    name = pool.metrics_name
+    return {
+        "pool": name,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "timeouts": timeouts.value(pool=name),
+        "connects": connects.value(pool=name),
+        "wait_seconds": wait_seconds.snapshot(pool=name),
+        "hold_seconds": hold_seconds.snapshot(pool=name)
+    }
@@ -0,0 +1,242 @@
+"""Per-request SQL statement accounting.
+
+instrument() hooks the cursor execute events of an engine. While main's
+track_queries middleware has a QueryStats open for the request, every statement
+is counted and timed. Statements are also grouped by shape: the SQL text with
+whitespace and IN-lists collapsed. A shape that runs QUERY_REPEAT_THRESHOLD or
+more times in one request is flagged as repeated. That is usually an N+1: a lazy
+load per row, often triggered while a from_attributes response model serializes
+a relationship.
+
+Each response gets a Server-Timing header (db time and statement count, app
+time). One structured JSON log line is written per flagged request, or per
+request with QUERY_LOG=all. Flagged requests are kept for /debug/queries.
+
+For tests and ad-hoc checks:
+
+    with query_stats.budget(3):
+        crud.get_movie(db, movie_id=1)
+
+    query_stats.assert_query_budget(client.get("/movies/1"), max_queries=3)
+"""
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from sqlalchemy import event
+import metrics
+
+# Statements of one shape run this often in one request are reported as repeated
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+# Requests spending longer than this in the database are logged as well
+QUERY_SLOW_MS = float(os.getenv("QUERY_SLOW_MS", "200"))
+# off | flagged (repeated statements or slow) | all
+QUERY_LOG = os.getenv("QUERY_LOG", "flagged")
+QUERY_FLAGGED_KEEP = int(os.getenv("QUERY_FLAGGED_KEEP", "100"))
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger("query_stats")
+if not logger.handlers:
+    # One JSON object per line on stdout, next to uvicorn's access log
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250)
+
+queries_total = metrics.counter("db_queries_total", "SQL statements executed", ("handler",))
+queries_per_request = metrics.histogram("db_queries_per_request", "SQL statements per request", ("handler",), QUERY_BUCKETS)
+db_seconds_per_request = metrics.histogram("db_seconds_per_request", "Time spent executing SQL per request", ("handler",))
+query_duration = metrics.histogram("db_query_duration_seconds", "Execution time of single SQL statements", ("pool",), (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+))
+repeated_total = metrics.counter("db_repeated_statements_total", "Requests that ran one statement shape QUERY_REPEAT_THRESHOLD+ times", ("handler",))
+
+_current = contextvars.ContextVar("query_stats", default=None)
+
+# Expanded IN (...) lists in any DB-API paramstyle: (?, ?), (%(id_1)s, %(id_2)s), ($1, $2)
+_IN_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|\$\d+|:\w+))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def statement_shape(statement):
+    return _IN_LIST.sub("(...)", _WHITESPACE.sub(" ", statement).strip())
+
+class QueryStats:
+    """Statements executed while handling one request (or inside one budget() block)"""
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.count = 0
+        self.db_seconds = 0.0
+        self._shapes = {}
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.db_seconds += seconds
+        entry = self._shapes.setdefault(statement_shape(statement), [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    @property
+    def handler(self):
+        if self.scope is None:
+            return "background"
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {route.path if route is not None else 'unmatched'}"
+
+    def repeated(self, threshold=QUERY_REPEAT_THRESHOLD):
+        """[(shape, count, db ms)] for shapes run at least threshold times, most frequent first"""
+        rows = [(shape, count, seconds * 1000) for shape, (count, seconds) in self._shapes.items() if count >= threshold]
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def server_timing(self):
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+        db_ms = self.db_seconds * 1000
+        parts = [
+            f'db;dur={db_ms:.1f};desc="{self.count} queries"',
+            f"app;dur={max(elapsed_ms - db_ms, 0.0):.1f}",
+        ]
+        repeated = self.repeated()
+        if repeated:
+            parts.append(f'db-repeated;desc="{len(repeated)} shapes, max {repeated[0][1]}x"')
+        return ", ".join(parts)
+
+    def summary(self, status=None):
+        return {
+            "event": "db_queries",
+            "handler": self.handler,
+            "path": self.scope.get("path") if self.scope else None,
+            "status": status,
+            "queries": self.count,
+            "distinct": len(self._shapes),
+            "db_ms": round(self.db_seconds * 1000, 1),
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "repeated": [
+                {"statement": shape[:300], "count": count, "db_ms": round(ms, 1)}
+                for shape, count, ms in self.repeated()
+            ],
+        }
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+def _check_budget(count, max_queries, repeated, allow_repeats, where):
+    problems = []
+    if count > max_queries:
+        problems.append(f"{count} queries, budget {max_queries}")
+    if repeated and not allow_repeats:
+        problems.append(f"repeated statements: {repeated}")
+    if problems:
+        raise QueryBudgetExceeded(f"{where}: " + "; ".join(problems))
+
+@contextmanager
+def budget(max_queries, allow_repeats=False):
+    """Fail if the block runs more than max_queries statements (or repeats one shape)"""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+    repeated = [f"{count}x {shape[:120]}" for shape, count, _ in stats.repeated()]
+    _check_budget(stats.count, max_queries, repeated, allow_repeats, "query budget")
+
+_SERVER_TIMING_DB = re.compile(r'(?:^|,)\s*db;dur=[\d.]+;desc="(\d+) queries"')
+_SERVER_TIMING_REPEATED = re.compile(r'(?:^|,)\s*db-repeated;desc="([^"]*)"')
+
+def assert_query_budget(response, max_queries, allow_repeats=False):
+    """Check a response (TestClient / httpx) against a budget using its Server-Timing header"""
+    header = response.headers.get("server-timing", "")
+    match = _SERVER_TIMING_DB.search(header)
+    if match is None:
+        raise AssertionError("No db Server-Timing entry; is SERVER_TIMING enabled?")
+    repeated = _SERVER_TIMING_REPEATED.search(header)
+    _check_budget(int(match.group(1)), max_queries, repeated and repeated.group(1), allow_repeats,
+                  f"{response.request.method} {response.request.url.path}")
+
+class FlaggedLog:
+    """Recent requests with repeated statements or slow database time, plus per-handler totals"""
+
+    def __init__(self, keep=QUERY_FLAGGED_KEEP):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=keep)
+        self._by_handler = {}
+
+    def record(self, summary):
+        with self._lock:
+            self._recent.append({**summary, "at": time.time()})
+            totals = self._by_handler.setdefault(summary["handler"], {"count": 0, "max_queries": 0, "max_db_ms": 0.0})
+            totals["count"] += 1
+            totals["max_queries"] = max(totals["max_queries"], summary["queries"])
+            totals["max_db_ms"] = max(totals["max_db_ms"], summary["db_ms"])
+
+    def report(self):
+        with self._lock:
+            handlers = [{"handler": handler, **totals} for handler, totals in self._by_handler.items()]
+            recent = list(self._recent)
+        handlers.sort(key=lambda row: row["count"], reverse=True)
+        return {
+            "repeat_threshold": QUERY_REPEAT_THRESHOLD,
+            "slow_ms": QUERY_SLOW_MS,
+            "by_handler": handlers,
+            "recent": recent[::-1]
+        }
+
+flagged_log = FlaggedLog()
+
+@contextmanager
+def track(scope):
+    """Collect the statements of one request; main's middleware wraps call_next in this"""
+    stats = QueryStats(scope)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+def finish(stats, status):
+    """Record metrics for a finished request and log it when flagged (or QUERY_LOG=all)"""
+    handler = stats.handler
+    queries_per_request.observe(stats.count, handler=handler)
+    db_seconds_per_request.observe(stats.db_seconds, handler=handler)
+    repeated = bool(stats.repeated())
+    if repeated:
+        repeated_total.inc(handler=handler)
+    flagged = repeated or stats.db_seconds * 1000 >= QUERY_SLOW_MS
+    if flagged:
+        flagged_log.record(stats.summary(status))
+    if QUERY_LOG == "all" or (QUERY_LOG == "flagged" and flagged):
+        logger.info(json.dumps(stats.summary(status)))
+
+def instrument(engine):
+    """Attach statement timing to a sync Engine (async: pass async_engine.sync_engine)"""
+    pool = engine.pool.metrics_name
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        query_duration.observe(elapsed, pool=pool)
+        stats = _current.get()
+        if stats is None:
+            queries_total.inc(handler="background")
+            return
+        queries_total.inc(handler=stats.handler)
+        stats.record(statement, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        # after_cursor_execute does not run for a failed statement
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
@@ -0,0 +1,109 @@
+import argparse
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from database import SessionLocal
+import crud
+import models
+
+def recount(db: Session):
+    """Full GROUP BY over ratings: {movie_id: (rating_sum, rating_count)}"""
+    rows = db.query(
+        models.Rating.movie_id, func.sum(models.Rating.rating), func.count(models.Rating.id)
+    ).group_by(models.Rating.movie_id).all()
+    return {movie_id: (rating_sum or 0.0, rating_count) for movie_id, rating_sum, rating_count in rows}
+
+def _histogram_recount_query(movie_ids=None):
+    country = func.coalesce(models.User.country, "")
+    bucket = crud.rating_bucket_expression(models.Rating.rating)
+    query = select(models.Rating.movie_id, country, bucket, func.count(models.Rating.id)).join(
+        models.User, models.User.id == models.Rating.user_id
+    )
+    if movie_ids is not None:
+        query = query.where(models.Rating.movie_id.in_(movie_ids))
+    return query.group_by(models.Rating.movie_id, country, bucket)
+
+def check_histogram(db: Session):
+    """Compare movie_rating_histogram with a full recount and return the mismatching cells"""
+    expected = {(movie_id, country, bucket): count for movie_id, country, bucket, count in db.execute(_histogram_recount_query())}
+    histogram = models.MovieRatingHistogram
+    stored = {
+        (cell.movie_id, cell.country, cell.bucket): cell.count
+        for cell in db.query(histogram).filter(histogram.count != 0).all()
+    }
+    return [
+        {"cell": cell, "expected": expected.get(cell, 0), "stored": stored.get(cell, 0)}
+        for cell in sorted(expected.keys() | stored.keys())
+        if expected.get(cell, 0) != stored.get(cell, 0)
+    ]
+
+def check_consistency(db: Session, tolerance: float = 1e-6):
+    """Compare the running aggregates with a full recount and return the mismatches"""
+    expected = recount(db)
+    stored = {
+        stats.movie_id: (stats.rating_sum, stats.rating_count)
+        for stats in db.query(models.MovieRatingStats).all()
+    }
+    mismatches = []
+    for movie_id in sorted(expected.keys() | stored.keys()):
+        exp_sum, exp_count = expected.get(movie_id, (0.0, 0))
+        got_sum, got_count = stored.get(movie_id, (0.0, 0))
+        if exp_count != got_count or abs(exp_sum - got_sum) > tolerance:
+            mismatches.append({
+                "movie_id": movie_id,
+                "expected": {"rating_sum": exp_sum, "rating_count": exp_count},
+                "stored": {"rating_sum": got_sum, "rating_count": got_count}
+            })
+    return mismatches
+
+def rebuild(db: Session, movie_ids=None):
+    """Replace the running aggregates and histograms with a set-wise recount (caller commits).
+
+    All movies by default; with movie_ids only theirs, e.g. after a bulk rating import.
+    """
+    stats = models.MovieRatingStats.__table__
+    totals = select(models.Rating.movie_id, func.sum(models.Rating.rating), func.count(models.Rating.id))
+    histogram = models.MovieRatingHistogram.__table__
+    clear_stats, clear_histogram = delete(stats), delete(histogram)
+    if movie_ids is not None:
+        movie_ids = list(movie_ids)
+        if not movie_ids:
+            return
+        totals = totals.where(models.Rating.movie_id.in_(movie_ids))
+        clear_stats = clear_stats.where(stats.c.movie_id.in_(movie_ids))
+        clear_histogram = clear_histogram.where(histogram.c.movie_id.in_(movie_ids))
+    db.execute(clear_stats)
+    db.execute(insert(stats).from_select(["movie_id", "rating_sum", "rating_count"], totals.group_by(models.Rating.movie_id)))
+    db.execute(clear_histogram)
+    db.execute(insert(histogram).from_select(["movie_id", "country", "bucket", "count"], _histogram_recount_query(movie_ids)))
+
+def recompute_popularity(db: Session):
+    """Recompute popularity_score for every movie in a single UPDATE (caller commits)"""
+    crud.refresh_popularity(db)
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain per-movie rating aggregates and popularity scores")
+    parser.add_argument("command", choices=["check", "repair", "recompute-popularity"])
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "check":
+            mismatches = check_consistency(db)
+            for mismatch in mismatches:
+                print(f"movie {mismatch['movie_id']}: stored {mismatch['stored']} expected {mismatch['expected']}")
+            cells = check_histogram(db)
+            for cell in cells:
+                print(f"histogram {cell['cell']}: stored {cell['stored']} expected {cell['expected']}")
+            print(f"{len(mismatches)} inconsistent movies, {len(cells)} inconsistent histogram cells")
+            return 1 if mismatches or cells else 0
+        if args.command == "repair":
+            rebuild(db)
+        recompute_popularity(db)
+        db.commit()
+        print(f"{args.command} done")
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    raise SystemExit(main())
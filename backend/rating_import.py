@@ -0,0 +1,182 @@
+"""Bulk import of historical ratings, from a CSV file or POST /admin/ratings/import.
+
+    python rating_import.py ratings.csv
+    python rating_import.py ratings.csv --batch-size 20000 --on-conflict skip
+    python rating_import.py ratings.csv --defer-aggregates    # millions of rows: one rebuild at the end
+
+The CSV has a header row with user_id, movie_id and rating (1-10), and optionally
+comment and created_at (ISO 8601; the import time when empty). Rows are streamed in
+fixed-size batches, so memory stays bounded by the batch size. Each batch is one
+executemany INSERT ... ON CONFLICT on uq_ratings_user_movie. It is committed together
+with a set-wise recount of the aggregates, histogram and popularity of the movies it
+touched. --defer-aggregates skips the per-batch recount and rebuilds everything once
+at the end, which is cheaper for large imports.
+
+--on-conflict decides what happens to a (user, movie) pair that is already rated:
+
+    newest   replace it when the imported rating is at least as recent (default)
+    update   always replace it
+    skip     keep the existing rating
+
+Rows for unknown users or movies are skipped and counted; malformed rows too (CLI).
+Within a batch the last row of a pair wins. "upserted" counts the rows actually written
+(via RETURNING); rows the conflict mode kept the existing rating for are "skipped". Throughput (rows/s) is printed every few
+seconds. Running servers pick the new aggregates up when their caches expire.
+"""
+import argparse
+import csv
+import os
+import time
+from datetime import datetime, timezone
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+from database import SessionLocal, dialect_insert
+from imdb_loader import Progress
+import crud
+import models
+import rating_aggregates
+
+BATCH_SIZE = int(os.getenv("RATING_IMPORT_BATCH_SIZE", "5000"))
+# Rows per POST /admin/ratings/import request; larger imports go through the CLI or several requests
+API_MAX_ROWS = int(os.getenv("RATING_IMPORT_API_MAX_ROWS", "50000"))
+ON_CONFLICT = ("newest", "update", "skip")
+
+def parse_row(record):
+    """Import row from a CSV record (dict of strings), or None when malformed"""
+    try:
+        rating = float(record["rating"])
+        created_at = datetime.fromisoformat(record["created_at"]) if record.get("created_at") else None
+        row = {
+            "user_id": int(record["user_id"]),
+            "movie_id": int(record["movie_id"]),
+            "rating": rating,
+            "comment": record.get("comment") or None,
+            "created_at": created_at,
+        }
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not 1 <= rating <= 10:
+        return None
+    return row
+
+def upsert_statement(db: Session, on_conflict: str = "newest"):
+    ratings = models.Rating.__table__
+    stmt = dialect_insert(db)(ratings)
+    conflict_target = [ratings.c.user_id, ratings.c.movie_id]
+    if on_conflict == "skip":
+        return stmt.on_conflict_do_nothing(index_elements=conflict_target)
+    where = None
+    if on_conflict == "newest":
+        where = or_(ratings.c.created_at.is_(None), ratings.c.created_at <= stmt.excluded.created_at)
+    return stmt.on_conflict_do_update(
+        index_elements=conflict_target,
+        set_={
+            "rating": stmt.excluded.rating,
+            "comment": stmt.excluded.comment,
+            "created_at": stmt.excluded.created_at,
+        },
+        where=where
+    )
+
+def import_batch(db: Session, rows, on_conflict: str = "newest", defer_aggregates: bool = False):
+    """Upsert one batch of parsed rows and commit; returns (upserted, skipped, unknown, duplicates, movie ids)"""
+    # ON CONFLICT cannot touch one row twice per statement, so the last row of a pair wins
+    by_pair = {(row["user_id"], row["movie_id"]): row for row in rows}
+    user_ids = {user_id for user_id, _ in by_pair}
+    movie_ids = {movie_id for _, movie_id in by_pair}
+    known_users = set(db.execute(select(models.User.id).where(models.User.id.in_(user_ids))).scalars())
+    known_movies = set(db.execute(select(models.Movie.id).where(models.Movie.id.in_(movie_ids))).scalars())
+
+    now = datetime.now(timezone.utc)
+    batch = [
+        {**row, "created_at": row["created_at"] or now}
+        for (user_id, movie_id), row in by_pair.items()
+        if user_id in known_users and movie_id in known_movies
+    ]
+    written = []
+    if batch:
+        # Only inserted or replaced rows come back; conflicts the mode kept are not returned
+        stmt = upsert_statement(db, on_conflict).returning(models.Rating.__table__.c.movie_id)
+        written = db.execute(stmt, batch).scalars().all()
+    touched = set(written)
+    if touched:
+        if not defer_aggregates:
+            rating_aggregates.rebuild(db, touched)
+            crud.refresh_popularity(db, list(touched))
+    db.commit()
+    return len(written), len(batch) - len(written), len(by_pair) - len(batch), len(rows) - len(by_pair), touched
+
+def import_rows(db: Session, rows, batch_size: int = BATCH_SIZE, on_conflict: str = "newest",
+                defer_aggregates: bool = False, progress: Progress = None):
+    """Import an iterable of parsed rows (None for a malformed one) in batches; returns the totals"""
+    if on_conflict not in ON_CONFLICT:
+        raise ValueError(f"on_conflict must be one of {', '.join(ON_CONFLICT)}")
+    started = time.perf_counter()
+    totals = {"rows": 0, "upserted": 0, "skipped": 0, "invalid": 0, "unknown": 0, "duplicates": 0}
+    movie_ids = set()
+    batch = []
+
+    def flush():
+        upserted, skipped, unknown, duplicates, touched = import_batch(db, batch, on_conflict, defer_aggregates)
+        totals["upserted"] += upserted
+        totals["skipped"] += skipped
+        totals["unknown"] += unknown
+        totals["duplicates"] += duplicates
+        movie_ids.update(touched)
+        if progress is not None:
+            progress.add(len(batch))
+        batch.clear()
+
+    for row in rows:
+        totals["rows"] += 1
+        if row is None:
+            totals["invalid"] += 1
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    if defer_aggregates and totals["upserted"]:
+        rating_aggregates.rebuild(db)
+        rating_aggregates.recompute_popularity(db)
+        db.commit()
+
+    elapsed = time.perf_counter() - started
+    totals["movies"] = len(movie_ids)
+    totals["seconds"] = round(elapsed, 3)
+    totals["rows_per_second"] = round(totals["rows"] / elapsed) if elapsed else None
+    return totals, movie_ids
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            yield parse_row(record)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import historical ratings from a CSV file")
+    parser.add_argument("path", help="CSV with user_id, movie_id, rating[, comment, created_at]")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--on-conflict", choices=ON_CONFLICT, default="newest")
+    parser.add_argument("--defer-aggregates", action="store_true", help="rebuild all aggregates once at the end")
+    options = parser.parse_args()
+
+    progress = Progress("ratings")
+    db = SessionLocal()
+    try:
+        totals, _ = import_rows(
+            db, read_csv(options.path), batch_size=options.batch_size, on_conflict=options.on_conflict,
+            defer_aggregates=options.defer_aggregates, progress=progress
+        )
+    finally:
+        db.close()
+    progress.report(final=True)
+    print(
+        f"{totals['upserted']:,} upserted, {totals['skipped']:,} kept existing, {totals['unknown']:,} unknown user/movie, {totals['invalid']:,} malformed, "
+        f"{totals['duplicates']:,} repeated in a batch; {totals['movies']:,} movies in {totals['seconds']:.1f}s "
+        f"({totals['rows_per_second'] or 0:,} rows/s)"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Hot read routes served from the event loop with an AsyncSession.
+
+main includes this router ahead of its own routes when DB_MODE=async, so these
+handlers take precedence for the same paths; responses are byte-identical to the
+sync routes (same caches, encoders and validators).
+"""
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal, get_async_db
+import schemas
+import auth
+import crud
+import crud_async
+import http_cache
+from view_buffer import view_buffer
+from cache import response_cache
+import route_metrics
+
+# Same per-route metrics as the sync routes in main
+router = APIRouter(route_class=route_metrics.MetricsRoute)
+
+security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+@router.get("/movies", response_model=list[schemas.ListedMovie])
+async def get_movies(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=crud.MAX_MOVIES_PAGE_SIZE),
+    lang: str = "en",
+    in_watchlist: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    credentials: HTTPAuthorizationCredentials = Depends(optional_security)
+):
+    async def load():
+        return http_cache.encode(list[schemas.Movie], await crud_async.get_movies(db, skip=skip, limit=limit, lang=lang))
+    entry = await response_cache.get_or_load_async("movies", ("offset", skip, limit, lang), load)
+    if not in_watchlist:
+        return http_cache.respond(request, entry, "movies")
+    
+    current_user = await db.run_sync(auth.get_current_user, auth.require_token(credentials))
+    movies = await crud_async.flag_watchlist(db, current_user.id, json.loads(entry.body))
+    return http_cache.respond(request, http_cache.encode(list[schemas.ListedMovie], movies), "watchlist")
+
+@router.get("/movies/ranked", response_model=schemas.MoviePage)
+async def get_movies_ranked(request: Request, cursor: str = None, limit: int = Query(20, ge=1, le=crud.MAX_MOVIES_PAGE_SIZE), lang: str = "en", db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        return http_cache.encode(schemas.MoviePage, await crud_async.get_movies_page(db, cursor=cursor, limit=limit, lang=lang))
+    try:
+        entry = await response_cache.get_or_load_async("movies", ("ranked", cursor, limit, lang), load)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return http_cache.respond(request, entry, "movies")
+
+@router.get("/movies/batch", response_model=schemas.MovieBatch)
+async def get_movies_batch(request: Request, ids: str, lang: str = "en", db: AsyncSession = Depends(get_async_db)):
+    try:
+        movie_ids = crud.parse_id_list(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    async def load():
+        return http_cache.encode(schemas.MovieBatch, await crud_async.get_movies_batch(db, movie_ids, lang=lang))
+    entry = await response_cache.get_or_load_async("movies", ("batch", tuple(movie_ids), lang), load)
+    return http_cache.respond(request, entry, "movies")
+
+@router.get("/actors/batch", response_model=schemas.ActorBatch)
+async def get_actors_batch(request: Request, ids: str, db: AsyncSession = Depends(get_async_db)):
+    try:
+        actor_ids = crud.parse_id_list(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    async def load():
+        return http_cache.encode(schemas.ActorBatch, await crud_async.get_actors_batch(db, actor_ids))
+    entry = await response_cache.get_or_load_async("actors", ("batch", tuple(actor_ids)), load)
+    return http_cache.respond(request, entry, "actor")
+
+@router.get("/movies/{movie_id}", response_model=schemas.MovieDetail)
+async def get_movie(movie_id: int, request: Request, lang: str = "en", db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        return http_cache.encode(schemas.MovieDetail, await crud_async.get_movie(db, movie_id=movie_id, lang=lang))
+    entry = await response_cache.get_or_load_async(f"movie:{movie_id}", (lang,), load)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    
+    view_buffer.record(movie_id)
+    return http_cache.respond(request, entry, "movie")
+
+@router.get("/movies/{movie_id}/rating-stats", response_model=schemas.RatingStats)
+async def get_movie_rating_stats(movie_id: int, request: Request, country: str = "All", limit: int = Query(None, ge=1, le=crud.MAX_RATINGS_PAGE_SIZE), db: AsyncSession = Depends(get_async_db)):
+    stats = await crud_async.get_movie_rating_stats(db, movie_id=movie_id, country=country, limit=limit)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return http_cache.respond(request, http_cache.encode(schemas.RatingStats, stats), "rating_stats")
+
+@router.get("/movies/{movie_id}/page", response_model=schemas.MovieDetailPage)
+async def get_movie_page(movie_id: int, request: Request, lang: str = "en", country: str = "All", limit: int = Query(None, ge=1, le=crud.MAX_RATINGS_PAGE_SIZE), db: AsyncSession = Depends(get_async_db)):
+    async def load_movie():
+        return http_cache.encode(schemas.MovieDetail, await crud_async.get_movie(db, movie_id=movie_id, lang=lang))
+    
+    async def load_stats():
+        # A session of its own, so its queries run alongside a detail cache miss on another connection
+        async with AsyncSessionLocal() as stats_db:
+            return await crud_async.rating_stats(stats_db, movie_id=movie_id, country=country, limit=limit)
+    
+    # db only connects when the detail is not cached
+    movie, stats = await asyncio.gather(
+        response_cache.get_or_load_async(f"movie:{movie_id}", (lang,), load_movie),
+        load_stats()
+    )
+    if movie is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    
+    view_buffer.record(movie_id)
+    page = http_cache.compose(movie=movie, rating_stats=http_cache.encode(schemas.RatingStats, stats))
+    return http_cache.respond(request, page, "movie_page")
+
+@router.get("/search")
+async def search_movies(
+    q: str,
+    search_type: str = "all",
+    limit: int = Query(10, ge=1, le=50),
+    lang: str = "en",
+    in_watchlist: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    credentials: HTTPAuthorizationCredentials = Depends(optional_security)
+):
+    if len(q) < 3:
+        limit = 3
+    results = await crud_async.search_movies(db, query=q, search_type=search_type, limit=limit, lang=lang)
+    if in_watchlist:
+        current_user = await db.run_sync(auth.get_current_user, auth.require_token(credentials))
+        await crud_async.flag_watchlist(db, current_user.id, results["movies"])
+    return results
+
+@router.get("/me/watchlist", response_model=list[schemas.WatchlistItem])
+async def get_watchlist(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    # Principal cache hits need no query; a miss runs the sync lookup over the async connection
+    current_user = await db.run_sync(auth.get_current_user, credentials.credentials)
+    watchlist = await crud_async.get_user_watchlist(db, user_id=current_user.id)
+    return http_cache.respond(request, http_cache.encode(list[schemas.WatchlistItem], watchlist), "watchlist")
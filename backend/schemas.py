@@ -29,6 +29,9 @@ class UserLogin(BaseModel):
 class GoogleLogin(BaseModel):
     token: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class User(UserBase):
     id: int
     is_active: bool
@@ -58,6 +61,19 @@ class Movie(MovieBase):
     class Config:
         from_attributes = True
 
+class MoviePage(BaseModel):
+    movies: List[Movie] = []
+    next_cursor: Optional[str] = None
+
+class ListedMovie(Movie):
+    # Only with ?in_watchlist=true (authenticated)
+    in_watchlist: Optional[bool] = None
+
+class MovieBatch(BaseModel):
+    movies: List[Movie] = []
+    # Requested ids with no movie
+    missing: List[int] = []
+
 class ActorBase(BaseModel):
     name: str
     bio: Optional[str] = None
@@ -69,6 +85,10 @@ class Actor(ActorBase):
     class Config:
         from_attributes = True
 
+class ActorBatch(BaseModel):
+    actors: List[Actor] = []
+    missing: List[int] = []
+
 class MovieActorForActor(BaseModel):
     movie: Movie
     character_name: Optional[str] = None
@@ -102,6 +122,17 @@ class RatingBase(BaseModel):
 class RatingCreate(RatingBase):
     pass
 
+class RatingImportRow(RatingBase):
+    user_id: int
+    movie_id: int
+    # Import time when omitted
+    created_at: Optional[datetime] = None
+
+class RatingImport(BaseModel):
+    ratings: List[RatingImportRow]
+    # newest | update | skip, see rating_import
+    on_conflict: str = "newest"
+
 class Rating(RatingBase):
     id: int
     user_id: int
@@ -112,15 +143,53 @@ class Rating(RatingBase):
     class Config:
         from_attributes = True
 
+class Reviewer(BaseModel):
+    id: int
+    email: EmailStr
+    country: Optional[str] = None
+
+class RatingReview(RatingBase):
+    """Rating as listed on movie pages, with only the reviewer fields those pages show"""
+    id: int
+    user_id: int
+    movie_id: int
+    created_at: datetime
+    user: Reviewer
+
+class RatingPage(BaseModel):
+    ratings: List[RatingReview] = []
+    next_cursor: Optional[str] = None
+
+class RatingBucket(BaseModel):
+    rating: int
+    count: int
+    percentage: float
+
+class RatingStats(RatingPage):
+    total_ratings: int = 0
+    rating_distribution: List[RatingBucket] = []
+    available_countries: List[str] = []
+    selected_country: str = "All"
+
 class MovieDetail(Movie):
     actors: List[MovieActor] = []
-    ratings: List[Rating] = []
+    # The newest reviews; ratings_next_cursor continues them on /movies/{id}/ratings
+    ratings: List[RatingReview] = []
+    ratings_next_cursor: Optional[str] = None
     average_rating: Optional[float] = None
     total_ratings: int = 0
     
     class Config:
         from_attributes = True
 
+class MovieDetailPage(BaseModel):
+    """/movies/{id}/page: what the movie page needs, in one response"""
+    movie: MovieDetail
+    rating_stats: RatingStats
+
+class WatchlistBulk(BaseModel):
+    movie_ids: List[int]
+
 class WatchlistItem(BaseModel):
     id: int
     movie: Movie
@@ -0,0 +1,339 @@
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from database import SessionLocal
+import catalog_events
+import metrics
+import models
+
+# Rebuild from the database periodically so other workers' writes become visible
+REFRESH_SECONDS = int(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "300"))
+# Upper bound on vocabulary terms gathered from trigram postings while expanding a token
+MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "20000"))
+# Upper bound on vocabulary terms a single misspelled/partial query token may expand to
+MAX_TERM_EXPANSIONS = 50
+MIN_SIMILARITY = 0.6
+
+_TOKEN_RE = re.compile(r"\w+")
+# Letters that have no decomposition in NFKD
+_EXTRA_FOLDS = str.maketrans({"ı": "i", "ß": "ss", "ø": "o", "æ": "ae", "œ": "oe", "đ": "d", "ł": "l"})
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics so 'Şahin', 'ŞAHİN' and 'sahin' compare equal"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.translate(_EXTRA_FOLDS)
+
+def tokenize(text):
+    if not text:
+        return []
+    return _TOKEN_RE.findall(fold(text))
+
+def trigrams(term: str):
+    padded = f"^{term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class InvertedIndex:
+    """Term -> document postings per field, plus a trigram index over the vocabulary.
+
+    Exact terms are looked up directly; prefixes, substrings and typos are resolved by
+    expanding the query token against the vocabulary through its trigrams, so the cost
+    depends on vocabulary statistics rather than on the number of documents.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.postings = {field: defaultdict(set) for field in fields}
+        self.doc_terms = {}
+        self.doc_rank = {}
+        self.term_refs = defaultdict(int)
+        self.gram_terms = defaultdict(set)
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def add(self, doc_id, field_texts, rank=0.0):
+        if doc_id in self.doc_terms:
+            self.remove(doc_id)
+        terms_by_field = {field: set(tokenize(field_texts.get(field))) for field in self.fields}
+        for field, terms in terms_by_field.items():
+            for term in terms:
+                self.postings[field][term].add(doc_id)
+                self._ref_term(term)
+        self.doc_terms[doc_id] = terms_by_field
+        self.doc_rank[doc_id] = rank or 0.0
+
+    def remove(self, doc_id):
+        terms_by_field = self.doc_terms.pop(doc_id, None)
+        self.doc_rank.pop(doc_id, None)
+        if not terms_by_field:
+            return
+        for field, terms in terms_by_field.items():
+            for term in terms:
+                docs = self.postings[field].get(term)
+                if docs is not None:
+                    docs.discard(doc_id)
+                    if not docs:
+                        del self.postings[field][term]
+                self._unref_term(term)
+
+    def set_rank(self, doc_id, rank):
+        if doc_id in self.doc_rank:
+            self.doc_rank[doc_id] = rank or 0.0
+
+    def _ref_term(self, term):
+        self.term_refs[term] += 1
+        if self.term_refs[term] == 1:
+            for gram in trigrams(term):
+                self.gram_terms[gram].add(term)
+
+    def _unref_term(self, term):
+        self.term_refs[term] -= 1
+        if self.term_refs[term] <= 0:
+            del self.term_refs[term]
+            for gram in trigrams(term):
+                terms = self.gram_terms.get(gram)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self.gram_terms[gram]
+
+    def expand(self, token):
+        """Return {vocabulary term: match quality} for a query token"""
+        matches = {}
+        if token in self.term_refs:
+            matches[token] = 1.0
+        if len(token) < 2:
+            return matches
+
+        query_grams = trigrams(token)
+        # Generate candidates from the rarest grams only, then verify against all of them
+        known = sorted((g for g in query_grams if g in self.gram_terms), key=lambda g: len(self.gram_terms[g]))
+        if not known:
+            return matches
+        candidates = set()
+        for gram in known[:3]:
+            candidates.update(self.gram_terms[gram])
+            if len(candidates) > MAX_CANDIDATES:
+                break
+
+        scored = []
+        for term in candidates:
+            if term == token:
+                continue
+            if term.startswith(token):
+                quality = 0.9
+            elif token in term:
+                quality = 0.7
+            else:
+                term_grams = trigrams(term)
+                similarity = 2 * len(query_grams & term_grams) / (len(query_grams) + len(term_grams))
+                if similarity < MIN_SIMILARITY:
+                    continue
+                quality = 0.6 * similarity
+            scored.append((quality, term))
+        scored.sort(reverse=True)
+        for quality, term in scored[:MAX_TERM_EXPANSIONS]:
+            matches[term] = quality
+        return matches
+
+    def _estimated_hits(self, expansion):
+        return sum(len(self.postings[field].get(term, ())) for term in expansion for field in self.fields)
+
+    def search(self, query, limit=10):
+        """Rank documents matching every query token; title-tier hits always come first"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        primary = self.fields[0]
+        expansions = [self.expand(token) for token in dict.fromkeys(tokens)]
+        # Most selective token first so later, broader tokens only need to probe its candidates
+        expansions.sort(key=self._estimated_hits)
+        # Per document: [all tokens hit the primary field, accumulated score]
+        results = None
+        for expansion in expansions:
+            token_hits = {}
+            for term, quality in expansion.items():
+                for weight, field in enumerate(reversed(self.fields), start=1):
+                    docs = self.postings[field].get(term)
+                    if not docs:
+                        continue
+                    if results is not None and len(docs) > len(results):
+                        docs = docs & results.keys()
+                    in_primary = field == primary
+                    score = quality * weight
+                    for doc_id in docs:
+                        best = token_hits.get(doc_id)
+                        if best is None or (in_primary, score) > best:
+                            token_hits[doc_id] = (in_primary, score)
+            if results is None:
+                results = {doc_id: [in_primary, score] for doc_id, (in_primary, score) in token_hits.items()}
+            else:
+                merged = {}
+                for doc_id, (in_primary, score) in token_hits.items():
+                    current = results.get(doc_id)
+                    if current is not None:
+                        merged[doc_id] = [current[0] and in_primary, current[1] + score]
+                results = merged
+            if not results:
+                return []
+
+        ranked = heapq.nlargest(
+            limit,
+            results.items(),
+            key=lambda item: (item[1][0], item[1][1], self.doc_rank.get(item[0], 0.0), -item[0]),
+        )
+        return [doc_id for doc_id, _ in ranked]
+
+searches = metrics.counter("search_queries_total", "Queries against the in-process search index", ("index",))
+empty_searches = metrics.counter("search_empty_results_total", "Search index queries that matched nothing", ("index",))
+
+class CatalogSearchIndex:
+    """Movie (per language) and actor indexes, kept current through catalog_events.
+
+    Builds run in a background thread (first at startup, then every REFRESH_SECONDS);
+    until the first one finishes, ensure_loaded() returns False and crud serves
+    search from SQL. Catalog events that arrive while a build is loading are queued
+    and replayed into the new index when it is swapped in.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        # A background build is running (read and written under _lock)
+        self._refreshing = False
+        # Events seen since the running build started, replayed after its swap
+        self._pending = None
+        self._reset()
+
+    def _reset(self):
+        self.movies = {"en": InvertedIndex(("title", "summary")), "tr": InvertedIndex(("title", "summary"))}
+        self.actors = InvertedIndex(("name",))
+
+    @staticmethod
+    def _movie_fields(data):
+        return {
+            "en": {"title": data["title"], "summary": data["summary"]},
+            # Turkish pages display the English text when no translation exists, so index what is shown
+            "tr": {"title": data["title_tr"] or data["title"], "summary": data["summary_tr"] or data["summary"]},
+        }
+
+    def upsert_movie(self, data):
+        with self._lock:
+            for lang, fields in self._movie_fields(data).items():
+                self.movies[lang].add(data["id"], fields, data.get("popularity_score"))
+
+    def remove_movie(self, movie_id):
+        with self._lock:
+            for index in self.movies.values():
+                index.remove(movie_id)
+
+    def upsert_actor(self, data):
+        with self._lock:
+            self.actors.add(data["id"], {"name": data["name"]})
+
+    def remove_actor(self, actor_id):
+        with self._lock:
+            self.actors.remove(actor_id)
+
+    def on_catalog_change(self, kind, action, data):
+        with self._lock:
+            if self._pending is not None:
+                # The running build's snapshot may predate this change
+                self._pending.append((kind, action, data))
+            if self._loaded_at is not None:
+                self._apply(kind, action, data)
+
+    def _apply(self, kind, action, data):
+        if kind == "movie" and action == "upsert":
+            self.upsert_movie(data)
+        elif kind == "movie":
+            self.remove_movie(data["id"])
+        elif kind == "actor" and action == "upsert":
+            self.upsert_actor(data)
+        elif kind == "actor":
+            self.remove_actor(data["id"])
+
+    def build(self, db):
+        """Load the full catalog from the database and swap it in atomically.
+
+        The catalog is read without holding the lock, so searches keep using the
+        current index meanwhile.
+        """
+        with self._lock:
+            self._pending = []
+        try:
+            fresh = CatalogSearchIndex()
+            self._load(db, fresh)
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            self.movies, self.actors = fresh.movies, fresh.actors
+            for event in self._pending:
+                self._apply(*event)
+            self._pending = None
+            self._loaded_at = time.monotonic()
+
+    @staticmethod
+    def _load(db, fresh):
+        movie_rows = db.query(
+            models.Movie.id, models.Movie.title, models.Movie.title_tr,
+            models.Movie.summary, models.Movie.summary_tr, models.Movie.popularity_score
+        ).yield_per(5000)
+        for row in movie_rows:
+            fresh.upsert_movie(row._asdict())
+        for row in db.query(models.Actor.id, models.Actor.name).yield_per(5000):
+            fresh.upsert_actor(row._asdict())
+
+    def ensure_loaded(self):
+        """Whether the index can serve queries; starts a background build when none is loaded or it is stale"""
+        with self._lock:
+            loaded_at = self._loaded_at
+            due = loaded_at is None or time.monotonic() - loaded_at > REFRESH_SECONDS
+            if due and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh, daemon=True).start()
+        return loaded_at is not None
+
+    def _refresh(self):
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            self.build(db)
+            print(f"Search index built in {(time.perf_counter() - started) * 1000:.0f} ms")
+        except Exception as e:
+            print(f"Search index refresh failed: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._refreshing = False
+
+    def search_movies(self, query, lang="en", limit=10):
+        with self._lock:
+            results = self.movies["tr" if lang == "tr" else "en"].search(query, limit)
+        searches.inc(index="movies")
+        if not results:
+            empty_searches.inc(index="movies")
+        return results
+
+    def search_actors(self, query, limit=10):
+        with self._lock:
+            results = self.actors.search(query, limit)
+        searches.inc(index="actors")
+        if not results:
+            empty_searches.inc(index="actors")
+        return results
+
+catalog_index = CatalogSearchIndex()
+metrics.callback(
+    "search_index_documents", "Documents in the search index",
+    lambda: {"movies": len(catalog_index.movies["en"]), "actors": len(catalog_index.actors)}, labelnames=("index",)
+)
+catalog_events.subscribe(catalog_index.on_catalog_change)
@@ -0,0 +1,306 @@
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy import func
+from database import SessionLocal
+from search_index import tokenize
+import catalog_events
+import metrics
+import models
+
+# Minimum delay between snapshot rebuilds after the catalog changed
+REBUILD_SECONDS = float(os.getenv("SUGGEST_REBUILD_SECONDS", "5"))
+# Full reload from the database, picks up other workers' writes and actor weights
+REFRESH_SECONDS = int(os.getenv("SUGGEST_REFRESH_SECONDS", "600"))
+MAX_SUGGESTIONS = 20
+# Prefixes matching more keys than this get their top suggestions precomputed at build
+# time; any other prefix is answered by a heap over at most this many keys
+SCAN_LIMIT = 256
+
+class SuggestSnapshot:
+    """Immutable sorted-array prefix structure.
+
+    Every label is folded and stored under each of its word starts ("the dark knight",
+    "dark knight", "knight"), so completions match any word. A prefix maps to a
+    contiguous range of the sorted keys; prefixes whose ranges exceed SCAN_LIMIT, at
+    whatever length, read from a precomputed top-k table instead.
+    """
+
+    def __init__(self, entries):
+        # Parallel columns rather than per-entry objects keep the footprint small
+        self.kinds = []
+        self.ids = []
+        self.weights = []
+        self.labels = []
+        self.extras = []
+        pairs = []
+        for (kind, entry_id), entry in entries.items():
+            ref = len(self.ids)
+            self.kinds.append(kind)
+            self.ids.append(entry_id)
+            self.weights.append(entry["weight"])
+            self.labels.append(entry["labels"])
+            self.extras.append(entry["extra"])
+            for key in _keys(entry["labels"]):
+                pairs.append((key, ref))
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.refs = [ref for _, ref in pairs]
+        self.top = self._precompute()
+
+    def _precompute(self):
+        """{prefix: {kind: top refs}} for every prefix whose key range exceeds SCAN_LIMIT.
+
+        Ranges are split one character deeper only while they stay large, so the work is
+        bounded by the keys in large ranges times their depth, not by every prefix.
+        """
+        top = {}
+        ranges = [(0, len(self.keys), 0)]
+        while ranges:
+            start, end, depth = ranges.pop()
+            i = start
+            while i < end:
+                key = self.keys[i]
+                if len(key) <= depth:
+                    i += 1
+                    continue
+                prefix = key[:depth + 1]
+                j = bisect_left(self.keys, prefix + "\uffff", lo=i, hi=end)
+                if j - i > SCAN_LIMIT:
+                    top[prefix] = self._top_refs(i, j)
+                    ranges.append((i, j, depth + 1))
+                i = j
+        return top
+
+    def _top_refs(self, start, end):
+        by_kind = {}
+        for ref in set(self.refs[start:end]):
+            by_kind.setdefault(self.kinds[ref], []).append(ref)
+        return {kind: heapq.nlargest(MAX_SUGGESTIONS, refs, key=self.weights.__getitem__) for kind, refs in by_kind.items()}
+
+    def complete(self, prefix, limit, kinds):
+        by_kind = self.top.get(prefix)
+        if by_kind is not None:
+            ranked = heapq.merge(*(by_kind.get(kind, []) for kind in kinds), key=self.weights.__getitem__, reverse=True)
+            return list(itertools.islice(ranked, limit))
+
+        # Not precomputed, so the range holds at most SCAN_LIMIT keys
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + "\uffff", lo=start)
+        refs = {ref for ref in self.refs[start:end] if self.kinds[ref] in kinds}
+        return heapq.nlargest(limit, refs, key=self.weights.__getitem__)
+
+    def footprint(self):
+        """Approximate bytes held by the snapshot (containers plus unique strings)"""
+        containers = [self.kinds, self.ids, self.weights, self.labels, self.extras, self.keys, self.refs, self.top]
+        size = sum(sys.getsizeof(c) for c in containers)
+        size += sum(sys.getsizeof(key) for key in self.keys)
+        size += sum(sys.getsizeof(prefix) + sys.getsizeof(by_kind) for prefix, by_kind in self.top.items())
+        size += sum(sys.getsizeof(refs) for by_kind in self.top.values() for refs in by_kind.values())
+        size += sum(sys.getsizeof(labels) + sum(sys.getsizeof(l) for l in labels.values()) for labels in self.labels)
+        size += sum(sys.getsizeof(extra) for extra in self.extras)
+        return size
+
+def _keys(labels):
+    keys = set()
+    for label in labels.values():
+        words = tokenize(label)
+        for i in range(len(words)):
+            keys.add(" ".join(words[i:]))
+    return keys
+
+def _movie_entry(data):
+    labels = {"en": data["title"]}
+    if data.get("title_tr"):
+        labels["tr"] = data["title_tr"]
+    extra = {"release_year": data.get("release_year"), "image_url": data.get("image_url")}
+    return {"labels": labels, "weight": data.get("popularity_score") or 0.0, "extra": extra}
+
+def _actor_entry(data, weight=0.0):
+    return {"labels": {"en": data["name"]}, "weight": weight or 0.0, "extra": {"photo_url": data.get("photo_url")}}
+
+suggestions_served = metrics.counter("suggest_queries_total", "Typeahead queries")
+empty_suggestions = metrics.counter("suggest_empty_results_total", "Typeahead queries with no completion")
+
+class Suggester:
+    """Holds the live snapshot and patches the entry table from catalog events.
+
+    Loads run in a background thread (first at startup, then every REFRESH_SECONDS);
+    until the first one finishes, ensure_loaded() returns False and /suggest answers
+    with no suggestions. Catalog events that arrive while a load reads the database are
+    queued and replayed into the entries it swaps in.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._snapshot = None
+        self._loaded_at = None
+        self._dirty_since = None
+        self._building = False
+        # Events seen since the running load started reading, replayed before its swap
+        self._pending = None
+        self.load_ms = 0.0
+        self.build_ms = 0.0
+
+    def load(self, db):
+        """Read the catalog and swap in a new snapshot; suggestions keep using the current one meanwhile"""
+        started = time.perf_counter()
+        with self._lock:
+            self._pending = []
+        try:
+            entries = self._read(db)
+            read_ms = round((time.perf_counter() - started) * 1000, 1)
+            with self._lock:
+                for event in self._pending:
+                    self._apply(entries, *event)
+                self._pending = []
+                snapshot_entries = dict(entries)
+            snapshot = SuggestSnapshot(snapshot_entries)
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            # Changes made during the build are in the entries, the next rebuild adds them to a snapshot
+            changed = bool(self._pending)
+            for event in self._pending:
+                self._apply(entries, *event)
+            self._pending = None
+            self._entries = entries
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+            self._dirty_since = self._loaded_at if changed else None
+        self.load_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.build_ms = self.load_ms - read_ms
+        print(f"Suggest index: read {read_ms} ms, build {round(self.build_ms, 1)} ms, total {self.load_ms} ms "
+              f"({len(entries)} entries, {len(snapshot.keys)} keys, {snapshot.footprint() / 1024 / 1024:.1f} MiB)")
+
+    @staticmethod
+    def _read(db):
+        entries = {}
+        movie_rows = db.query(
+            models.Movie.id, models.Movie.title, models.Movie.title_tr, models.Movie.release_year,
+            models.Movie.image_url, models.Movie.popularity_score
+        ).yield_per(5000)
+        for row in movie_rows:
+            entries[("movie", row.id)] = _movie_entry(row._asdict())
+
+        # Actors inherit the weight of their most popular movie
+        actor_weight = func.max(models.Movie.popularity_score)
+        actor_rows = db.query(models.Actor.id, models.Actor.name, models.Actor.photo_url, actor_weight).outerjoin(
+            models.MovieActor, models.MovieActor.actor_id == models.Actor.id
+        ).outerjoin(
+            models.Movie, models.Movie.id == models.MovieActor.movie_id
+        ).group_by(models.Actor.id).yield_per(5000)
+        for actor_id, name, photo_url, weight in actor_rows:
+            entries[("actor", actor_id)] = _actor_entry({"name": name, "photo_url": photo_url}, weight)
+        return entries
+
+    def ensure_loaded(self):
+        """Whether suggestions can be served; starts a background load or rebuild when one is due"""
+        now = time.monotonic()
+        if self._snapshot is None or now - self._loaded_at > REFRESH_SECONDS:
+            self._start_background(self._reload)
+        elif self._dirty_since is not None and now - self._dirty_since > REBUILD_SECONDS:
+            self._start_background(self._rebuild)
+        return self._snapshot is not None
+
+    def _start_background(self, target):
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=target, daemon=True).start()
+
+    def _reload(self):
+        db = SessionLocal()
+        try:
+            self.load(db)
+        except Exception as e:
+            print(f"Suggest index load failed: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._building = False
+
+    def _rebuild(self):
+        try:
+            with self._lock:
+                entries = dict(self._entries)
+                self._dirty_since = None
+            started = time.perf_counter()
+            snapshot = SuggestSnapshot(entries)
+            self.build_ms = (time.perf_counter() - started) * 1000
+            self._snapshot = snapshot
+        finally:
+            with self._lock:
+                self._building = False
+
+    def on_catalog_change(self, kind, action, data):
+        with self._lock:
+            if self._pending is not None:
+                # The running load's read may predate this change
+                self._pending.append((kind, action, data))
+            if self._snapshot is None:
+                return
+            self._apply(self._entries, kind, action, data)
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+
+    @staticmethod
+    def _apply(entries, kind, action, data):
+        key = (kind, data["id"])
+        if action == "delete":
+            entries.pop(key, None)
+        elif kind == "movie":
+            entries[key] = _movie_entry(data)
+        else:
+            previous = entries.get(key)
+            entries[key] = _actor_entry(data, previous["weight"] if previous else 0.0)
+
+    def suggest(self, query, lang="en", limit=5, search_type="all"):
+        snapshot = self._snapshot
+        prefix = " ".join(tokenize(query))
+        if snapshot is None or not prefix:
+            return []
+        kinds = {"all": ("movie", "actor"), "movies": ("movie",), "actors": ("actor",)}.get(search_type, ("movie", "actor"))
+        suggestions = []
+        for ref in snapshot.complete(prefix, min(limit, MAX_SUGGESTIONS), kinds):
+            labels = snapshot.labels[ref]
+            suggestions.append({
+                "type": snapshot.kinds[ref],
+                "id": snapshot.ids[ref],
+                "text": labels.get(lang) or labels["en"],
+                **snapshot.extras[ref]
+            })
+        suggestions_served.inc()
+        if not suggestions:
+            empty_suggestions.inc()
+        return suggestions
+
+    def stats(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {"loaded": False}
+        return {
+            "loaded": True,
+            "entries": len(snapshot.ids),
+            "keys": len(snapshot.keys),
+            "precomputed_prefixes": len(snapshot.top),
+            "memory_bytes": snapshot.footprint(),
+            "load_ms": self.load_ms,
+            "build_ms": round(self.build_ms, 1),
+            "pending_changes": self._dirty_since is not None
+        }
+
+suggester = Suggester()
+metrics.callback(
+    "suggest_index_entries", "Entries in the typeahead snapshot",
+    lambda: len(suggester._snapshot.ids) if suggester._snapshot is not None else 0
+)
+catalog_events.subscribe(suggester.on_catalog_change)
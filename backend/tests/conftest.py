@@ -0,0 +1,75 @@
+"""Shared fixtures: a throwaway SQLite database migrated to head, sessions, sample rows and the app.
+
+The settings below are read at import time by database, cache and auth, so they are set
+before any application module is imported.
+"""
+import itertools
+import os
+import tempfile
+
+_data_dir = tempfile.mkdtemp(prefix="imdb-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_data_dir}/test.db"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ADMIN_API_KEY", "test-admin-key")
+
+import pytest
+from fastapi.testclient import TestClient
+import manage
+
+manage.migrate()
+
+from database import SessionLocal
+from cache import response_cache
+import auth
+import main
+import models
+
+_serial = itertools.count(1)
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+@pytest.fixture
+def client():
+    # No lifespan: background flushers and index builds only run where a test starts them
+    return TestClient(main.app)
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    response_cache.backend.clear()
+    yield
+
+@pytest.fixture
+def make_movie(db):
+    def make(**fields):
+        n = next(_serial)
+        movie = models.Movie(**{"title": f"Movie {n}", "summary": f"Summary {n}", "view_count": 0, **fields})
+        db.add(movie)
+        db.commit()
+        return movie
+    return make
+
+@pytest.fixture
+def make_user(db):
+    def make(country="TR", password="password123"):
+        user = models.User(
+            email=f"user{next(_serial)}@example.com", hashed_password=auth.get_password_hash(password),
+            country=country, is_active=True
+        )
+        db.add(user)
+        db.commit()
+        return user
+    return make
+
+@pytest.fixture
+def auth_headers():
+    def headers(user):
+        return {"Authorization": f"Bearer {auth.create_access_token(data={'sub': user.email})}"}
+    return headers
@@ -0,0 +1,47 @@
+import json
+import http_cache
+import schemas
+
+def test_etag_is_a_hash_of_the_exact_body():
+    first = http_cache.encode(schemas.Actor, {"id": 1, "name": "Ada", "bio": None, "photo_url": None})
+    same = http_cache.encode(schemas.Actor, {"id": 1, "name": "Ada", "bio": None, "photo_url": None})
+    other = http_cache.encode(schemas.Actor, {"id": 1, "name": "Ade", "bio": None, "photo_url": None})
+    assert first.etag == same.etag != other.etag
+    assert http_cache.encode(schemas.Actor, None) is None
+
+def test_compose_splices_encoded_members():
+    a = http_cache.encode(schemas.Actor, {"id": 1, "name": "Ada"})
+    b = http_cache.encode(schemas.Actor, {"id": 2, "name": "Bob"})
+    page = http_cache.compose(first=a, second=b)
+    assert json.loads(page.body) == {"first": json.loads(a.body), "second": json.loads(b.body)}
+
+def test_conditional_get_answers_304(client, make_movie):
+    make_movie()
+    response = client.get("/movies")
+    etag = response.headers["etag"]
+    assert "last-modified" not in response.headers
+    assert response.headers["cache-control"] == http_cache.CACHE_CONTROL_POLICIES["movies"]
+
+    not_modified = client.get("/movies", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    assert client.get("/movies", headers={"If-None-Match": f'W/{etag}, "other"'}).status_code == 304
+    assert client.get("/movies", headers={"If-None-Match": '"other"'}).status_code == 200
+
+def test_etag_changes_with_the_data(client, db, make_movie):
+    movie = make_movie(title="Before")
+    etag = client.get(f"/movies/{movie.id}").headers["etag"]
+    movie.title = "After"
+    db.commit()
+    response = client.get(f"/movies/{movie.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.json()["title"] == "After"
+
+def test_counted_routes_revalidate_and_count_304s(client, make_movie, monkeypatch):
+    movie = make_movie()
+    recorded = []
+    monkeypatch.setattr("view_buffer.view_buffer.record", recorded.append)
+    for path in (f"/movies/{movie.id}", f"/movies/{movie.id}/page"):
+        response = client.get(path)
+        assert "no-cache" in response.headers["cache-control"]
+        assert client.get(path, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    assert recorded == [movie.id] * 4
@@ -0,0 +1,60 @@
+"""Statement counts of the hot read routes, so an N+1 shows up as a failing test.
+
+The catalog rows are deliberately plural (several movies, actors and ratings), so a
+lazy load per row would repeat a statement shape and blow the budget.
+"""
+import pytest
+import crud
+import models
+import query_stats
+
+@pytest.fixture
+def catalog(db, make_movie, make_user):
+    movies = [make_movie() for _ in range(8)]
+    movie = movies[0]
+    for n in range(6):
+        actor = models.Actor(name=f"Actor {n}")
+        db.add(models.MovieActor(movie=movie, actor=actor, character_name=f"Role {n}"))
+    for user in [make_user() for _ in range(6)]:
+        db.add(models.Rating(user_id=user.id, movie_id=movie.id, rating=7, comment="Fine"))
+    db.commit()
+    return movie
+
+def test_movie_listing(client, catalog):
+    query_stats.assert_query_budget(client.get("/movies", params={"limit": 8}), max_queries=1)
+
+def test_movie_detail(client, db, catalog):
+    response = client.get(f"/movies/{catalog.id}")
+    assert len(response.json()["actors"]) == 6 and len(response.json()["ratings"]) == crud.MOVIE_DETAIL_RATINGS
+    query_stats.assert_query_budget(response, max_queries=3)
+    with query_stats.budget(3):
+        crud.get_movie(db, movie_id=catalog.id)
+
+def test_movie_page(client, catalog):
+    # The detail's three statements plus the rating stats
+    query_stats.assert_query_budget(client.get(f"/movies/{catalog.id}/page"), max_queries=6)
+    # A warm page reuses the cached detail and only queries the rating stats
+    query_stats.assert_query_budget(client.get(f"/movies/{catalog.id}/page"), max_queries=3)
+
+def test_search_with_the_index(client, db, catalog):
+    crud.catalog_index.build(db)
+    response = client.get("/search", params={"q": "movie"})
+    assert response.json()["movies"]
+    query_stats.assert_query_budget(response, max_queries=2)
+
+def test_search_sql_fallback(client, catalog, monkeypatch):
+    monkeypatch.setattr(crud.catalog_index, "ensure_loaded", lambda: False)
+    response = client.get("/search", params={"q": "movie"})
+    assert response.json()["movies"]
+    query_stats.assert_query_budget(response, max_queries=2)
+
+def test_cached_responses_skip_the_database(client, catalog):
+    client.get(f"/movies/{catalog.id}")
+    query_stats.assert_query_budget(client.get(f"/movies/{catalog.id}"), max_queries=0)
+
+def test_budget_reports_repeated_statements(db, catalog):
+    with pytest.raises(query_stats.QueryBudgetExceeded, match="repeated statements"):
+        with query_stats.budget(100):
+            for movie_actor in db.query(models.MovieActor).filter(models.MovieActor.movie_id == catalog.id):
+                db.expire(movie_actor)
+                movie_actor.actor.name
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+import crud
+import models
+import rating_aggregates
+import rating_import
+import schemas
+
+def _aggregates(db, movie_id):
+    db.expire_all()
+    stats = db.get(models.MovieRatingStats, movie_id)
+    histogram = db.query(models.MovieRatingHistogram.country, models.MovieRatingHistogram.bucket, models.MovieRatingHistogram.count).filter(
+        models.MovieRatingHistogram.movie_id == movie_id, models.MovieRatingHistogram.count > 0
+    ).all()
+    return (stats.rating_sum, stats.rating_count), sorted(histogram)
+
+def _rate(db, user, movie, value):
+    return crud.create_rating(db, schemas.RatingCreate(rating=value, comment=None), movie_id=movie.id, user_id=user.id)
+
+def test_rerating_updates_in_place(db, make_movie, make_user):
+    movie, user = make_movie(), make_user()
+    first = _rate(db, user, movie, 4)
+    second = _rate(db, user, movie, 9)
+    assert first["id"] == second["id"] and second["rating"] == 9
+    assert db.query(models.Rating).filter(models.Rating.movie_id == movie.id).count() == 1
+    assert _aggregates(db, movie.id) == ((9.0, 1), [("TR", 9, 1)])
+
+def test_incremental_aggregates_match_a_recount(db, make_movie, make_user):
+    movie = make_movie()
+    users = [make_user(country=country) for country in ("TR", "US", "US")]
+    for user, value in zip(users, (3, 7, 7)):
+        _rate(db, user, movie, value)
+    _rate(db, users[1], movie, 2)
+    _rate(db, users[2], movie, 7.5)
+    incremental = _aggregates(db, movie.id)
+    rating_aggregates.rebuild(db, {movie.id})
+    db.commit()
+    assert _aggregates(db, movie.id) == incremental
+    assert incremental[0] == (12.5, 3)
+
+def _row(user, movie, value, created_at=None):
+    return {"user_id": user.id, "movie_id": movie.id, "rating": value, "comment": None, "created_at": created_at}
+
+@pytest.mark.parametrize("on_conflict, upserted, skipped, rating", [
+    ("newest", 1, 1, 8.0),
+    ("update", 2, 0, 2.0),
+    ("skip", 1, 1, 8.0),
+])
+def test_import_counts_written_rows(db, make_movie, make_user, on_conflict, upserted, skipped, rating):
+    movie, other, user = make_movie(), make_movie(), make_user()
+    _rate(db, user, movie, 8)
+    last_year = datetime.now(timezone.utc) - timedelta(days=365)
+    rows = [
+        _row(user, movie, 2, last_year),
+        _row(user, other, 6),
+        {**_row(user, other, 6), "movie_id": 10**9},
+        None,
+    ]
+    totals, movie_ids = rating_import.import_rows(db, rows, on_conflict=on_conflict)
+    assert (totals["upserted"], totals["skipped"], totals["unknown"], totals["invalid"]) == (upserted, skipped, 1, 1)
+    assert movie_ids == ({movie.id, other.id} if upserted == 2 else {other.id})
+    db.expire_all()
+    assert db.query(models.Rating.rating).filter_by(user_id=user.id, movie_id=movie.id).scalar() == rating
+    assert _aggregates(db, movie.id)[0] == (rating, 1)
+
+def test_last_row_of_a_pair_wins_within_a_batch(db, make_movie, make_user):
+    movie, user = make_movie(), make_user()
+    totals, _ = rating_import.import_rows(db, [_row(user, movie, 3), _row(user, movie, 5)])
+    assert (totals["upserted"], totals["duplicates"]) == (1, 1)
+    assert _aggregates(db, movie.id) == ((5.0, 1), [("TR", 5, 1)])
+
+def test_import_endpoint_reports_skipped_rows(client, make_movie, make_user):
+    movie, user = make_movie(), make_user()
+    payload = {"ratings": [{"user_id": user.id, "movie_id": movie.id, "rating": 6}], "on_conflict": "skip"}
+    headers = {"X-Admin-Key": "test-admin-key"}
+    assert client.post("/admin/ratings/import", json=payload, headers=headers).json()["upserted"] == 1
+    totals = client.post("/admin/ratings/import", json=payload, headers=headers).json()
+    assert (totals["upserted"], totals["skipped"]) == (0, 1)
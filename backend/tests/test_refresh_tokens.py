@@ -0,0 +1,71 @@
+import pytest
+from fastapi import HTTPException
+import auth
+import models
+
+def _family_rows(db, token):
+    db.expire_all()
+    family_id = db.query(models.RefreshToken.family_id).filter(
+        models.RefreshToken.token_hash == auth._refresh_digest(token)
+    ).scalar()
+    return db.query(models.RefreshToken).filter(models.RefreshToken.family_id == family_id).all()
+
+def _age(db, token, seconds):
+    # Move a token's rotation and expiry into the past instead of sleeping
+    db.query(models.RefreshToken).filter(models.RefreshToken.token_hash == auth._refresh_digest(token)).update(
+        {"revoked_at": models.RefreshToken.revoked_at - seconds, "expires_at": models.RefreshToken.expires_at - seconds},
+        synchronize_session=False,
+    )
+    db.commit()
+
+def test_rotation_returns_a_new_token_for_the_user(db, make_user):
+    user = make_user()
+    token = auth.issue_refresh_token(db, user.id)
+    email, rotated = auth.rotate_refresh_token(db, token)
+    assert email == user.email and rotated != token
+    assert auth._token_family(rotated) == auth._token_family(token)
+
+def test_rotated_token_is_accepted_within_the_grace(db, make_user):
+    token = auth.issue_refresh_token(db, make_user().id)
+    auth.rotate_refresh_token(db, token)
+    # A second tab racing the first still gets a token
+    assert auth.rotate_refresh_token(db, token)[1]
+    old = next(row for row in _family_rows(db, token) if row.token_hash == auth._refresh_digest(token))
+    assert old.expires_at == old.revoked_at + auth.REFRESH_REUSE_GRACE_SECONDS
+
+def test_replay_after_the_grace_revokes_the_family(db, make_user):
+    token = auth.issue_refresh_token(db, make_user().id)
+    _, current = auth.rotate_refresh_token(db, token)
+    _age(db, token, auth.REFRESH_REUSE_GRACE_SECONDS + 1)
+    with pytest.raises(HTTPException):
+        auth.rotate_refresh_token(db, token)
+    with pytest.raises(HTTPException):
+        auth.rotate_refresh_token(db, current)
+
+def test_rotation_prunes_expired_rows(db, make_user):
+    token = auth.issue_refresh_token(db, make_user().id)
+    first = token
+    for _ in range(20):
+        _, next_token = auth.rotate_refresh_token(db, token)
+        _age(db, token, auth.REFRESH_REUSE_GRACE_SECONDS + 1)
+        token = next_token
+    # The live token, the one rotated out last and (until the next rotation) its expired predecessor
+    assert len(_family_rows(db, token)) <= 3
+
+    # The first token's row is long gone, but its family prefix still marks it as a replay
+    with pytest.raises(HTTPException):
+        auth.rotate_refresh_token(db, first)
+    with pytest.raises(HTTPException):
+        auth.rotate_refresh_token(db, token)
+
+def test_unknown_tokens_are_rejected(db):
+    for token in ("not-a-token", "zz.abc", "1f.abc"):
+        with pytest.raises(HTTPException) as error:
+            auth.rotate_refresh_token(db, token)
+        assert error.value.status_code == 401
+
+def test_logout_ends_the_session(client, db, make_user):
+    token = auth.issue_refresh_token(db, make_user().id)
+    assert client.post("/auth/refresh", json={"refresh_token": token}).status_code == 200
+    assert client.post("/auth/logout", json={"refresh_token": token}).status_code == 200
+    assert client.post("/auth/refresh", json={"refresh_token": token}).status_code == 401
@@ -0,0 +1,76 @@
+import threading
+import time
+from cache import LRUCache, ResponseCache
+
+def _cache(**options):
+    return ResponseCache(LRUCache(**options), ttl=60)
+
+def test_loads_once_then_hits():
+    cache, calls = _cache(), []
+    assert cache.get_or_load("movie:1", ("en",), lambda: calls.append(1) or "detail") == "detail"
+    assert cache.get_or_load("movie:1", ("en",), lambda: calls.append(1) or "other") == "detail"
+    assert (len(calls), cache.hits, cache.misses) == (1, 1, 1)
+
+def test_not_found_is_not_cached():
+    cache = _cache()
+    assert cache.get_or_load("movie:1", ("en",), lambda: None) is None
+    assert cache.get_or_load("movie:1", ("en",), lambda: "created") == "created"
+
+def test_invalidation_is_per_namespace():
+    cache = _cache()
+    cache.get_or_load("movie:1", ("en",), lambda: "old detail")
+    cache.get_or_load("movies", ("offset", 0), lambda: "old listing")
+    cache.invalidate("movie:1")
+    assert cache.get_or_load("movie:1", ("en",), lambda: "new detail") == "new detail"
+    assert cache.get_or_load("movies", ("offset", 0), lambda: "new listing") == "old listing"
+
+def test_entries_expire_after_their_ttl():
+    cache = _cache()
+    cache.get_or_load("movies", (), lambda: "first", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get_or_load("movies", (), lambda: "second") == "second"
+
+def test_lru_bound_evicts_the_oldest_entry():
+    cache = _cache(max_entries=2)
+    for n in range(3):
+        cache.get_or_load(f"movie:{n}", (), lambda n=n: n)
+    assert cache.backend.size() == 2 and cache.backend.evictions == 1
+    assert cache.get_or_load("movie:0", (), lambda: "reloaded") == "reloaded"
+
+def test_pruned_versions_never_resurrect_stale_entries():
+    cache = _cache(max_versions=4)
+    cache.get_or_load("movie:1", (), lambda: "stale")
+    cache.invalidate("movie:1")
+    cache.get_or_load("movie:1", (), lambda: "fresh")
+    for n in range(2, 12):
+        cache.invalidate(f"movie:{n}")
+    assert len(cache.backend._versions) <= 4
+    # movie:1 was pruned: one miss, and neither the stale nor the last entry is served
+    assert cache.get_or_load("movie:1", (), lambda: "reloaded") == "reloaded"
+    cache.invalidate("movie:1")
+    assert cache.get_or_load("movie:1", (), lambda: "newest") == "newest"
+
+def test_concurrent_misses_share_one_load():
+    cache, calls, release = _cache(), [], threading.Event()
+
+    def slow_load():
+        calls.append(1)
+        release.wait(5)
+        return "detail"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("movie:1", (), slow_load))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while cache.coalesced < 7:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["detail"] * 8 and len(calls) == 1
+
+def test_rating_invalidates_the_cached_detail(client, make_movie, make_user, auth_headers):
+    movie, user = make_movie(), make_user()
+    assert client.get(f"/movies/{movie.id}").json()["ratings"] == []
+    client.post(f"/movies/{movie.id}/rate", json={"rating": 8, "comment": "Great"}, headers=auth_headers(user))
+    assert [rating["rating"] for rating in client.get(f"/movies/{movie.id}").json()["ratings"]] == [8]
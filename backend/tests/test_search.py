@@ -0,0 +1,65 @@
+import pytest
+import crud
+from search_index import CatalogSearchIndex, InvertedIndex, fold
+
+def test_fold_strips_case_and_diacritics():
+    assert fold("ŞAHİN") == fold("Şahin") == "sahin"
+    assert fold("Straße") == "strasse"
+
+def test_index_matches_prefixes_and_typos():
+    index = InvertedIndex(("title", "summary"))
+    index.add(1, {"title": "The Godfather", "summary": "A crime family"})
+    index.add(2, {"title": "Interstellar", "summary": "Space travel"})
+    assert index.search("godfa") == [1]
+    assert index.search("intersteller") == [2]
+    assert index.search("nothing like it") == []
+
+def test_title_hits_rank_before_summary_hits():
+    index = InvertedIndex(("title", "summary"))
+    index.add(1, {"title": "Quiet Harbor", "summary": "A storm reaches the coast"}, rank=100.0)
+    index.add(2, {"title": "Storm Front", "summary": "Rain"}, rank=1.0)
+    assert index.search("storm") == [2, 1]
+
+def test_removed_documents_stop_matching():
+    index = InvertedIndex(("name",))
+    index.add(1, {"name": "Tom Hanks"})
+    index.remove(1)
+    assert index.search("hanks") == []
+    assert len(index) == 0
+
+def test_build_replays_events_that_arrive_while_loading(db, make_movie, monkeypatch):
+    existing = make_movie(title="Zephyrine Harbour")
+    index = CatalogSearchIndex()
+    load = CatalogSearchIndex._load
+
+    def load_then_change(session, fresh):
+        load(session, fresh)
+        # Committed after the build read the catalog: only the replay can bring it in
+        index.on_catalog_change("movie", "upsert", {
+            "id": 10**9, "title": "Zephyrine Returns", "title_tr": None, "summary": "", "summary_tr": None,
+        })
+        index.on_catalog_change("movie", "delete", {"id": existing.id})
+
+    monkeypatch.setattr(CatalogSearchIndex, "_load", staticmethod(load_then_change))
+    index.build(db)
+    assert index.search_movies("zephyrine") == [10**9]
+
+def test_search_falls_back_to_sql_until_the_index_is_loaded(client, make_movie, monkeypatch):
+    movie = make_movie(title="Quasimodo Lantern")
+    monkeypatch.setattr(crud.catalog_index, "ensure_loaded", lambda: False)
+    response = client.get("/search", params={"q": "modo lant"})
+    assert response.status_code == 200
+    assert [m["id"] for m in response.json()["movies"]] == [movie.id]
+    # Typo tolerance is the index's; the SQL fallback only matches substrings
+    response = client.get("/search", params={"q": "Quasimodo Lanturn"})
+    assert response.json()["movies"] == []
+
+def test_search_serves_index_results(client, db, make_movie):
+    movie = make_movie(title="Vellichor Station", summary="Old bookshop")
+    crud.catalog_index.build(db)
+    response = client.get("/search", params={"q": "vellichr", "search_type": "movies"})
+    assert [m["id"] for m in response.json()["movies"]] == [movie.id]
+
+@pytest.mark.parametrize("limit", [0, -1, 51])
+def test_search_rejects_out_of_range_limits(client, limit):
+    assert client.get("/search", params={"q": "storm", "limit": limit}).status_code == 422
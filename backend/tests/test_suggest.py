@@ -0,0 +1,67 @@
+import heapq
+import random
+from bisect import bisect_left
+import pytest
+import suggest
+from suggest import SuggestSnapshot, Suggester
+
+def _movie(title, weight):
+    return {"labels": {"en": title}, "weight": weight, "extra": {}}
+
+@pytest.fixture(scope="module")
+def snapshot():
+    rng = random.Random(7)
+    words = ["star", "stark", "starling", "love", "lover", "lost", "the", "dark", "knight", "wars"]
+    entries = {
+        ("movie", n): _movie(" ".join(rng.choice(words) for _ in range(3)) + f" {n}", rng.random() * 100)
+        for n in range(3000)
+    }
+    entries[("actor", 1)] = {"labels": {"en": "Starla Quinn"}, "weight": 50.0, "extra": {}}
+    return SuggestSnapshot(entries)
+
+def _expected(snapshot, prefix, limit, kinds):
+    refs = {ref for key, ref in zip(snapshot.keys, snapshot.refs) if key.startswith(prefix) and snapshot.kinds[ref] in kinds}
+    return [snapshot.weights[ref] for ref in heapq.nlargest(limit, refs, key=snapshot.weights.__getitem__)]
+
+@pytest.mark.parametrize("prefix", ["s", "st", "star", "stark", "starl", "love", "lover l", "the dark k", "wars 12", "zzz"])
+def test_completions_are_the_heaviest_matches(snapshot, prefix):
+    for kinds in (("movie", "actor"), ("actor",)):
+        got = [snapshot.weights[ref] for ref in snapshot.complete(prefix, 10, kinds)]
+        assert got == _expected(snapshot, prefix, 10, kinds)
+
+def test_every_large_range_is_precomputed(snapshot):
+    # A prefix left out of the table must be cheap to scan
+    for prefix in {key[:n] for key in snapshot.keys for n in range(1, 12)}:
+        if prefix not in snapshot.top:
+            start = bisect_left(snapshot.keys, prefix)
+            end = bisect_left(snapshot.keys, prefix + "\uffff")
+            assert end - start <= suggest.SCAN_LIMIT
+    assert "star" in snapshot.top
+
+def test_load_replays_changes_made_while_reading(db, make_movie, monkeypatch):
+    make_movie(title="Obsidian Meadow")
+    suggester = Suggester()
+    read = Suggester._read
+
+    def read_then_change(session):
+        entries = read(session)
+        suggester.on_catalog_change("movie", "upsert", {"id": 10**9, "title": "Obsidian Returns", "popularity_score": 1e9})
+        return entries
+
+    monkeypatch.setattr(Suggester, "_read", staticmethod(read_then_change))
+    suggester.load(db)
+    assert suggester.suggest("obsidian")[0]["id"] == 10**9
+
+def test_suggest_is_empty_until_loaded(client, db, make_movie, monkeypatch):
+    movie = make_movie(title="Halcyon Drift", popularity_score=1e6)
+    monkeypatch.setattr(suggest.suggester, "_snapshot", None)
+    monkeypatch.setattr(suggest.suggester, "_start_background", lambda target: None)
+    assert client.get("/suggest", params={"q": "halc"}).json() == {"suggestions": []}
+
+    suggest.suggester.load(db)
+    suggestions = client.get("/suggest", params={"q": "halc"}).json()["suggestions"]
+    assert suggestions[0]["id"] == movie.id
+
+@pytest.mark.parametrize("limit", [0, -1, suggest.MAX_SUGGESTIONS + 1])
+def test_suggest_rejects_out_of_range_limits(client, limit):
+    assert client.get("/suggest", params={"q": "go", "limit": limit}).status_code == 422
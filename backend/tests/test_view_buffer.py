@@ -0,0 +1,64 @@
+from sqlalchemy.exc import OperationalError
+import pytest
+import crud
+import models
+from cache import response_cache
+from view_buffer import ViewBuffer, view_buffer
+
+@pytest.fixture
+def buffer():
+    buffer = ViewBuffer()
+    buffer.set_refresh(crud.refresh_popularity)
+    return buffer
+
+def test_flush_adds_buffered_views_and_refreshes_popularity(db, make_movie, buffer):
+    first, second = make_movie(view_count=10), make_movie()
+    for movie_id in (second.id, first.id, second.id):
+        buffer.record(movie_id)
+    assert buffer.flush() == 3
+
+    db.expire_all()
+    assert (db.get(models.Movie, first.id).view_count, db.get(models.Movie, second.id).view_count) == (11, 2)
+    # No ratings: 10 base points plus 0.1 per view
+    assert db.get(models.Movie, second.id).popularity_score == pytest.approx(10.2)
+    assert buffer.flush() == 0
+
+def test_listeners_get_the_flushed_ids_in_order(make_movie, buffer):
+    movies = [make_movie() for _ in range(3)]
+    flushed = []
+    buffer.add_listener(flushed.append)
+    for movie in reversed(movies):
+        buffer.record(movie.id)
+    buffer.flush()
+    assert flushed == [[movie.id for movie in movies]]
+
+def test_failed_flush_keeps_the_views(db, make_movie, buffer):
+    movie = make_movie()
+    buffer.record(movie.id)
+
+    def fail(session, movie_ids):
+        raise OperationalError("UPDATE", {}, Exception("database is locked"))
+
+    buffer.set_refresh(fail)
+    assert buffer.flush() == 0
+    buffer.set_refresh(crud.refresh_popularity)
+    assert buffer.flush() == 1
+    db.expire_all()
+    assert db.get(models.Movie, movie.id).view_count == 1
+
+def test_detail_views_are_buffered_not_written(client, db, make_movie, monkeypatch):
+    movie = make_movie()
+    recorded = []
+    monkeypatch.setattr("view_buffer.view_buffer.record", recorded.append)
+    assert client.get(f"/movies/{movie.id}").status_code == 200
+    assert recorded == [movie.id]
+    db.expire_all()
+    assert db.get(models.Movie, movie.id).view_count == 0
+
+def test_flush_invalidates_details_but_not_listings(make_movie):
+    movie = make_movie()
+    detail, listing = response_cache.backend.version(f"movie:{movie.id}"), response_cache.backend.version("movies")
+    view_buffer.record(movie.id)
+    view_buffer.flush()
+    assert response_cache.backend.version(f"movie:{movie.id}") != detail
+    assert response_cache.backend.version("movies") == listing
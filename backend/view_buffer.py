@@ -0,0 +1,104 @@
+import os
+import threading
+from collections import Counter
+from sqlalchemy import bindparam, update
+from database import SessionLocal
+import models
+
+# Views are written at most this often per worker...
+FLUSH_SECONDS = float(os.getenv("VIEW_FLUSH_SECONDS", "5"))
+# ...or as soon as this many are buffered, which bounds what a crash can lose
+MAX_PENDING = int(os.getenv("VIEW_FLUSH_MAX_PENDING", "1000"))
+
+class ViewBuffer:
+    """Write-behind view counter.
+
+    Page views are counted in memory and applied as one batched
+    `view_count = view_count + n` UPDATE per flush, so reading a movie never takes
+    its row lock. The increment is relative, so every worker can flush its own
+    buffer independently.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._total = 0
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._listeners = []
+        self._refresh = None
+
+    def set_refresh(self, callback):
+        """callback(db, movie_ids) runs inside each flush transaction, e.g. to recompute popularity.
+
+        Registered by crud rather than imported here, which would make the two modules import each other.
+        """
+        self._refresh = callback
+
+    def add_listener(self, callback):
+        """callback(movie_ids) runs after each successful flush, e.g. to invalidate caches"""
+        self._listeners.append(callback)
+
+    def record(self, movie_id: int):
+        with self._lock:
+            self._pending[movie_id] += 1
+            self._total += 1
+            if self._total >= MAX_PENDING:
+                self._wakeup.set()
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+            self._total = 0
+        if not batch:
+            return 0
+        # Every worker locks rows in the same (id) order, so concurrent flushes queue instead of deadlocking
+        movie_ids = sorted(batch)
+
+        db = SessionLocal()
+        try:
+            movies = models.Movie.__table__
+            stmt = update(movies).where(movies.c.id == bindparam("b_movie_id")).values(
+                view_count=movies.c.view_count + bindparam("b_views")
+            )
+            db.execute(stmt, [{"b_movie_id": movie_id, "b_views": batch[movie_id]} for movie_id in movie_ids])
+            if self._refresh is not None:
+                self._refresh(db, movie_ids)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            # Put the views back so the next flush retries them
+            with self._lock:
+                self._pending.update(batch)
+                self._total += sum(batch.values())
+            print(f"Error flushing view counts: {e}")
+            return 0
+        finally:
+            db.close()
+        for callback in self._listeners:
+            callback(movie_ids)
+        return sum(batch.values())
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(FLUSH_SECONDS)
+            self._wakeup.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="view-buffer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background flusher and write out whatever is still buffered"""
+        if self._thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+view_buffer = ViewBuffer()
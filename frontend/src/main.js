@@ -80,7 +80,8 @@ const messages = {
       filterByCountry: 'Filter by Country',
       noCountryData: 'No country data available',
       loadingStats: 'Loading rating statistics...',
-      errorLoadingStats: 'Error loading rating statistics'
+      errorLoadingStats: 'Error loading rating statistics',
+      loadMoreRatings: 'Load more ratings'
     },
     watchlist: {
       title: 'My Watchlist',
@@ -178,7 +179,8 @@ const messages = {
       filterByCountry: 'Ülkeye Göre Filtrele',
       noCountryData: 'Ülke verisi mevcut değil',
       loadingStats: 'Puan istatistikleri yükleniyor...',
-      errorLoadingStats: 'Puan istatistikleri yüklenirken hata oluştu'
+      errorLoadingStats: 'Puan istatistikleri yüklenirken hata oluştu',
+      loadMoreRatings: 'Daha fazla puan yükle'
     },
     watchlist: {
       title: 'İzleme Listem',
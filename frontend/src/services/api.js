@@ -13,17 +13,48 @@ if (token) {
   api.defaults.headers.common['Authorization'] = `Bearer ${token}`
 }
 
+let refreshPromise = null
+
+// Exchange the stored refresh token for a new token pair; concurrent 401s share one request
+const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    refreshPromise = api.post('/auth/refresh', { refresh_token: localStorage.getItem('refresh_token') })
+      .then((response) => {
+        const { access_token, refresh_token } = response.data
+        localStorage.setItem('token', access_token)
+        localStorage.setItem('refresh_token', refresh_token)
+        api.defaults.headers.common['Authorization'] = `Bearer ${access_token}`
+        return access_token
+      })
+      .finally(() => {
+        refreshPromise = null
+      })
+  }
+  return refreshPromise
+}
+
 // Response interceptor for handling errors
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
     if (error.response?.status === 401) {
       // Only redirect if we have a token (user was logged in) and it's not a login/register endpoint
-      const isAuthEndpoint = error.config?.url?.includes('/login') || error.config?.url?.includes('/register') || error.config?.url?.includes('/auth/google')
+      const isAuthEndpoint = error.config?.url?.includes('/login') || error.config?.url?.includes('/register') || error.config?.url?.includes('/auth/')
       
       if (!isAuthEndpoint && localStorage.getItem('token')) {
-        // Token expired or invalid for authenticated user
+        // Access token expired: renew it once with the refresh token and retry the request
+        if (localStorage.getItem('refresh_token') && !error.config._retried) {
+          try {
+            const accessToken = await refreshAccessToken()
+            error.config._retried = true
+            error.config.headers['Authorization'] = `Bearer ${accessToken}`
+            return api(error.config)
+          } catch (refreshError) {
+            // Refresh token expired or revoked: fall through to a fresh login
+          }
+        }
         localStorage.removeItem('token')
+        localStorage.removeItem('refresh_token')
         delete api.defaults.headers.common['Authorization']
         window.location.href = '/login'
       }
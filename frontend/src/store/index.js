@@ -25,6 +25,14 @@ export default createStore({
       }
     },
     
+    SET_REFRESH_TOKEN(state, refreshToken) {
+      if (refreshToken) {
+        localStorage.setItem('refresh_token', refreshToken)
+      } else {
+        localStorage.removeItem('refresh_token')
+      }
+    },
+    
     SET_MOVIES(state, movies) {
       state.movies = movies
     },
@@ -37,6 +45,7 @@ export default createStore({
       state.user = null
       state.token = null
       localStorage.removeItem('token')
+      localStorage.removeItem('refresh_token')
       delete api.defaults.headers.common['Authorization']
     }
   },
@@ -46,9 +55,10 @@ export default createStore({
       try {
         commit('SET_LOADING', true)
         const response = await api.post('/login', credentials)
-        const { access_token, user } = response.data
+        const { access_token, refresh_token, user } = response.data
         
         commit('SET_TOKEN', access_token)
+        commit('SET_REFRESH_TOKEN', refresh_token)
         commit('SET_USER', user)
         
         return { success: true }
@@ -155,9 +165,10 @@ export default createStore({
       try {
         commit('SET_LOADING', true)
         const response = await api.post('/auth/google', { token })
-        const { access_token, user } = response.data
+        const { access_token, refresh_token, user } = response.data
         
         commit('SET_TOKEN', access_token)
+        commit('SET_REFRESH_TOKEN', refresh_token)
         commit('SET_USER', user)
         
         return { success: true }
@@ -200,6 +211,11 @@ export default createStore({
     },
     
     logoutUser({ commit }) {
+      // Revoke the session server-side; logging out locally does not wait for it
+      const refreshToken = localStorage.getItem('refresh_token')
+      if (refreshToken) {
+        api.post('/auth/logout', { refresh_token: refreshToken }).catch(() => {})
+      }
       commit('LOGOUT')
     }
   },